@@ -1,7 +1,9 @@
 from . import filters
+from . import graph
 from . import helpers
 from . import mask
 from . import pipeline
+from . import profiling
 from . import render
 from . import sources
 from . import termini
@@ -28,7 +28,8 @@ def contour(self, values=0, contourName=None):
     # Come up with a name for the object.
     sensibleName = contourName if contourName is not None else "contour"
     sensibleName = helpers.generate_sensible_name(sensibleName,
-                                                  self.is_tracked)
+                                                  self.is_tracked,
+                                                  self._nameCounters)
 
     # Create the object.
     contourFilter = vtk.vtkContourFilter()
@@ -62,7 +63,8 @@ def extract_vector_components(self, componentsName=None, component=0):
     sensibleName = componentsName if componentsName is not None\
         else "extract_components"
     sensibleName = helpers.generate_sensible_name(sensibleName,
-                                                  self.is_tracked)
+                                                  self.is_tracked,
+                                                  self._nameCounters)
 
     # Create the object.
     extractComponents = vtk.vtkExtractVectorComponents()
@@ -94,7 +96,8 @@ def slice_data_with_plane(self, normal=[0., 0., 1.], origin=[0., 0., 0.],
     # Come up with a name for the object.
     sensibleName = sliceName if sliceName is not None else "slice"
     sensibleName = helpers.generate_sensible_name(sensibleName,
-                                                  self.is_tracked)
+                                                  self.is_tracked,
+                                                  self._nameCounters)
 
     # Define the plane geometry on which the slice exists.
     cutPlane = vtk.vtkPlane()
@@ -0,0 +1,229 @@
+# This source file defines a directed acyclic graph over the objects tracked
+# by a visualisation, so that the pipeline can be inspected, and updated as a
+# whole, without relying on the order objects were connected in.
+
+import heapq
+import vtk
+
+import chagu.termini as termini
+
+
+def current_time():
+    """
+    Returns the current value of the modified time counter shared by all VTK
+    objects. Objects modified after this call have a greater modified time.
+    """
+    stamp = vtk.vtkTimeStamp()
+    stamp.Modified()
+    return stamp.GetMTime()
+
+
+def modified_time(trackedObject):
+    """
+    Returns the modified time of an object tracked by a visualisation. The
+    modified time of a terminus is that of its mapper, and objects without a
+    modified time are treated as never having been modified.
+
+    Arguments:
+
+      - trackedObject: Tracked object (VTK or otherwise) to get the modified
+          time of.
+
+    Returns an integer.
+    """
+    if isinstance(trackedObject, termini.Terminus):
+        trackedObject = trackedObject.actor.GetMapper()
+    if hasattr(trackedObject, "GetMTime") is False:
+        return 0
+    return trackedObject.GetMTime()
+
+
+class PipelineGraph(object):
+    """
+    This class describes the pipeline of a visualisation as a directed acyclic
+    graph. Nodes are the names of tracked objects, and edges are connections
+    from the output port of one object to the input port of another.
+
+    VTK pipelines are demand-driven, so updating an object re-executes each
+    object upstream of it that was modified since it last executed. This class
+    records when it last updated each node, so that it knows which nodes are
+    stale (or "dirty"): those modified since then, and those downstream of
+    them. Updating the graph updates each dirty node that has no dirty nodes
+    downstream of it exactly once, which re-executes the whole dirty subgraph
+    and nothing else.
+
+    Initialisation arguments:
+
+      - vtkObjects: Dictionary mapping names to tracked objects. A reference
+          to this dictionary is kept, so that objects tracked later become
+          nodes of the graph.
+
+      - order: List of the names of tracked objects in the order they were
+          tracked, which orders the nodes of the graph, or None. A reference to
+          this list is kept as above. If None, nodes are ordered by name.
+    """
+    def __init__(self, vtkObjects, order=None):
+        self.vtkObjects = vtkObjects
+        self.order = order
+        self.edges = []
+        self._inputEdges = {}
+        self._outputEdges = {}
+        self._updateTimes = {}
+
+    def nodes(self):
+        """
+        Returns a list of the names of the nodes of the graph, in order.
+        """
+        if self.order is None:
+            return sorted(self.vtkObjects.keys())
+        return list(self.order)
+
+    def set_connections(self, connections):
+        """
+        Replace the edges of the graph. Records of when nodes were updated are
+        kept, because VTK marks objects whose connections change as modified.
+
+        Arguments:
+
+          - connections: Iterable of four-element iterables denoting the name
+              of the output object, the name of the input object, the output
+              port index and the input port index of each connection, as
+              returned by pipeline.connection_ports.
+
+        Returns nothing.
+        """
+        self.edges = [tuple(connection) for connection in connections]
+        self._inputEdges = {}
+        self._outputEdges = {}
+        for edge in self.edges:
+            self._inputEdges.setdefault(edge[1], []).append(edge)
+            self._outputEdges.setdefault(edge[0], []).append(edge)
+
+    def inputs(self, name):
+        """
+        Returns a list of the edges connected to the input ports of a node.
+        """
+        return list(self._inputEdges.get(name, []))
+
+    def outputs(self, name):
+        """
+        Returns a list of the edges connected to the output ports of a node.
+        """
+        return list(self._outputEdges.get(name, []))
+
+    def upstream(self, name):
+        """
+        Returns a set of the names of the nodes that a node depends on,
+        directly or otherwise.
+        """
+        return self._walk(name, self._inputEdges, 0)
+
+    def downstream(self, name):
+        """
+        Returns a set of the names of the nodes that depend on a node, directly
+        or otherwise.
+        """
+        return self._walk(name, self._outputEdges, 1)
+
+    def _walk(self, name, edgesByNode, endIndex):
+        found = set()
+        toVisit = [name]
+        while len(toVisit) > 0:
+            for edge in edgesByNode.get(toVisit.pop(), []):
+                if edge[endIndex] not in found:
+                    found.add(edge[endIndex])
+                    toVisit.append(edge[endIndex])
+        return found
+
+    def topological_order(self, names=None):
+        """
+        Orders nodes so that each node comes after every node it depends on.
+        Ties are broken by the order of the nodes in the graph.
+
+        Arguments:
+
+          - names: Iterable of strings denoting the names of the nodes to
+              order, or None to order all nodes.
+
+        Returns a list of strings, or raises a ValueError if the nodes are
+        connected in a cycle.
+        """
+        nodes = self.nodes()
+        if names is not None:
+            names = set(names)
+            nodes = [name for name in nodes if name in names]
+        positions = dict((name, zI) for zI, name in enumerate(nodes))
+
+        # Count the inputs of each node from the nodes being ordered, and
+        # start from the nodes without any.
+        inputCounts = dict((name, 0) for name in nodes)
+        for edge in self.edges:
+            if edge[0] in positions and edge[1] in positions:
+                inputCounts[edge[1]] += 1
+        ready = [positions[name] for name in nodes if inputCounts[name] == 0]
+        heapq.heapify(ready)
+
+        orderedNodes = []
+        while len(ready) > 0:
+            name = nodes[heapq.heappop(ready)]
+            orderedNodes.append(name)
+            for edge in self._outputEdges.get(name, []):
+                if edge[1] in positions:
+                    inputCounts[edge[1]] -= 1
+                    if inputCounts[edge[1]] == 0:
+                        heapq.heappush(ready, positions[edge[1]])
+
+        if len(orderedNodes) != len(nodes):
+            raise ValueError("Objects {} are connected in a cycle."
+                             .format(sorted(set(nodes) - set(orderedNodes))))
+        return orderedNodes
+
+    def is_modified(self, name):
+        """
+        Returns True if a node has been modified since this graph last updated
+        it, or if it has never been updated by this graph, and False otherwise.
+        """
+        return name not in self._updateTimes or\
+            modified_time(self.vtkObjects[name]) > self._updateTimes[name]
+
+    def dirty_nodes(self):
+        """
+        Returns a list of the names of the nodes that will be re-executed by
+        the next call to update, in topological order. These are the connected
+        nodes that have been modified since they were last updated, and the
+        nodes downstream of them.
+        """
+        connectedNames = set([edge[0] for edge in self.edges] +
+                             [edge[1] for edge in self.edges])
+        dirtyNames = []
+        dirtySet = set()
+        for name in self.topological_order(connectedNames):
+            if self.is_modified(name) or\
+               any(edge[0] in dirtySet for edge in self.inputs(name)):
+                dirtyNames.append(name)
+                dirtySet.add(name)
+        return dirtyNames
+
+    def update(self):
+        """
+        Update the dirty subgraph of this graph once, by updating each dirty
+        node that has no dirty nodes downstream of it. Nodes that are not
+        connected to anything are left alone.
+
+        Returns a list of the names of the nodes that were updated.
+        """
+        dirtyNames = self.dirty_nodes()
+        dirtySet = set(dirtyNames)
+        updatedNames = [name for name in dirtyNames
+                        if not any(edge[1] in dirtySet
+                                   for edge in self.outputs(name))]
+
+        for name in updatedNames:
+            update = getattr(self.vtkObjects[name], "Update", None)
+            if update is not None:
+                update()
+
+        updateTime = current_time()
+        for name in dirtyNames:
+            self._updateTimes[name] = updateTime
+        return updatedNames
@@ -1,10 +1,11 @@
 # This source file contains general helper functions that are not associated
 # with the visualisation class specifically, and so have been abstracted.
 
+import collections
 import vtk
 
 
-def generate_sensible_name(guessName, testFunction):
+def generate_sensible_name(guessName, testFunction, nameCounters=None):
     """
     Generate a sensible name given a guess. testFunction says whether or not
     a given name is invalid, and this is used to generate a sensible name.
@@ -17,6 +18,12 @@ def generate_sensible_name(guessName, testFunction):
           guessName as a solitary argument. If True is returned, the name is
           deemed as not sensible.
 
+      - nameCounters: Dictionary mapping guesses to the next suffix to try for
+          them, or None. If a dictionary is passed, it is updated so that later
+          calls with the same guess skip the suffixes already handed out, which
+          makes generating many names from one guess take constant time per
+          name. This assumes that names deemed not sensible stay that way.
+
     Returns a sensible name.
     """
 
@@ -25,9 +32,10 @@ def generate_sensible_name(guessName, testFunction):
     if testFunction(guessName) is False:
         sensibleName = guessName
 
-    # Try guessName_0, guessName_1 etc. and find the first one that works.
+    # Try guessName_0, guessName_1 etc. and find the first one that works,
+    # starting from the first suffix not handed out yet.
     else:
-        zI = 0
+        zI = 0 if nameCounters is None else nameCounters.get(guessName, 0)
         nameIsInvalid = True
         while nameIsInvalid is True:
             sensibleName = "{}_{}".format(guessName, zI)
@@ -36,12 +44,116 @@ def generate_sensible_name(guessName, testFunction):
             else:
                 nameIsInvalid = False
 
+        if nameCounters is not None:
+            nameCounters[guessName] = zI + 1
+
     return sensibleName
 
 
+def update_piece(vtkAlgorithm, piece, numberOfPieces):
+    """
+    Update a VTK algorithm so that its first output holds one of a number of
+    pieces of its data set, rather than the whole data set. The request is
+    passed up the pipeline, so readers that support pieces read only the
+    piece requested. Older versions of VTK have no UpdatePiece method, in
+    which case the request is made through the executive.
+
+    Arguments:
+
+      - vtkAlgorithm: VTK algorithm object to update.
+
+      - piece: Integer denoting the index of the piece to produce.
+
+      - numberOfPieces: Integer denoting the number of pieces the data set is
+          split into.
+
+    Returns nothing.
+    """
+    if hasattr(vtkAlgorithm, "UpdatePiece") is True:
+        vtkAlgorithm.UpdatePiece(piece, numberOfPieces, 0)
+    else:
+        vtkAlgorithm.UpdateInformation()
+        vtkAlgorithm.GetExecutive().SetUpdateExtent(0, piece, numberOfPieces,
+                                                    0)
+        vtkAlgorithm.Update()
+
+
 def vtk_base_version():
     """
     Returns the base version number of VTK being used, as an integer.
     """
 
     return int(vtk.vtkVersion().GetVTKVersion().split(".")[0])
+
+
+class LRUCache(object):
+    """
+    This class is a dictionary-like container that holds a limited number of
+    entries. When it is full, the entry that was used least recently is
+    discarded to make room for new entries.
+
+    By default, the size of the cache is the number of entries it holds. If a
+    size function is given, the size is instead the sum of the sizes of the
+    values it holds, such as their memory footprint. Values larger than the
+    maximum size are not stored.
+
+    Initialisation arguments:
+
+      - maximumSize: Number denoting the maximum size of the cache.
+
+      - sizeFunction: Function that returns the size of a value given as a
+          solitary argument, or None to count each entry as one.
+    """
+    def __init__(self, maximumSize=32, sizeFunction=None):
+        self.maximumSize = maximumSize
+        self.sizeFunction = sizeFunction
+        self.size = 0
+        self._entries = collections.OrderedDict()
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        """
+        Remove all entries from the cache.
+        """
+        self._entries.clear()
+        self.size = 0
+
+    def get(self, key, default=None):
+        """
+        Return the value stored against key and mark it as recently used, or
+        return default if the key is not in the cache.
+        """
+        if key not in self._entries:
+            return default
+        entry = self._entries.pop(key)
+        self._entries[key] = entry
+        return entry[0]
+
+    def put(self, key, value):
+        """
+        Store value against key, discarding the least recently used entries if
+        the cache is full.
+        """
+        self.remove(key)
+        if self.sizeFunction is None:
+            valueSize = 1
+        else:
+            valueSize = self.sizeFunction(value)
+        if valueSize > self.maximumSize:
+            return
+        self._entries[key] = (value, valueSize)
+        self.size += valueSize
+        while self.size > self.maximumSize:
+            self.size -= self._entries.popitem(last=False)[1][1]
+
+    def remove(self, key):
+        """
+        Remove the entry stored against key, if there is one.
+        """
+        if key in self._entries:
+            self.size -= self._entries.pop(key)[1]
@@ -4,14 +4,28 @@
 
 import numpy as np
 import vtk
+from vtk.util import numpy_support
+
+import chagu.helpers as helpers
+
+# Older versions of VTK cannot define algorithms in Python, in which case we
+# always mask with probe filters.
+try:
+    from vtk.util.vtkAlgorithm import VTKPythonAlgorithmBase
+    strideMaskSupported = True
+except ImportError:
+    VTKPythonAlgorithmBase = object
+    strideMaskSupported = False
 
 
 def create_mask_from_opts(boundingBox, glyphSize, maskDomain=None,
-                          maskResolution=None, maskType=None):
+                          maskResolution=None, maskType=None,
+                          regularGridStride=False):
     """
     Create a mask from a set of parameters, trying to figure out what the user
-    wants from incomplete information. The mask is a vtkProbeFilter positioned
-    with a vtkPlaneSource.
+    wants from incomplete information. The mask is a vtkProbeFilter that
+    resamples data on a lattice of points, or a StrideMask if
+    regularGridStride is True.
 
     There are eight expected behaviours this function takes care of:
       1) Create a plane mask over the entire dataset with unknown resolution.
@@ -64,7 +78,72 @@ def create_mask_from_opts(boundingBox, glyphSize, maskDomain=None,
       - maskType: String denoting the type of masking to do. Can be either
            "plane", "volume", or None.
 
-    Returns a vtkProbeFilter that resamples data on the mask plane or volume.
+      - regularGridStride: Boolean denoting whether or not to subsample image,
+           rectilinear and structured grid data by index strides instead of
+           interpolating it. Other data are resampled with a probe filter
+           regardless. This is ignored if the VTK version does not support
+           Python algorithms.
+
+    Returns a vtkProbeFilter that resamples data on the mask plane or volume,
+    or a StrideMask that does the same for regular grids.
+    """
+    maskType, domain, resolution = mask_geometry_from_opts(
+        boundingBox, glyphSize, maskDomain=maskDomain,
+        maskResolution=maskResolution, maskType=maskType)
+
+    # Now we can actually construct the mask filter.
+    return mask_from_geometry(maskType, domain, resolution,
+                              regularGridStride=regularGridStride)
+
+
+def create_mask_pyramid_from_opts(boundingBox, glyphSize, levels,
+                                  maskDomain=None, maskResolution=None,
+                                  maskType=None, regularGridStride=False):
+    """
+    Create a series of masks over the same domain, where each mask samples
+    half as many points along each direction as the one before it. This is
+    useful for drawing fewer glyphs when they would be too small to see. The
+    geometry of the first mask is worked out as in create_mask_from_opts.
+
+    Arguments:
+
+      - boundingBox, glyphSize, maskDomain, maskResolution, maskType,
+          regularGridStride: As in create_mask_from_opts.
+
+      - levels: Integer denoting the number of masks to create.
+
+    Returns a list with a two-element list for each mask, from the mask with
+    the most points to the mask with the fewest. These contain, in order, the
+    mask (as returned by create_mask_from_opts), and a float denoting the
+    smallest distance between the points it samples.
+    """
+    if levels < 1:
+        raise ValueError("Number of levels ({}) must be at least one."
+                         .format(levels))
+
+    maskType, domain, resolution = mask_geometry_from_opts(
+        boundingBox, glyphSize, maskDomain=maskDomain,
+        maskResolution=maskResolution, maskType=maskType)
+
+    pyramid = []
+    for level in xrange(levels):
+        levelResolution = [max(int(zI) // 2 ** level, 1) for zI in resolution]
+        pyramid.append([mask_from_geometry(maskType, domain, levelResolution,
+                                           regularGridStride),
+                        lattice_spacing(domain, levelResolution)])
+    return pyramid
+
+
+def mask_geometry_from_opts(boundingBox, glyphSize, maskDomain=None,
+                            maskResolution=None, maskType=None):
+    """
+    Determine the geometry of a mask from a set of parameters, trying to figure
+    out what the user wants from incomplete information. The behaviours and
+    arguments are described in create_mask_from_opts.
+
+    Returns, in order, the type of the mask ("plane" or "volume"), the nine or
+    twelve element list describing the domain of the mask, and the two or
+    three element list describing its resolution.
     """
     # Check for inconsistent inputs.
     if maskType == "plane":
@@ -158,13 +237,98 @@ def create_mask_from_opts(boundingBox, glyphSize, maskDomain=None,
     else:
         resolution = maskResolution
 
-    # Now we can actually construct the mask filter.
-    if maskType == "volume":
+    return maskType, domain, resolution
+
+
+def mask_from_geometry(maskType, domain, resolution, regularGridStride=False):
+    """
+    Create a mask from its geometry, as worked out by mask_geometry_from_opts.
+
+    Arguments:
+
+      - maskType: String denoting the type of masking to do. Can be either
+           "plane" or "volume".
+
+      - domain: Nine or twelve element list that defines a rectangle or cuboid
+          in three-dimensional space, as described in create_mask_from_opts.
+
+      - resolution: Two or three element list of integers denoting the number
+          of points in each direction of the rectangle or cuboid respectively.
+
+      - regularGridStride: As in create_mask_from_opts.
+
+    Returns a vtkProbeFilter that resamples data on the mask plane or volume,
+    or a StrideMask that does the same for regular grids.
+    """
+    if regularGridStride is True and strideMaskSupported is True:
+        if maskType == "plane":
+            return StrideMask(domain + domain[0:3], list(resolution) + [1])
+        return StrideMask(domain, resolution)
+    elif maskType == "volume":
         return cube_mask(domain, resolution)
     else:
         return plane_mask(domain, resolution)
 
 
+def lattice_spacing(domain, resolution):
+    """
+    Compute the smallest distance between neighbouring points of the lattice
+    sampled by a mask. Like the lattice used by cube_mask, the first two edges
+    of the domain are split into as many intervals as the resolution in that
+    direction, and the final edge of a cuboid is sampled at as many planes as
+    the resolution in that direction.
+
+    Arguments:
+
+      - domain: Nine or twelve element list that defines a rectangle or cuboid
+          in three-dimensional space, as described in create_mask_from_opts.
+
+      - resolution: Two or three element list of integers denoting the number
+          of points in each direction of the rectangle or cuboid respectively.
+
+    Returns a float denoting the distance, which is zero if the lattice has no
+    extent.
+    """
+    origin = np.array(domain[0:3], dtype=float)
+    spacings = []
+    for zI in xrange(len(resolution)):
+        edgeLength = np.linalg.norm(np.array(domain[zI * 3 + 3:zI * 3 + 6],
+                                             dtype=float) - origin)
+        intervals = resolution[zI] if zI < 2 else resolution[zI] - 1
+        if edgeLength > 0 and intervals > 0:
+            spacings.append(edgeLength / intervals)
+    return min(spacings) if len(spacings) != 0 else 0.
+
+
+def domain_bounds(domain):
+    """
+    Compute the smallest box aligned with the axes that contains a mask
+    domain.
+
+    Arguments:
+
+      - domain: Nine or twelve element list that defines a rectangle or cuboid
+          in three-dimensional space, as described in create_mask_from_opts.
+
+    Returns the box in the form returned by vtkDataSet.GetBounds.
+    """
+    if len(domain) not in [9, 12]:
+        raise ValueError("Invalid domain length {}. Must be nine or twelve."
+                         .format(len(domain)))
+
+    # Find every corner of the domain from P1 and the edges leaving it.
+    corners = np.array([domain[0:3]], dtype=float)
+    origin = np.array(domain[0:3], dtype=float)
+    for zI in xrange(3, len(domain), 3):
+        edge = np.array(domain[zI:zI + 3], dtype=float) - origin
+        corners = np.concatenate([corners, corners + edge])
+
+    bounds = []
+    for zI in xrange(3):
+        bounds += [corners[:, zI].min(), corners[:, zI].max()]
+    return bounds
+
+
 def plane_mask(domain, resolution):
     """
     Create a vtkProbeFilter that masks input data in a plane.
@@ -192,8 +356,8 @@ def cube_mask(domain, resolution):
 
     We use a probe filter to mask the points instead of vtkMaskPoints, because
     it doesn't let the user to specify where the resulting points are supposed
-    to be. To use that filter however, we need to define a volume polydata. To
-    do that, we need to create multiple planes and stick them together.
+    to be. To use that filter however, we need to define a volume polydata,
+    which is a stack of planes created by lattice_polydata.
 
     Arguments:
 
@@ -211,63 +375,352 @@ def cube_mask(domain, resolution):
     Returns a vtkProbeFilter that resamples data on the masking volume.
     """
 
-    # Check that resolution elements are non-negative integers.
-    for element in resolution:
-        if int(element) != element:
-            raise TypeError("Resolution element '{}' cannot be cast as an "
-                            "integer.".format(element))
-        if abs(element) != element:
-            raise ValueError("Resolution element '{}' is negative."
-                             .format(element))
+    check_cube_inputs(domain, resolution)
 
-    # Check inputs are of the correct lengths.
-    if len(domain) != 12:
-        raise ValueError("Domain '{}' is list of length {}. It must be a list "
-                         "of length 12 to define four corners in 3D space."
-                         .format(domain, len(domain)))
-    if len(resolution) != 3:
-        raise ValueError("Resolution '{}' is list of length {}. It must be a "
-                         "list of length 3 to define the number of points in "
-                         "each dimension of 3D space."
-                         .format(resolution, len(resolution)))
+    # Build the whole sampling lattice in one go, and probe the data on it.
+    maskVolume = lattice_polydata(domain, resolution)
+    maskFilter = vtk.vtkProbeFilter()
+    if helpers.vtk_base_version() < 6:
+        maskFilter.SetInput(maskVolume)
+    else:
+        maskFilter.SetInputData(maskVolume)
+    return maskFilter
 
-    # Convert the points to numpy arrays so that adding them in intervals
-    # becomes much easier.
-    corners = np.array([domain[0:3], domain[3:6], domain[6:9], domain[9:]])
 
-    # This is quite a complicated job. We create the first plane using the
-    # first three corners. We then add a multiple of the co-ordinate of the
-    # final corner to the others, until the volume is filled out. This is
-    # acceptable because we assume that the input corners are perpendicular.
-    maskVolume = vtk.vtkAppendPolyData()
-    numberOfPlanes = resolution[-1]
+def lattice_polydata(domain, resolution):
+    """
+    Create a vtkPolyData object describing a stack of quadrilateral planes that
+    fill a cuboid. The points and cells are the same as those that would be
+    produced by appending one quadrilateral_plane_source per plane together,
+    but they are computed with numpy in one go, which is much cheaper for
+    volumes with many planes.
+
+    Arguments:
 
-    # Define the vector along which to propogate the planes.
-    propVector = np.array(corners[3]) - np.array(corners[0])
+      - domain: Twelve element list that defines a cuboid, as described in
+          cube_mask.
+
+      - resolution: Three element list of integers. The first two elements
+          denote the number of cells in each direction of each plane, in the
+          order [P1->P2, P1->P3], where zero is treated as one, as in
+          vtkPlaneSource. The final element denotes the number of planes
+          between P1 and P4.
+
+    Returns the vtkPolyData object describing the lattice.
+    """
 
-    # Define the multiples from the number of planes to draw.
+    # Convert the points to numpy arrays so that adding them in intervals
+    # becomes much easier.
+    corners = np.array([domain[0:3], domain[3:6], domain[6:9], domain[9:]],
+                       dtype=float)
+    xResolution, yResolution, numberOfPlanes = [int(zI) for zI in resolution]
+
+    # Like vtkPlaneSource, treat planes with no cells in a direction as having
+    # one cell in that direction.
+    xResolution = max(xResolution, 1)
+    yResolution = max(yResolution, 1)
+
+    # Define the vector along which to propogate the planes, and the multiples
+    # of that vector at which planes are drawn. We assume that the input
+    # corners are perpendicular.
+    propVector = corners[3] - corners[0]
     if numberOfPlanes == 1:
         multiples = np.array([0.5])
     else:
         multiples = np.linspace(0., 1., numberOfPlanes)
 
-    # Iterate through each plane.
-    for multiple in multiples:
-        theseCorners = []
+    # Compute the points of every plane. As with vtkPlaneSource, points vary
+    # fastest in the P1->P2 direction, then in the P1->P3 direction. Planes
+    # are stacked one after the other.
+    origins = corners[0] + multiples[:, np.newaxis] * propVector
+    xCoefficients = np.arange(xResolution + 1) / float(xResolution)
+    yCoefficients = np.arange(yResolution + 1) / float(yResolution)
+    points = (origins[:, np.newaxis, np.newaxis, :] +
+              yCoefficients[np.newaxis, :, np.newaxis, np.newaxis] *
+              (corners[2] - corners[0]) +
+              xCoefficients[np.newaxis, np.newaxis, :, np.newaxis] *
+              (corners[1] - corners[0]))
+
+    # Compute the connectivity of the quadrilaterals in the same order as
+    # vtkPlaneSource, offset by the number of points in each plane.
+    pointsPerPlane = (xResolution + 1) * (yResolution + 1)
+    iIndices, jIndices = np.meshgrid(np.arange(xResolution),
+                                     np.arange(yResolution))
+    firstCorners = (iIndices + jIndices * (xResolution + 1)).ravel()
+    quads = np.column_stack([firstCorners,
+                             firstCorners + 1,
+                             firstCorners + xResolution + 2,
+                             firstCorners + xResolution + 1])
+    quads = (quads[np.newaxis, :, :] + pointsPerPlane *
+             np.arange(numberOfPlanes)[:, np.newaxis, np.newaxis])
+    quads = quads.reshape(-1, 4)
+    cells = np.column_stack([np.full(len(quads), 4), quads]).ravel()
+
+    # Wrap the arrays up as VTK objects. We copy them so that VTK owns its own
+    # memory. Points are stored in single precision, like vtkPlaneSource.
+    latticePoints = vtk.vtkPoints()
+    latticePoints.SetData(numpy_support.numpy_to_vtk(
+        points.reshape(-1, 3).astype(np.float32), deep=True))
+
+    latticeCells = vtk.vtkCellArray()
+    latticeCells.SetCells(len(quads), numpy_support.numpy_to_vtkIdTypeArray(
+        cells.astype(numpy_support.ID_TYPE_CODE), deep=True))
+
+    latticePolyData = vtk.vtkPolyData()
+    latticePolyData.SetPoints(latticePoints)
+    latticePolyData.SetPolys(latticeCells)
+    return latticePolyData
+
+
+class StrideMask(VTKPythonAlgorithmBase):
+    """
+    This class is a VTK algorithm that masks input data in a cube-shape, like
+    the vtkProbeFilter created by cube_mask, but which avoids interpolation
+    where it can.
+
+    If the input data is a vtkImageData, vtkRectilinearGrid, or an
+    axis-aligned vtkStructuredGrid with point data, and the masking domain is
+    aligned with the axes, the output contains every n'th point of the input
+    that lies in the domain, where n is chosen so that there are at least as
+    many points as requested by the resolution. No point location or
+    interpolation is done, so this is much cheaper than probing large grids.
+    Otherwise, the input is resampled with a probe filter as usual.
 
-        # Add some multiple of the final corner to each corner.
-        for zI in xrange(3):
-            theseCorners += list(corners[zI] + multiple * propVector)
+    The output is always a vtkPolyData object, and this algorithm has one input
+    port.
 
-        # Create the plane and add it to the volume.
-        thisPlane = quadrilateral_plane_source(theseCorners, resolution[:-1])
-        maskVolume.AddInputConnection(thisPlane.GetOutputPort())
+    Initialisation arguments:
 
-    # Phew!
-    maskVolume.Update()
-    maskFilter = vtk.vtkProbeFilter()
-    maskFilter.SetInputConnection(maskVolume.GetOutputPort())
-    return maskFilter
+      - domain: Twelve element list that defines a cuboid, as described in
+          cube_mask.
+
+      - resolution: Three element list of integers denoting the number of
+          points in each direction of the volume, as described in cube_mask.
+    """
+    def __init__(self, domain, resolution):
+        VTKPythonAlgorithmBase.__init__(self, nInputPorts=1,
+                                        inputType="vtkDataSet",
+                                        nOutputPorts=1,
+                                        outputType="vtkPolyData")
+        check_cube_inputs(domain, resolution)
+        self.domain = list(domain)
+        self.resolution = [int(zI) for zI in resolution]
+        self._probeFilter = None
+
+    def RequestData(self, request, inInfo, outInfo):
+        inputData = vtk.vtkDataSet.GetData(inInfo[0])
+        outputData = vtk.vtkPolyData.GetData(outInfo)
+
+        # Try to stride first, and probe if that is not possible. The probe
+        # filter is only created when it is first needed.
+        maskedData = stride_sample(inputData, self.domain, self.resolution)
+        if maskedData is None:
+            if self._probeFilter is None:
+                self._probeFilter = cube_mask(self.domain, self.resolution)
+            sourceData = inputData.NewInstance()
+            sourceData.ShallowCopy(inputData)
+            self._probeFilter.SetSourceData(sourceData)
+            self._probeFilter.Update()
+            maskedData = self._probeFilter.GetOutput()
+
+        outputData.ShallowCopy(maskedData)
+        return 1
+
+
+def stride_sample(dataSet, domain, resolution):
+    """
+    Subsample a regular grid by integer strides in each direction, so that the
+    resulting points lie within a cuboid domain without being interpolated.
+
+    Arguments:
+
+      - dataSet: vtkDataSet object to sample.
+
+      - domain: Twelve element list that defines a cuboid, as described in
+          cube_mask. The edges of the cuboid must be aligned with the axes.
+
+      - resolution: Three element list of integers denoting the number of
+          points in each direction of the volume, as described in cube_mask.
+
+    Returns a vtkPolyData object containing the sampled points and their point
+    data, or None if the data set or domain are not suitable for striding.
+    """
+
+    # Cell data would be lost by striding over points, so leave these data to
+    # the probe filter.
+    if dataSet.GetCellData().GetNumberOfArrays() != 0:
+        return None
+
+    # Get the co-ordinates of the grid along each axis.
+    if dataSet.IsA("vtkImageData"):
+        extent = dataSet.GetExtent()
+        origin = dataSet.GetOrigin()
+        spacing = dataSet.GetSpacing()
+        axisCoordinates = [origin[zI] + spacing[zI] *
+                           np.arange(extent[zI * 2], extent[zI * 2 + 1] + 1)
+                           for zI in xrange(3)]
+    elif dataSet.IsA("vtkRectilinearGrid"):
+        axisCoordinates = [numpy_support.vtk_to_numpy(coordinates)
+                           for coordinates in [dataSet.GetXCoordinates(),
+                                               dataSet.GetYCoordinates(),
+                                               dataSet.GetZCoordinates()]]
+    elif dataSet.IsA("vtkStructuredGrid"):
+        dimensions = list(dataSet.GetDimensions())
+        gridPoints = numpy_support.vtk_to_numpy(dataSet.GetPoints().GetData())
+        gridPoints = gridPoints.reshape(dimensions[::-1] + [3])
+        axisCoordinates = [gridPoints[0, 0, :, 0], gridPoints[0, :, 0, 1],
+                           gridPoints[:, 0, 0, 2]]
+
+        # The grid has to be aligned with the axes for striding to make sense.
+        aligned = (np.allclose(gridPoints[..., 0], axisCoordinates[0]) and
+                   np.allclose(gridPoints[..., 1],
+                               axisCoordinates[1][:, np.newaxis]) and
+                   np.allclose(gridPoints[..., 2],
+                               axisCoordinates[2][:, np.newaxis, np.newaxis]))
+        if aligned is False:
+            return None
+    else:
+        return None
+
+    # Each axis must have increasing co-ordinates.
+    for coordinates in axisCoordinates:
+        if len(coordinates) == 0 or (np.diff(coordinates) <= 0).any():
+            return None
+
+    axisIndices = stride_indices_in_domain(axisCoordinates, domain,
+                                           resolution)
+    if axisIndices is None:
+        return None
+
+    # Find the position of each sample point in the flattened data arrays.
+    # Point data in VTK grids vary fastest in x, then y, then z.
+    gridShape = [len(coordinates) for coordinates in axisCoordinates]
+    zIndices, yIndices, xIndices = np.meshgrid(axisIndices[2], axisIndices[1],
+                                               axisIndices[0], indexing="ij")
+    flatIndices = ((zIndices * gridShape[1] + yIndices) * gridShape[0] +
+                   xIndices).ravel()
+
+    # Gather the points and point data.
+    if dataSet.IsA("vtkStructuredGrid"):
+        samplePoints = gridPoints.reshape(-1, 3)[flatIndices]
+    else:
+        samplePoints = np.column_stack([
+            axisCoordinates[0][xIndices.ravel()],
+            axisCoordinates[1][yIndices.ravel()],
+            axisCoordinates[2][zIndices.ravel()]])
+
+    maskPoints = vtk.vtkPoints()
+    maskPoints.SetData(numpy_support.numpy_to_vtk(
+        np.ascontiguousarray(samplePoints), deep=True))
+    maskedData = vtk.vtkPolyData()
+    maskedData.SetPoints(maskPoints)
+
+    inputPointData = dataSet.GetPointData()
+    outputPointData = maskedData.GetPointData()
+    for zI in xrange(inputPointData.GetNumberOfArrays()):
+        inputArray = inputPointData.GetArray(zI)
+        if inputArray is None:  # Not a numerical array.
+            continue
+        values = numpy_support.vtk_to_numpy(inputArray)[flatIndices]
+        outputArray = numpy_support.numpy_to_vtk(
+            np.ascontiguousarray(values), deep=True,
+            array_type=inputArray.GetDataType())
+        outputArray.SetName(inputArray.GetName())
+        outputPointData.AddArray(outputArray)
+
+    # Preserve the active attributes of the input.
+    if inputPointData.GetScalars() is not None:
+        outputPointData.SetActiveScalars(inputPointData.GetScalars().GetName())
+    if inputPointData.GetVectors() is not None:
+        outputPointData.SetActiveVectors(inputPointData.GetVectors().GetName())
+
+    return maskedData
+
+
+def stride_indices_in_domain(axisCoordinates, domain, resolution):
+    """
+    Choose evenly-strided indices along each axis of a regular grid, such that
+    the points they select lie within a cuboid domain that is aligned with the
+    axes.
+
+    Arguments:
+
+      - axisCoordinates: Three-element list of increasing one-dimensional numpy
+          arrays denoting the co-ordinates of the grid along the x, y, and z
+          axes.
+
+      - domain: Twelve element list that defines a cuboid, as described in
+          cube_mask. The final edge may have no length, in which case the
+          cuboid is a plane.
+
+      - resolution: Three element list of integers denoting the number of
+          points in each direction of the volume, as described in cube_mask.
+
+    Returns a three-element list of numpy arrays of indices along the x, y,
+    and z axes, or None if the domain is not aligned with the axes.
+    """
+
+    # Figure out which axis each edge of the domain is aligned with. The final
+    # edge may have no length, in which case the domain is a plane.
+    corners = np.array([domain[0:3], domain[3:6], domain[6:9], domain[9:]],
+                       dtype=float)
+    edges = corners[1:] - corners[0]
+    edgeAxes = []
+    for edge in edges:
+        nonZeroAxes = np.flatnonzero(edge)
+        if len(nonZeroAxes) > 1:
+            return None
+        edgeAxes.append(nonZeroAxes[0] if len(nonZeroAxes) == 1 else None)
+    if edgeAxes[2] is None:
+        edgeAxes[2] = (set(range(3)) - set(edgeAxes[:2])).pop()
+    if None in edgeAxes[:2] or len(set(edgeAxes)) != 3:
+        return None
+
+    # Select the indices to sample along each axis. Like the lattice used by
+    # cube_mask, the first two edges are sampled at resolution + 1 points, and
+    # the final edge is sampled at the number of planes requested.
+    axisIndices = [None, None, None]
+    numberOfSamples = [resolution[0] + 1, resolution[1] + 1, resolution[2]]
+    for zI in xrange(3):
+        axis = edgeAxes[zI]
+        lower, upper = sorted([corners[0, axis], corners[0, axis] +
+                               edges[zI, axis]])
+        axisIndices[axis] = strided_indices(axisCoordinates[axis], lower,
+                                            upper, numberOfSamples[zI])
+    return axisIndices
+
+
+def strided_indices(coordinates, lower, upper, numberOfSamples):
+    """
+    Choose evenly-strided indices of a sorted co-ordinate array, such that the
+    co-ordinates lie between two bounds and there are at least as many indices
+    as requested (if the co-ordinates allow it).
+
+    Arguments:
+
+      - coordinates: Increasing one-dimensional numpy array of co-ordinates.
+
+      - lower: Float denoting the lower bound.
+
+      - upper: Float denoting the upper bound.
+
+      - numberOfSamples: Integer denoting the number of indices desired. If
+          this is one, or the bounds contain no co-ordinates, the index of the
+          co-ordinate closest to the middle of the bounds is chosen.
+
+    Returns a numpy array of integer indices.
+    """
+    tolerance = 1e-9 * max(coordinates[-1] - coordinates[0], 1.)
+    firstIndex = np.searchsorted(coordinates, lower - tolerance, side="left")
+    lastIndex = np.searchsorted(coordinates, upper + tolerance,
+                                side="right") - 1
+
+    if numberOfSamples <= 1 or lastIndex < firstIndex:
+        centre = (lower + upper) / 2.
+        return np.array([np.abs(coordinates - centre).argmin()])
+
+    stride = max((lastIndex - firstIndex) // (numberOfSamples - 1), 1)
+    return np.arange(firstIndex, lastIndex + 1, stride)
 
 
 def quadrilateral_plane_source(domain, resolution):
@@ -289,6 +742,74 @@ def quadrilateral_plane_source(domain, resolution):
     Returns the vtkPlaneSource object describing the requested geometry.
     """
 
+    integerisedResolution = check_plane_inputs(domain, resolution)
+
+    # Build the plane.
+    maskPlane = vtk.vtkPlaneSource()
+    maskPlane.SetOrigin(*domain[0:3])
+    maskPlane.SetPoint1(*domain[3:6])
+    maskPlane.SetPoint2(*domain[6:])
+    maskPlane.SetResolution(*integerisedResolution)
+    return maskPlane
+
+
+def check_cube_inputs(domain, resolution):
+    """
+    Check that a domain and resolution describe a sensible cuboid, raising an
+    exception if they do not.
+
+    Arguments:
+
+      - domain: Twelve element list that defines a cuboid, as described in
+          cube_mask.
+
+      - resolution: Three element list of integers denoting the number of
+          points in each direction of the volume.
+
+    Returns nothing.
+    """
+
+    # Check that resolution elements are non-negative integers.
+    for element in resolution:
+        if int(element) != element:
+            raise TypeError("Resolution element '{}' cannot be cast as an "
+                            "integer.".format(element))
+        if abs(element) != element:
+            raise ValueError("Resolution element '{}' is negative."
+                             .format(element))
+
+    # Check inputs are of the correct lengths.
+    if len(domain) != 12:
+        raise ValueError("Domain '{}' is list of length {}. It must be a list "
+                         "of length 12 to define four corners in 3D space."
+                         .format(domain, len(domain)))
+    if len(resolution) != 3:
+        raise ValueError("Resolution '{}' is list of length {}. It must be a "
+                         "list of length 3 to define the number of points in "
+                         "each dimension of 3D space."
+                         .format(resolution, len(resolution)))
+
+    # Check the plane geometry described by the first three corners. Every
+    # plane in the volume is a translation of this one, so one check suffices.
+    check_plane_inputs(domain[:9], resolution[:-1])
+
+
+def check_plane_inputs(domain, resolution):
+    """
+    Check that a domain and resolution describe a sensible quadrilateral plane,
+    raising an exception if they do not.
+
+    Arguments:
+
+      - domain: Nine element list that defines a rectangle in three-dimensional
+          space, as described in quadrilateral_plane_source.
+
+      - resolution: Two element list of integers denoting the number of points
+          in each direction of the plane, in the order [P1->P2, P1->P3].
+
+    Returns the resolution as a list of integers.
+    """
+
     # Check that inputs have the correct length.
     if len(domain) != 9:
         raise ValueError("Non 9-element domain {} passed.".format(domain))
@@ -312,10 +833,4 @@ def quadrilateral_plane_source(domain, resolution):
         raise ValueError("Points have an overlap: {}, {}, {}"
                          .format(domain[0:3], domain[3:6], domain[6:]))
 
-    # Build the plane.
-    maskPlane = vtk.vtkPlaneSource()
-    maskPlane.SetOrigin(*domain[0:3])
-    maskPlane.SetPoint1(*domain[3:6])
-    maskPlane.SetPoint2(*domain[6:])
-    maskPlane.SetResolution(*integerisedResolution)
-    return maskPlane
+    return integerisedResolution
@@ -1,21 +1,62 @@
 # This source file defines pipeline management functions for the visualisation
 # class.
 
-import copy
+import matplotlib.cm
+import matplotlib.colors
+import os
 import vtk
 
-import chagu.termini as termini
+import chagu.profiling as profiling
 
 
-def autopipe(self):
+def add_connection(self, outputObjectName, inputObjectName,
+                   outputPortIndex=None, inputPortIndex=None, update=True):
+    """
+    Connects two objects in the pipeline of this visualisation instance,
+    replacing any connection already made to the same input port. Unlike
+    connect_vtk_objects, the connection is recorded in the pipeline
+    description, and the termini downstream of the input object are updated.
+
+    Arguments:
+
+      - outputObjectName: String denoting the name of the object to get the
+          output port of.
+      - inputObjectName: As above for the input object.
+      - outputPortIndex: Integer denoting the output port of the object to
+          connect. If None, the default_output_port of the object is used if it
+          has one, and port zero is used otherwise.
+      - inputPortIndex: As above for the input object.
+      - update: Boolean denoting whether or not to update the termini
+          downstream of the connection, as in build_pipeline_from_dict.
+
+    Returns nothing.
+    """
+
+    connection = [outputObjectName, inputObjectName]
+    ports = list(self.connection_ports(connection))
+    if outputPortIndex is not None:
+        ports[2] = outputPortIndex
+    if inputPortIndex is not None:
+        ports[3] = inputPortIndex
+
+    # Keep everything in the pipeline except connections to the input port
+    # we're connecting to.
+    pipelineDescription = [
+        connection for connection in self._pipeline
+        if self.connection_ports(connection)[1::2] != (ports[1], ports[3])]
+    pipelineDescription.append([ports[0], ports[1:]])
+    self.build_pipeline_from_dict(pipelineDescription, update=update)
+
+
+def autopipe(self, update=True):
     """
     Builds a pipeline from VTK objects managed by this visualisation instance
     by guessing what the user wants from the order objects were added.
 
-    This can only be called once per visualisation instance, because I don't
-    know how to clear ports yet. As such, all connections are done at
-    once. This function creates the dictionary describing the pipeline, which
-    is then passed to build_pipeline_from_dict.
+    This function creates the dictionary describing the pipeline, which is
+    then passed to build_pipeline_from_dict. Calling it again after tracking
+    more objects only changes the connections that differ from the current
+    pipeline.
 
     A pipeline guess requires:
       - A filereader object.
@@ -31,101 +72,85 @@ def autopipe(self):
     As a tip, consider calling self.draw_pipeline_graphvis to understand how
     the pipeline is connected for this visualisation.
 
+    Arguments:
+
+      - update: Boolean denoting whether or not to update the termini once
+          they are connected, as in build_pipeline_from_dict.
+
     Returns nothing.
     """
 
     pipelineDescription = []
 
-    # Firstly, copy the order list to something we can remove entries from
-    # safely. Reverse the list as well for easiness.
-    order = copy.copy(self._order)[::-1]
-    toPop = []
+    # Index the role of each object once, so that the guess is linear in the
+    # number of tracked objects.
+    readerNames = [objectName for objectName in self._order
+                   if self.is_reader(objectName) is True]
+    readerNameSet = set(readerNames)
 
-    # Connect each terminus object to the vtk object added before it.
+    # Find the object to connect to each terminus, working forwards through
+    # the order objects were added in.
     #
-    # For each object, if that object is a terminus, search for the first
-    # object added before it that was not a terminus. Add the two objects to
-    # the pipeline, and remove the terminus to ensure its only drawn
-    # once. Exceptions to this are:
+    # Each terminus is connected to the last object added before it that was
+    # not a terminus. Exceptions to this are:
     #
-    # - If the terminus has no input ports, just remove it from the list
-    #   because we are not connecting it to anything.
+    # - If the terminus has no input ports, we are not connecting it to
+    #   anything.
     # - If the terminus is a nasty vector terminus, connect it directly to the
-    #   filereader if possible.
-    for zJ in xrange(len(order)):
-        vtkObjectRecv = order[zJ]
-        if isinstance(self.get_vtk_object(vtkObjectRecv),
-                      termini.Terminus) is True:
-
-            # Make sure there are input ports to connect to.
-            if hasattr(self.get_vtk_object(vtkObjectRecv),
-                       "GetNumberOfInputPorts") is True:
-
-                # If we are looking at nasty vectors, try to connect the
-                # terminus directly to the filereader. This preserves the
-                # direction. if the user wishes to slice their vector field,
-                # it's best to do it with a mask as opposed to the slice
-                # filter.
-                if self.is_nasty(vtkObjectRecv) is True:
-
-                    # Search for the filereader to connect to the terminus.
-                    for zI in xrange(len(order)):
-                        vtkObjectSend = order[zI]
-                        if self.is_reader(vtkObjectSend) is True:
-                            toPop.append(zJ)
-                            pipelineDescription.append([vtkObjectSend,
-                                                        vtkObjectRecv])
-                            break
-                else:
-
-                    # Search for the vtkObject to connect to the terminus.
-                    for zI in xrange(zJ, len(order)):
-                        vtkObjectSend = order[zI]
-                        if isinstance(self.get_vtk_object(vtkObjectSend),
-                                      termini.Terminus) is False:
-                            toPop.append(zJ)
-                            pipelineDescription.append([vtkObjectSend,
-                                                        vtkObjectRecv])
-                            break
-
-                # If we can't find a match for the terminus, raise an
-                # exception.
-                if zJ not in toPop:
-                    raise RuntimeError("No connection found for {}. Has a "
-                                       "file been read?".format(vtkObjectRecv))
-
-            # If there are no input ports for the terminus, remove it from the
-            # list.
+    #   filereader added last. This preserves the direction. if the user
+    #   wishes to slice their vector field, it's best to do it with a mask as
+    #   opposed to the slice filter.
+    senderNames = {}
+    lastFilterName = None
+    for objectName in self._order:
+        if objectName not in self._vtkTermini:
+            lastFilterName = objectName
+        elif hasattr(self._vtkTermini[objectName],
+                     "GetNumberOfInputPorts") is True:
+            if self.is_nasty(objectName) is True:
+                senderNames[objectName] = readerNames[-1]\
+                    if len(readerNames) > 0 else None
             else:
-                toPop.append(zJ)
-
-    # Have to remove indeces in reverse order, because pop will reduce all
-    # indeces by one.
-    for index in toPop[::-1]:
-        order.pop(index)
+                senderNames[objectName] = lastFilterName
+
+    # Connect the termini, most recently added first. If we can't find a match
+    # for a terminus, raise an exception.
+    filterNames = []
+    for objectName in reversed(self._order):
+        if objectName not in self._vtkTermini:
+            filterNames.append(objectName)
+        elif objectName in senderNames:
+            if senderNames[objectName] is None:
+                raise RuntimeError("No connection found for {}. Has a "
+                                   "file been read?".format(objectName))
+            pipelineDescription.append([senderNames[objectName], objectName])
 
     # Connect remaining vtkObjects in order.
-    for zI in xrange(1, len(order)):
+    for zI in xrange(1, len(filterNames)):
         # If the zI-1th object is a fileReader, it means objects have been
         # added in a strange order. Not much we can do about this though, but
         # we need to check it.
-        if self.is_reader(order[zI - 1]) is True:
-            pipelineDescription.append([order[zI - 1], order[zI]])
+        if filterNames[zI - 1] in readerNameSet:
+            pipelineDescription.append([filterNames[zI - 1], filterNames[zI]])
         else:
-            pipelineDescription.append([order[zI], order[zI - 1]])
+            pipelineDescription.append([filterNames[zI], filterNames[zI - 1]])
 
     # Build the pipeline from our guess.
-    self.build_pipeline_from_dict(pipelineDescription)
+    self.build_pipeline_from_dict(pipelineDescription, update=update)
 
 
-def build_pipeline_from_dict(self, pipelineDescription):
+def build_pipeline_from_dict(self, pipelineDescription, update=True):
     """
     Builds a pipeline from VTK objects managed by this visualisation instance
     by reading a nested iterable object.
 
-    This can only be called once per visualisation instance, because I don't
-    know how to clear ports yet. As such, all connections have to be done at
-    once.
+    This can be called more than once per visualisation instance to change a
+    live pipeline. Connections in the new description that were already made
+    are left alone, connections that are no longer described are removed, and
+    connections to an input port that is already connected replace the old
+    connection. Only objects downstream of an input that changed are updated
+    (see update_pipeline), so readers upstream of the change are not read
+    again.
 
     Arguments:
 
@@ -141,92 +166,50 @@ def build_pipeline_from_dict(self, pipelineDescription):
           connected to output port zero, unless default_input_port or
           default_output_port are set as appropriate.
 
+      - update: Boolean denoting whether or not to update the termini once
+          they are connected. Updating reads the whole of each data set
+          drawn, so streaming renders (see visualise_stream) leave this until
+          each piece is drawn.
+
     Returns nothing.
     """
-    # Ensure this is called only once.
-    if self._pipeline != []:
-        raise RuntimeError("'build_pipeline_from_dict' can only be called "
-                           "once per visualisation instance without failure. "
-                           "Sorry!")
 
-    # Test each of the connections.
+    # Test each of the connections, working out the ports of each as we
+    # go. This ensures that a failure anywhere in the dictionary makes no
+    # changes to the pipeline.
+    newConnections = []
     for connection in pipelineDescription:
-        outputObjName = connection[0]
-
-        # If value is a string, we connect zero-ports together unless the
-        # object has a default port set. Otherwise, read the data as defined in
-        # the docstring.
-        if type(connection[1]) is str:
-            inputObjName = connection[1]
-            self.check_connection(outputObjName, inputObjName)
-
-            if hasattr(self._vtkObjects[inputObjName],
-                       "default_input_port") is True:
-                inputPortIndex = self._vtkObjects[inputObjName].\
-                    default_input_port
-            else:
-                inputPortIndex = 0
-
-            if hasattr(self._vtkObjects[outputObjName],
-                       "default_output_port") is True:
-                outputPortIndex = self._vtkObjects[outputObjName]\
-                    .default_output_port
-            else:
-                outputPortIndex = 0
-
-        else:
-            inputObjName, outputPortIndex, inputPortIndex = connection[1]
-
-        self.check_connection(outputObjName, inputObjName,
-                              outputPortIndex=outputPortIndex,
-                              inputPortIndex=inputPortIndex)
-
-    # In the same way, make the connections. This ensures that a failure
-    # anywhere in the dictionary makes no connections.
-    for connection in pipelineDescription:
-        outputObjName = connection[0]
-
-        # If value is a string, we connect zero-ports together unless the
-        # object has a default port set. Otherwise, read the data as defined in
-        # the docstring.
-        if type(connection[1]) is str:
-            inputObjName = connection[1]
-
-            if hasattr(self._vtkObjects[inputObjName],
-                       "default_input_port") is True:
-                inputPortIndex = self._vtkObjects[inputObjName]\
-                    .default_input_port
-            else:
-                inputPortIndex = 0
-
-            if hasattr(self._vtkObjects[outputObjName],
-                       "default_output_port") is True:
-                outputPortIndex = self._vtkObjects[outputObjName]\
-                    .default_output_port
-            else:
-                outputPortIndex = 0
-
-        else:
-            inputObjName, outputPortIndex, inputPortIndex = connection[1]
-
-        self.connect_vtk_objects(outputObjName, inputObjName,
-                                 outputPortIndex=outputPortIndex,
-                                 inputPortIndex=inputPortIndex)
-
-    # Update the mappers for the actors. This in turn ensures that all objects
-    # that are to be drawn are updated if they can be.
-    allOutputObjectNames = [zI[1] if type(zI[1]) is str else zI[1][0]
-                            for zI in pipelineDescription]
-
-    for terminusName in self._vtkTermini.keys():
-        if terminusName in allOutputObjectNames:
-            try:
-                self._vtkTermini[terminusName].Update()
-            except NameError:
-                pass
+        ports = self.connection_ports(connection)
+        self.check_connection(*ports)
+        newConnections.append(ports)
+
+    oldConnections = [self.connection_ports(connection)
+                      for connection in self._pipeline]
+
+    # Remove connections that are no longer described, unless their input port
+    # is about to be connected to something else anyway.
+    newInputPorts = set([(ports[1], ports[3]) for ports in newConnections])
+    removedConnections = [ports for ports in oldConnections
+                          if ports not in newConnections]
+    for ports in removedConnections:
+        if (ports[1], ports[3]) not in newInputPorts:
+            self.disconnect_vtk_objects(*ports)
+
+    # Make the connections that are new.
+    addedConnections = [ports for ports in newConnections
+                        if ports not in oldConnections]
+    for ports in addedConnections:
+        self.connect_vtk_objects(*ports)
+
+    # Update the objects downstream of the inputs that changed. Updating a
+    # terminus updates its mapper, which in turn ensures that all objects that
+    # are to be drawn are updated if they can be.
+    self._pipelineGraph.set_connections(newConnections)
+    if update is True:
+        self._pipelineGraph.update()
 
     # Save the pipeline dict since we finished successfully.
-    self._pipeline = pipelineDescription
+    self._pipeline = list(pipelineDescription)
 
 
 def check_connection(self, outputObjectName, inputObjectName,
@@ -306,7 +289,67 @@ def connect_vtk_objects(self, outputObjectName, inputObjectName,
                                                          outPort)
 
 
-def draw_pipeline_graphviz(self, directory=None, name=None):
+def connection_ports(self, connection):
+    """
+    Works out the objects and ports connected by an element of a pipeline
+    description (see build_pipeline_from_dict).
+
+    Arguments:
+
+      - connection: Iterable object containing either two strings denoting the
+          names of objects to connect together, or a string and another
+          iterable object of the input object name, the output port and the
+          input port.
+
+    Returns a tuple containing the name of the output object, the name of the
+    input object, the output port index, and the input port index.
+    """
+
+    outputObjName = connection[0]
+
+    # If value is a string, we connect zero-ports together unless the object
+    # has a default port set. Otherwise, read the data as defined in the
+    # docstring.
+    if isinstance(connection[1], basestring):
+        inputObjName = connection[1]
+        self.check_connection(outputObjName, inputObjName)
+        inputPortIndex = getattr(self._vtkObjects[inputObjName],
+                                 "default_input_port", 0)
+        outputPortIndex = getattr(self._vtkObjects[outputObjName],
+                                  "default_output_port", 0)
+
+    else:
+        inputObjName, outputPortIndex, inputPortIndex = connection[1]
+
+    return outputObjName, inputObjName, outputPortIndex, inputPortIndex
+
+
+def disconnect_vtk_objects(self, outputObjectName, inputObjectName,
+                           outputPortIndex=0, inputPortIndex=0):
+    """
+    Disconnects two VTK objects that are managed by this visualisation instance
+    and were connected with connect_vtk_objects. Ports in the pipeline hold
+    one connection each, so this clears the input port of the input object.
+
+    Arguments:
+
+      - outputObjectName: String denoting the name of the object to get the
+          output port of.
+      - inputObjectName: As above for the input object.
+      - outputPortIndex: Integer denoting the output port of the object to
+          disconnect. For objects with only one outputPort, this should be
+          zero.
+      - inputPortIndex: As above for the input object.
+
+    Returns nothing.
+    """
+    self.check_connection(outputObjectName, inputObjectName,
+                          outputPortIndex=outputPortIndex,
+                          inputPortIndex=inputPortIndex)
+    self._vtkObjects[inputObjectName].SetInputConnection(inputPortIndex, None)
+
+
+def draw_pipeline_graphviz(self, directory=None, name=None, profile=False):
     """
     Render the current pipeline of objects using graphviz as a PDF.
 
@@ -314,9 +357,62 @@ def draw_pipeline_graphviz(self, directory=None, name=None):
 
       - directory: String denoting directory to save the render render to.
       - name: String denoting name of the PDF output (without extension).
+      - profile: Boolean denoting whether or not to annotate the objects with
+          the results of the profiler started by start_profiling (see
+          pipeline_graphviz). If True, the results are also written to a JSON
+          file in the same directory, named as the PDF with a ".json"
+          extension in place of ".gv.pdf" (see save_pipeline_profile).
 
     Returns nothing.
     """
+    graph = self.pipeline_graphviz(directory=directory, name=name,
+                                   profile=profile)
+
+    # Export the profile alongside the graph.
+    if profile is True:
+        self.save_pipeline_profile(os.path.join(
+            directory if directory is not None else "",
+            "{}.json".format(graph.name)))
+
+    # Draw the graph.
+    graph.render(cleanup=True)
+
+
+def get_pipeline_graph(self):
+    """
+    Return the graph describing the pipeline of this visualisation. Useful for
+    tooling that wants to know how objects are connected, what order they
+    execute in, or which of them will be re-executed by the next update.
+
+    Returns a graph.PipelineGraph object.
+    """
+    return self._pipelineGraph
+
+
+def pipeline_graphviz(self, directory=None, name=None, profile=False):
+    """
+    Describe the current pipeline of objects as a graphviz graph, without
+    rendering it.
+
+    If profile is True, each object is annotated with the time of its last
+    execution, the memory used by its output, and its point and cell counts,
+    as recorded by the profiler started by start_profiling (see
+    pipeline_profile). Objects are coloured as a heat map of their last
+    execution time, from pale yellow for the fastest to dark red for the
+    slowest, so that the branch of the pipeline to blame for a slow render
+    stands out. Work done outside the pipeline, such as rendering and writing
+    images, is drawn as boxes on the same scale.
+
+    Arguments:
+
+      - directory: String denoting directory to save renders of the graph to.
+      - name: String denoting name of the graph, which names the PDF output of
+          renders (without extension).
+      - profile: Boolean denoting whether or not to annotate the objects with
+          the results of the profiler.
+
+    Returns a graphviz.Digraph object.
+    """
     import graphviz
 
     graph = graphviz.Digraph(name=name if name is not None else
@@ -324,14 +420,52 @@ def draw_pipeline_graphviz(self, directory=None, name=None):
                              directory=directory)
 
     # Build nodes.
-    for objectName in self._vtkObjects.iterkeys():
-        graph.node(objectName)
+    if profile is False:
+        for objectName in self._vtkObjects.iterkeys():
+            graph.node(objectName)
+
+    # Build nodes annotated with their profiles, including boxes for work done
+    # outside the pipeline.
+    else:
+        if self._profiler is None:
+            raise RuntimeError("Profiling has not been started for "
+                               "visualisation \"{}\", so there is nothing to "
+                               "annotate the pipeline with.".format(self.name))
+        pipelineProfile = self.pipeline_profile()
+        records = [(label, record, "ellipse") for label, record in
+                   pipelineProfile["nodes"].iteritems()] +\
+                  [(label, record, "box") for label, record in
+                   pipelineProfile["stages"].iteritems()]
+        slowestTime = max([record["last time"] for _, record, _ in records] +
+                          [0.])
+        heatMap = matplotlib.cm.get_cmap("YlOrRd")
+
+        for label, record, shape in records:
+            if record["executions"] == 0 and\
+               all(part["executions"] == 0
+                   for part in record.get("parts", {}).itervalues()):
+                lines = [label, "not executed"]
+                heat = 0.
+            else:
+                lines = [label,
+                         "last time: {:.3f} ms"
+                         .format(record["last time"] * 1e3),
+                         "memory: {}".format(
+                             profiling.format_bytes(record["bytes"])),
+                         "points: {}, cells: {}"
+                         .format(record["points"], record["cells"])]
+                heat = record["last time"] / slowestTime\
+                    if slowestTime > 0 else 0.
+            graph.node(label, label="\n".join(lines), shape=shape,
+                       style="filled",
+                       fillcolor=matplotlib.colors.rgb2hex(heatMap(heat)),
+                       fontcolor="white" if heat > 0.6 else "black")
 
     # Build edges.
     for connection in self._pipeline:
         inputName = connection[0]
 
-        if type(connection[1]) is str:
+        if isinstance(connection[1], basestring):
             outputName = connection[1]
 
         else:
@@ -339,5 +473,54 @@ def draw_pipeline_graphviz(self, directory=None, name=None):
 
         graph.edge(inputName, outputName)
 
-    # Draw the graph.
-    graph.render(cleanup=True)
+    return graph
+
+
+def remove_connection(self, outputObjectName, inputObjectName,
+                      outputPortIndex=None, inputPortIndex=None, update=True):
+    """
+    Disconnects two objects in the pipeline of this visualisation instance,
+    and removes the connection from the pipeline description.
+
+    Arguments:
+
+      - outputObjectName: String denoting the name of the object to get the
+          output port of.
+      - inputObjectName: As above for the input object.
+      - outputPortIndex: Integer denoting the output port of the connection to
+          remove. If None, connections from any output port are removed.
+      - inputPortIndex: As above for the input object.
+      - update: Boolean denoting whether or not to update the termini
+          downstream of the input object, as in build_pipeline_from_dict.
+
+    Returns nothing, but will raise an error if the objects are not connected.
+    """
+
+    def matches(ports):
+        return ports[0] == outputObjectName and\
+            ports[1] == inputObjectName and\
+            outputPortIndex in [None, ports[2]] and\
+            inputPortIndex in [None, ports[3]]
+
+    pipelineDescription = [connection for connection in self._pipeline
+                           if not matches(self.connection_ports(connection))]
+    if len(pipelineDescription) == len(self._pipeline):
+        raise ValueError("Object \"{}\" is not connected to object \"{}\" in "
+                         "the pipeline.".format(outputObjectName,
+                                                inputObjectName))
+    self.build_pipeline_from_dict(pipelineDescription, update=update)
+
+
+def update_pipeline(self):
+    """
+    Update the objects in the pipeline of this visualisation that are stale,
+    that is those modified since they were last updated and those downstream
+    of them. Each stale object is executed once, and objects that are up to
+    date are left alone. Call this after modifying objects in the pipeline,
+    for example changing the filename of a reader, to update everything that
+    will be drawn before rendering.
+
+    Returns a list of the names of the objects that were updated. Objects
+    upstream of them are updated too.
+    """
+    return self._pipelineGraph.update()
@@ -0,0 +1,456 @@
+# This source file defines an opt-in profiler for the visualisation class,
+# which records where the time goes when a visualisation is updated and
+# rendered.
+
+import collections
+import contextlib
+import json
+import threading
+import time
+import weakref
+
+import chagu.helpers as helpers
+import chagu.termini as termini
+
+
+class PipelineProfiler(object):
+    """
+    This class records how many times objects in a pipeline execute, how long
+    each execution takes, and how large their output is.
+
+    VTK objects are profiled by observing their "StartEvent", "EndEvent" and
+    "ProgressEvent" events, which VTK algorithms invoke when they execute,
+    mappers invoke when they draw, and renderers invoke when they render (see
+    notes/observer_example.py). Other work, such as writing images, can be
+    profiled with the stage method.
+
+    Times are wall times, and are exclusive: if a profiled object executes
+    while another is executing, as when a mapper updates its input before
+    drawing it, its time is not counted towards the other. The size recorded
+    is the size of the output of the last execution. Objects without outputs,
+    such as mappers, record the size of the data they draw instead.
+
+    Records are dictionaries keyed by label, with keys:
+
+      - "executions": Integer denoting the number of executions.
+      - "total time": Float denoting the time spent executing in seconds.
+      - "last time": As above, for the last execution only.
+      - "points": Integer denoting the number of points output.
+      - "cells": Integer denoting the number of cells output.
+      - "bytes": Integer denoting the memory used by the output in bytes.
+      - "progress": Float between zero and one denoting the progress of the
+          last execution, as last reported by the object.
+    """
+    def __init__(self):
+        self.enabled = True
+        self.records = collections.OrderedDict()
+        self._labels = {}  # Maps ids of profiled VTK objects to their labels.
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._observers = []  # Pairs of VTK objects and observer tags.
+
+    def attach(self, label, vtkObject):
+        """
+        Profile a VTK object, recording its executions under a label. Objects
+        that are already profiled, and objects that cannot be observed, are
+        left alone.
+
+        Returns True if the object is now profiled under this label, and False
+        otherwise.
+        """
+        if id(vtkObject) in self._labels or\
+           hasattr(vtkObject, "AddObserver") is False:
+            return False
+        self._labels[id(vtkObject)] = label
+
+        # The observer only holds a weak reference to this profiler. VTK
+        # objects hold their observers, so a strong reference would tie this
+        # profiler and the objects it profiles into a cycle that the garbage
+        # collector cannot see, which crashes when Python algorithms in it
+        # are destroyed.
+        profilerReference = weakref.ref(self)
+
+        def observe(observedObject, eventName):
+            profiler = profilerReference()
+            if profiler is not None:
+                profiler._observe(observedObject, eventName)
+
+        for eventName in ["StartEvent", "EndEvent", "ProgressEvent"]:
+            self._observers.append(
+                (vtkObject, vtkObject.AddObserver(eventName, observe)))
+        return True
+
+    def detach(self):
+        """
+        Stop profiling all objects, removing the observers added to them.
+        Records are kept.
+        """
+        for vtkObject, observerTag in self._observers:
+            vtkObject.RemoveObserver(observerTag)
+        self._observers = []
+        self._labels = {}
+        self.enabled = False
+
+    def is_attached(self, vtkObject):
+        """
+        Returns True if a VTK object is profiled, and False otherwise.
+        """
+        return id(vtkObject) in self._labels
+
+    def labels(self):
+        """
+        Returns a list of the labels of profiled VTK objects.
+        """
+        return self._labels.values()
+
+    @contextlib.contextmanager
+    def stage(self, label):
+        """
+        Profile the code executed in a with block under a label. This is
+        useful for work that is not done by VTK objects.
+        """
+        self._start(label)
+        try:
+            yield
+        finally:
+            self._end(label, 0, 0, 0)
+
+    def record(self, label, wallTime, points=0, cells=0, numberOfBytes=0):
+        """
+        Record an execution under a label.
+
+        Arguments:
+
+          - label: String denoting what was executed.
+          - wallTime: Float denoting how long the execution took in seconds.
+          - points: Integer denoting the number of points output.
+          - cells: Integer denoting the number of cells output.
+          - numberOfBytes: Integer denoting the memory used by the output in
+              bytes.
+
+        Returns nothing.
+        """
+        with self._lock:
+            entry = self._entry(label)
+            entry["executions"] += 1
+            entry["total time"] += wallTime
+            entry["last time"] = wallTime
+            entry["points"] = points
+            entry["cells"] = cells
+            entry["bytes"] = numberOfBytes
+
+    def results(self):
+        """
+        Returns an ordered dictionary mapping labels to copies of their
+        records, in the order they first executed.
+        """
+        with self._lock:
+            return collections.OrderedDict(
+                (label, dict(entry)) for label, entry in self.records.items())
+
+    def table(self):
+        """
+        Returns a string tabulating the records, slowest first.
+        """
+        rows = sorted(self.results().items(),
+                      key=lambda item: item[1]["total time"], reverse=True)
+        labelWidth = max([len("Name")] + [len(label) for label, _ in rows])
+        rowFormat = "{:<" + str(labelWidth) + "} {:>10} {:>12} {:>12} "\
+                    "{:>10} {:>10} {:>12}"
+        lines = [rowFormat.format("Name", "Executions", "Total (s)",
+                                  "Last (s)", "Points", "Cells", "Bytes")]
+        for label, entry in rows:
+            lines.append(rowFormat.format(
+                label, entry["executions"],
+                "{:.6f}".format(entry["total time"]),
+                "{:.6f}".format(entry["last time"]),
+                entry["points"], entry["cells"], entry["bytes"]))
+        return "\n".join(lines)
+
+    def _entry(self, label):
+        if label not in self.records:
+            self.records[label] = {"executions": 0, "total time": 0.,
+                                   "last time": 0., "points": 0, "cells": 0,
+                                   "bytes": 0, "progress": 0.}
+        return self.records[label]
+
+    def _stack(self):
+        # Executions in progress on this thread, innermost last. Each is a
+        # list of the label, the start time, and the time spent in nested
+        # executions.
+        if hasattr(self._local, "stack") is False:
+            self._local.stack = []
+        return self._local.stack
+
+    def _start(self, label):
+        self._stack().append([label, time.time(), 0.])
+
+    def _end(self, label, points, cells, numberOfBytes):
+        endTime = time.time()
+        stack = self._stack()
+
+        # Find the execution that is ending. Executions nested inside it that
+        # did not report their end are discarded.
+        startIndices = [zI for zI in xrange(len(stack))
+                        if stack[zI][0] == label]
+        if len(startIndices) == 0:
+            return
+        startTime, nestedTime = stack[startIndices[-1]][1:]
+        del stack[startIndices[-1]:]
+
+        wallTime = endTime - startTime
+        if len(stack) > 0:
+            stack[-1][2] += wallTime
+        self.record(label, wallTime - nestedTime, points, cells,
+                    numberOfBytes)
+
+    def _observe(self, vtkObject, eventName):
+        label = self._labels.get(id(vtkObject))
+        if label is None:
+            return
+        if eventName == "StartEvent":
+            self._start(label)
+        elif eventName == "EndEvent":
+            self._end(label, *output_size(vtkObject))
+        elif eventName == "ProgressEvent":
+            with self._lock:
+                self._entry(label)["progress"] = vtkObject.GetProgress()
+
+
+def format_bytes(numberOfBytes):
+    """
+    Returns a string describing a number of bytes in the largest binary unit
+    it reaches, such as "6.2 MiB".
+    """
+    for unit in ["B", "KiB", "MiB", "GiB"]:
+        if abs(numberOfBytes) < 1024 or unit == "GiB":
+            break
+        numberOfBytes /= 1024.
+    return "{:.1f} {}".format(numberOfBytes, unit) if unit != "B" else\
+        "{} B".format(numberOfBytes)
+
+
+def output_size(vtkObject):
+    """
+    Measure the data produced by a VTK object. For objects without output
+    ports, such as mappers, the data connected to their first input port is
+    measured instead.
+
+    Arguments:
+
+      - vtkObject: VTK object to measure the output of.
+
+    Returns, in order, the number of points, the number of cells, and the
+    memory used in bytes. Objects without data have zero size.
+    """
+    dataObjects = []
+    if hasattr(vtkObject, "GetNumberOfOutputPorts") is True:
+        if vtkObject.GetNumberOfOutputPorts() > 0:
+            dataObjects = [vtkObject.GetOutputDataObject(port)
+                           for port in
+                           xrange(vtkObject.GetNumberOfOutputPorts())]
+        elif vtkObject.GetNumberOfInputPorts() > 0 and\
+                vtkObject.GetNumberOfInputConnections(0) > 0:
+            dataObjects = [vtkObject.GetInputDataObject(0, 0)]
+
+    points, cells, numberOfBytes = 0, 0, 0
+    for dataObject in dataObjects:
+        if dataObject is None:
+            continue
+        if hasattr(dataObject, "GetNumberOfPoints") is True:
+            points += dataObject.GetNumberOfPoints()
+        if hasattr(dataObject, "GetNumberOfCells") is True:
+            cells += dataObject.GetNumberOfCells()
+        numberOfBytes += dataObject.GetActualMemorySize() * 1024
+    return points, cells, numberOfBytes
+
+
+def pipeline_profile(self):
+    """
+    Collect the records of the profiler started by start_profiling for each
+    object in the pipeline of this visualisation.
+
+    The record of each object is as described in PipelineProfiler. Termini
+    combine the records of the objects inside them (see profile_object): their
+    times are the sums of the times of their parts, which are also listed
+    under the "parts" key, and their sizes are those of the data their mapper
+    draws. Objects that have not executed have zero time and size. Records
+    that do not belong to tracked objects, such as those of the renderer and
+    the writing of PNG images, are listed as stages.
+
+    Returns a dictionary with keys:
+
+      - "nodes": Ordered dictionary mapping the names of tracked objects, in
+          the order they were tracked, to their records.
+      - "edges": List of connections in the pipeline, each a list of the
+          output object name, the input object name, the output port index,
+          and the input port index.
+      - "stages": Ordered dictionary mapping the labels of other records to
+          the records.
+    """
+    results = self.profile_results()
+    emptyRecord = PipelineProfiler()._entry("")
+
+    nodes = collections.OrderedDict()
+    for objectName in self._order:
+        record = dict(results.pop(objectName, emptyRecord))
+        partPrefix = "{}/".format(objectName)
+        record["parts"] = collections.OrderedDict(
+            (label, results.pop(label)) for label in results.keys()
+            if label.startswith(partPrefix))
+        for part in record["parts"].itervalues():
+            record["total time"] += part["total time"]
+            record["last time"] += part["last time"]
+        nodes[objectName] = record
+
+    return {"nodes": nodes,
+            "edges": [list(self.connection_ports(connection))
+                      for connection in self._pipeline],
+            "stages": results}
+
+
+def profile_object(self, objectName):
+    """
+    Profile an object tracked by this visualisation with the profiler started
+    by start_profiling.
+
+    Objects are profiled under their name. Termini are profiled as their
+    mapper, and the VTK objects inside them that feed their mapper, such as
+    masks, are profiled as "<name>/<class name>".
+
+    Arguments:
+
+      - objectName: String denoting the name of the object to profile.
+
+    Returns nothing.
+    """
+    if self._profiler is None or self._profiler.enabled is False:
+        raise RuntimeError("Profiling has not been started for visualisation "
+                           "\"{}\".".format(self.name))
+    vtkObject = self.get_vtk_object(objectName)
+    if isinstance(vtkObject, termini.Terminus) is False:
+        self._profiler.attach(objectName, vtkObject)
+        return
+
+    mapper = vtkObject.actor.GetMapper()
+    if mapper is None:
+        return
+    self._profiler.attach(objectName, mapper)
+
+    # Walk upstream from the mapper, and from each level of detail the mapper
+    # can draw from, until we find the end object of the terminus. Objects
+    # tracked in their own right are left to be profiled under their own name.
+    trackedObjects = set(self._vtkObjects.values())
+    toVisit = [mapper]
+    if hasattr(vtkObject, "level_of_detail") is True:
+        toVisit.extend(vtkObject.level_of_detail.maskFilters)
+    visited = set()
+    while len(toVisit) > 0:
+        algorithm = toVisit.pop()
+        if algorithm in visited or algorithm in trackedObjects:
+            continue
+        visited.add(algorithm)
+        if algorithm is not mapper:
+            label = helpers.generate_sensible_name(
+                "{}/{}".format(objectName, type(algorithm).__name__),
+                lambda name: name in self._profiler.labels())
+            self._profiler.attach(label, algorithm)
+        if algorithm is vtkObject.vtkEndObject:
+            continue
+        for port in xrange(algorithm.GetNumberOfInputPorts()):
+            for index in xrange(algorithm.GetNumberOfInputConnections(port)):
+                toVisit.append(algorithm.GetInputConnection(port, index)
+                               .GetProducer())
+
+
+def profile_results(self):
+    """
+    Return the records of the profiler started by start_profiling. See
+    PipelineProfiler for a description of the records.
+
+    Returns an ordered dictionary mapping the names of profiled objects, and
+    stages such as "png writer", to dictionaries describing their executions.
+    """
+    if self._profiler is None:
+        return collections.OrderedDict()
+    return self._profiler.results()
+
+
+def profile_table(self):
+    """
+    Return the records of the profiler started by start_profiling as a table
+    that can be printed, with the slowest objects first.
+
+    Returns a string.
+    """
+    if self._profiler is None:
+        return PipelineProfiler().table()
+    return self._profiler.table()
+
+
+def save_pipeline_profile(self, filePath):
+    """
+    Write the records of the profiler started by start_profiling, collected
+    by pipeline_profile, to a JSON file.
+
+    Arguments:
+
+      - filePath: String denoting the path of the file to write.
+
+    Returns nothing.
+    """
+    with open(filePath, "w") as jsonFile:
+        json.dump(self.pipeline_profile(), jsonFile, indent=2)
+
+
+def stage(profiler, label):
+    """
+    Profile the code executed in a with block under a label with a profiler,
+    if profiling is enabled.
+
+    Arguments:
+
+      - profiler: PipelineProfiler instance, or None.
+      - label: String denoting what is executed.
+
+    Returns a context manager.
+    """
+    if profiler is None or profiler.enabled is False:
+        return _no_stage()
+    return profiler.stage(label)
+
+
+@contextlib.contextmanager
+def _no_stage():
+    yield
+
+
+def start_profiling(self):
+    """
+    Start profiling this visualisation, discarding any previous records.
+
+    Every tracked object is profiled (see profile_object), as are objects
+    tracked later, the renderer, and the writing of PNG images, which is
+    recorded as "png writer". Profiling adds a little work to each execution,
+    so it is best stopped with stop_profiling when it is no longer needed.
+
+    Returns nothing.
+    """
+    if self._profiler is not None:
+        self._profiler.detach()
+    self._profiler = PipelineProfiler()
+    for objectName in self._order:
+        self.profile_object(objectName)
+    if self._renderer is not None:
+        self._profiler.attach("renderer", self._renderer)
+
+
+def stop_profiling(self):
+    """
+    Stop profiling this visualisation. Records are kept until profiling is
+    started again.
+
+    Returns nothing.
+    """
+    if self._profiler is not None:
+        self._profiler.detach()
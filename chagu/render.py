@@ -2,8 +2,17 @@
 # create renderers and other such objects and attach them to the VTK pipeline
 # specified by the visualisation object calling them.
 
+import multiprocessing
 import numpy as np
+import os
+import Queue
+import threading
 import vtk
+from vtk.util import numpy_support
+
+import chagu.helpers as helpers
+import chagu.profiling as profiling
+import chagu.sources as sources
 
 
 def build_renderer_and_window(self):
@@ -15,6 +24,12 @@ def build_renderer_and_window(self):
     function internally, so you should not need to call this function directly
     if you are using those to render your visualisation.
 
+    The renderer and render window are kept by the visualisation object, and
+    are reused by subsequent calls so that a new rendering context is not
+    created for every image. Each call refreshes the actors, background,
+    camera, and window size from the properties of the visualisation. Call
+    release_renderer_and_window to dispose of them.
+
     This function will autopipe if no pipeline has been created.
 
     Returns, in order, a vtkRenderer instance and a vtkRenderWindow instance.
@@ -34,13 +49,34 @@ def build_renderer_and_window(self):
     if self._pipeline == []:
         self.autopipe()
 
-    # Build the renderer, and add all the actors that this visualisation object
-    # is looking after.
-    renderer = vtk.vtkRenderer()
+    # Build the renderer and render window if we don't have them already.
+    if self._renderWindow is None:
+        self._renderer = vtk.vtkRenderer()
+        self._renderWindow = vtk.vtkRenderWindow()
+        self._renderWindow.AddRenderer(self._renderer)
+    renderer = self._renderer
+    renderWindow = self._renderWindow
+
+    # Profile the renderer if this visualisation is being profiled.
+    if self._profiler is not None and self._profiler.enabled is True:
+        self._profiler.attach("renderer", renderer)
+
+    # Add all the actors that this visualisation object is looking after,
+    # replacing any that were there before.
+    renderer.RemoveAllViewProps()
     for terminus in self._vtkTermini.itervalues():
         renderer.AddActor(terminus.actor)
     renderer.SetBackground(*self._background)
 
+    # Glyph termini with levels of detail choose what to draw each time the
+    # scene is drawn.
+    for observerTag in self._levelOfDetailObservers:
+        renderer.RemoveObserver(observerTag)
+    self._levelOfDetailObservers = [
+        renderer.AddObserver("StartEvent", terminus.level_of_detail)
+        for terminus in self._vtkTermini.itervalues()
+        if hasattr(terminus, "level_of_detail") is True]
+
     # Now we manipulate the camera. Add defaults to values that have not been
     # defined. Defaults are defined here. The default is to look down on the
     # centre of the domain along the "z-axis".
@@ -69,6 +105,9 @@ def build_renderer_and_window(self):
                 value = 1
             self._camera[key] = value
 
+    # Use a new camera each time, otherwise zooming would accumulate between
+    # calls.
+    renderer.SetActiveCamera(None)
     camera = renderer.GetActiveCamera()
     camera.SetFocalPoint(*self._camera["focal point"])
     camera.SetParallelProjection(self._camera["parallel projection"])
@@ -76,35 +115,65 @@ def build_renderer_and_window(self):
     camera.SetViewUp(*self._camera["view up"])
     camera.Zoom(self._camera["zoom"])
 
-    renderWindow = vtk.vtkRenderWindow()
-    renderWindow.AddRenderer(renderer)
     renderWindow.SetSize(*self._windowSize)
 
     return renderer, renderWindow
 
 
-def save_snapshot(renderWindow, imageFilename):
+def release_renderer_and_window(self):
+    """
+    Dispose of the vtkRenderer and vtkRenderWindow objects kept by this
+    visualisation, if any. The next call to build_renderer_and_window creates
+    new ones.
+
+    Returns nothing.
+    """
+    if self._renderWindow is not None:
+        self._renderWindow.Finalize()
+    self._levelOfDetailObservers = []
+    self._renderer = None
+    self._renderWindow = None
+
+
+def save_snapshot(renderWindow, imageFilename, snapshotWriter=None,
+                  compressionLevel=5, profiler=None):
     """
     Save a rendered vtkRenderWindow to a file.
 
     Create a vtkWindowToImageFilter and vtkImageWriter to save a render window.
+    If a SnapshotWriter is passed, PNG images are instead copied from the
+    framebuffer and handed to the writer, which compresses and writes them in
+    the background. The writer must be flushed before the images are used.
 
     Arguments:
       - renderWindow: Rendered vtkRenderWindow instance to save a snapshot of.
       - imageFilename: String to save output file to.
+      - snapshotWriter: SnapshotWriter instance to write PNG images with, or
+          None to write them before returning.
+      - compressionLevel: Integer between 0 and 9 denoting the zlib
+          compression level of PNG images. Higher levels produce smaller files
+          more slowly.
+      - profiler: PipelineProfiler instance to record the writing of PNG
+          images with as "png writer", or None.
 
     Returns nothing.
     """
     extension = imageFilename.split(".")[-1]
 
-    if extension == "png":
+    if extension == "png" and snapshotWriter is not None:
+        snapshotWriter.submit(framebuffer_to_array(renderWindow),
+                              imageFilename, compressionLevel,
+                              profiler=profiler)
+    elif extension == "png":
         im = vtk.vtkWindowToImageFilter()
         im.SetInput(renderWindow)
 
         writer = vtk.vtkPNGWriter()
+        writer.SetCompressionLevel(compressionLevel)
         writer.SetInputConnection(im.GetOutputPort())
         writer.SetFileName(imageFilename)
-        writer.Write()
+        with profiling.stage(profiler, "png writer"):
+            writer.Write()
     elif extension in ["ps", "pdf", "eps"]:
         writer = vtk.vtkGL2PSExporter()
         writer.SetRenderWindow(renderWindow)
@@ -120,15 +189,182 @@ def save_snapshot(renderWindow, imageFilename):
         raise NotImplementedError
 
 
+def framebuffer_to_array(renderWindow, alpha=False):
+    """
+    Get the framebuffer of a rendered vtkRenderWindow as a numpy array.
+
+    The array is a view of the image produced by a new vtkWindowToImageFilter,
+    so no copy is made. The array keeps the image data alive, and is not
+    changed by later renders.
+
+    Arguments:
+      - renderWindow: Rendered vtkRenderWindow instance to get the framebuffer
+          of.
+      - alpha: Boolean denoting whether or not to include the alpha channel.
+
+    Returns a numpy array of unsigned bytes with shape (height, width, 3), or
+    (height, width, 4) if alpha is True, where the first row is the top of the
+    image.
+    """
+    im = vtk.vtkWindowToImageFilter()
+    im.SetInput(renderWindow)
+    im.ShouldRerenderOff()
+    if alpha is True:
+        im.SetInputBufferTypeToRGBA()
+    im.Update()
+    image = im.GetOutput()
+
+    width, height = image.GetDimensions()[:2]
+    pixels = numpy_support.vtk_to_numpy(image.GetPointData().GetScalars())
+
+    # VTK images start from the bottom row, so flip them.
+    return pixels.reshape(height, width, -1)[::-1]
+
+
+def write_png(imageArray, imageFilename, compressionLevel=5):
+    """
+    Write an image held in a numpy array to a PNG file with a vtkPNGWriter.
+
+    Arguments:
+      - imageArray: Numpy array of unsigned bytes with shape (height, width,
+          components) or (height, width), where the first row is the top of
+          the image. Images with one to four components are written as grey,
+          grey-alpha, RGB, and RGBA images respectively.
+      - imageFilename: String to save output file to.
+      - compressionLevel: Integer between 0 and 9 denoting the zlib
+          compression level.
+
+    Returns nothing, or raises an IOError if the file could not be written.
+    """
+    imageArray = np.asarray(imageArray, dtype=np.uint8)
+    if imageArray.ndim == 2:
+        imageArray = imageArray[:, :, np.newaxis]
+    height, width, components = imageArray.shape
+    if components not in xrange(1, 5):
+        raise ValueError("Images with {} components cannot be written as PNG "
+                         "files.".format(components))
+
+    # VTK images start from the bottom row, so flip them. The importer reads
+    # from the flipped array, which is kept alive until the image is written.
+    flippedArray = np.ascontiguousarray(imageArray[::-1])
+    importer = vtk.vtkImageImport()
+    importer.SetImportVoidPointer(flippedArray)
+    importer.SetDataScalarTypeToUnsignedChar()
+    importer.SetNumberOfScalarComponents(components)
+    importer.SetWholeExtent(0, width - 1, 0, height - 1, 0, 0)
+    importer.SetDataExtentToWholeExtent()
+
+    writer = vtk.vtkPNGWriter()
+    writer.SetCompressionLevel(compressionLevel)
+    writer.SetInputConnection(importer.GetOutputPort())
+    writer.SetFileName(imageFilename)
+    writer.Write()
+    if writer.GetErrorCode() != 0:
+        raise IOError("Could not write image \"{}\" ({})."
+                      .format(imageFilename,
+                              vtk.vtkErrorCode.GetStringFromErrorCode(
+                                  writer.GetErrorCode())))
+
+
+class SnapshotWriter(object):
+    """
+    This class writes images to PNG files using a pool of background threads,
+    so that rendering can continue while earlier images are compressed and
+    written to disk.
+
+    Images are submitted to a bounded queue. If the queue is full, submitting
+    blocks until a thread has taken an image from it, which limits the memory
+    used by images waiting to be written. Call flush to wait for all submitted
+    images to be written, and close when the writer is no longer needed.
+
+    Initialisation arguments:
+
+      - threads: Integer denoting the number of threads to write with.
+      - maximumQueueSize: Integer denoting the number of images that can wait
+          to be written before submit blocks.
+    """
+
+    def __init__(self, threads=2, maximumQueueSize=8):
+        self._errors = []
+        self._queue = Queue.Queue(maxsize=maximumQueueSize)
+        self._threads = []
+        for zI in xrange(threads):
+            thread = threading.Thread(target=self._work)
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def _work(self):
+        """
+        Write images from the queue until None is taken from it.
+        """
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                with profiling.stage(job[3], "png writer"):
+                    write_png(*job[:3])
+            except Exception as error:
+                self._errors.append(error)
+            finally:
+                self._queue.task_done()
+
+    def submit(self, imageArray, imageFilename, compressionLevel=5,
+               profiler=None):
+        """
+        Queue an image to be written. Arguments are as write_png, and the
+        writing is recorded by profiler as "png writer" if it is not None. The
+        array should not be modified after it has been submitted.
+        """
+        if len(self._threads) == 0:
+            raise RuntimeError("Cannot submit images to a closed "
+                               "SnapshotWriter.")
+        self._queue.put((imageArray, imageFilename, compressionLevel,
+                         profiler))
+
+    def flush(self):
+        """
+        Wait for all submitted images to be written. Raises the first error
+        encountered while writing, if any.
+        """
+        self._queue.join()
+        if len(self._errors) != 0:
+            error = self._errors[0]
+            self._errors = []
+            raise error
+
+    def close(self):
+        """
+        Write all submitted images, and stop the threads.
+        """
+        for thread in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        self.flush()
+
+
 def visualise_animate_rotate(self, imageStackName, offscreenRendering=True,
                              rotation_resolution=360, verbose=True,
-                             xyMax=None, zMax=None):
+                             xyMax=None, zMax=None, processes=1,
+                             compressionLevel=5):
     """
     Create a stack of images by rotating a camera around a scene. This stack of
     images can be used by avconv or similar to create an animation. This
     visualisation commandeers the camera, and so does not use settings defined
     by self._camera.
 
+    Frames can be rendered in parallel by a number of worker processes. Each
+    worker is forked from this process, and so holds its own copy of the
+    pipeline and its own render window. Frames are distributed between the
+    workers in a round-robin fashion. This requires os.fork, and so is not
+    supported on Windows.
+
+    Images are compressed and written by a SnapshotWriter while later frames
+    are rendered. All images have been written when this function returns.
+
     Arguments:
 
       - imageStackName: A string used as the prefix for the output image
@@ -140,9 +376,110 @@ def visualise_animate_rotate(self, imageStackName, offscreenRendering=True,
       - xyMax: Float determining the distance in the xy plane of the camera
           from x, y = 0, 0, or None.
       - zMax: Float determining camera elevation, or None.
+      - processes: Integer denoting the number of worker processes to render
+          frames with. If this is one, frames are rendered in this process.
+      - compressionLevel: Integer between 0 and 9 denoting the zlib
+          compression level of the images.
+
+    Returns nothing.
+    """
+    if processes < 1:
+        raise ValueError("Number of processes ({}) must be at least one."
+                         .format(processes))
+    if processes > 1 and hasattr(os, "fork") is False:
+        raise NotImplementedError("Rendering frames with multiple processes "
+                                  "requires os.fork, which this platform "
+                                  "does not have.")
+
+    # Build the pipeline here, so that the workers don't each have to.
+    self.build_renderer_and_window()
+
+    # Render every frame in this process if we're not parallelising.
+    if processes == 1:
+        render_rotation_frames(self, imageStackName, offscreenRendering,
+                               rotation_resolution, verbose, xyMax, zMax,
+                               xrange(rotation_resolution), compressionLevel)
+        return
+
+    # Otherwise, each worker renders every processes-th frame. The render
+    # window of this process is released first so that no rendering context
+    # is shared with the workers.
+    self.release_renderer_and_window()
+    workers = []
+    for zI in xrange(min(processes, rotation_resolution)):
+        worker = multiprocessing.Process(
+            target=render_rotation_frames,
+            args=(self, imageStackName, offscreenRendering,
+                  rotation_resolution, verbose, xyMax, zMax,
+                  xrange(zI, rotation_resolution, processes),
+                  compressionLevel))
+        worker.start()
+        workers.append(worker)
+
+    for worker in workers:
+        worker.join()
+
+    failures = [worker.exitcode for worker in workers if worker.exitcode != 0]
+    if len(failures) != 0:
+        raise RuntimeError("{} of {} worker processes failed to render their "
+                           "frames (exit codes {})."
+                           .format(len(failures), len(workers), failures))
+
+
+def render_rotation_frames(self, imageStackName, offscreenRendering,
+                           rotation_resolution, verbose, xyMax, zMax,
+                           frameIndices, compressionLevel):
+    """
+    Render and save a subset of the frames of the stack of images created by
+    visualise_animate_rotate. This is also the body of each worker process
+    used by that function.
+
+    Arguments:
+
+      - imageStackName, offscreenRendering, rotation_resolution, verbose,
+          xyMax, zMax, compressionLevel: As in visualise_animate_rotate.
+      - frameIndices: Iterable of integers denoting the frames to render.
 
     Returns nothing.
     """
+    # The format specifier of the output filename should vary with the
+    # resolution.
+    outSpecifier = len(str(rotation_resolution))
+
+    # Images are written in the background while the next frame renders. The
+    # writer is local because its threads don't survive forking, and is closed
+    # even if rendering fails, so that its threads stop.
+    snapshotWriter = SnapshotWriter()
+
+    try:
+        for zI, renderWindow in rotation_frames(self, rotation_resolution,
+                                                offscreenRendering, xyMax,
+                                                zMax, frameIndices, verbose):
+            outPath = "{}_{:0{}}.png".format(imageStackName, zI,
+                                             outSpecifier)
+            save_snapshot(renderWindow, outPath,
+                          snapshotWriter=snapshotWriter,
+                          compressionLevel=compressionLevel,
+                          profiler=self._profiler)
+    finally:
+        snapshotWriter.close()
+
+
+def rotation_frames(self, rotation_resolution, offscreenRendering, xyMax,
+                    zMax, frameIndices, verbose):
+    """
+    Generator that renders frames of a camera rotating around a scene, as
+    described in visualise_animate_rotate.
+
+    Arguments:
+
+      - rotation_resolution, offscreenRendering, verbose, xyMax, zMax: As in
+          visualise_animate_rotate.
+      - frameIndices: Iterable of integers denoting the frames to render.
+
+    Yields, for each frame, the index of the frame and the vtkRenderWindow it
+    has been rendered in.
+    """
     # Building the render window also populates missing parameters defining the
     # position and orientation of the camera. We use this information to create
     # a guess to fit the geometry completely into the window if xyMax and zMax
@@ -161,7 +498,7 @@ def visualise_animate_rotate(self, imageStackName, offscreenRendering=True,
     angles = np.linspace(0, np.pi * 2, rotation_resolution)
 
     # Render each frame independently.
-    for zI in xrange(rotation_resolution):
+    for zI in frameIndices:
         if verbose is True:
             print "Rendering frame {} of {}.".format(zI + 1,
                                                      rotation_resolution)
@@ -178,13 +515,9 @@ def visualise_animate_rotate(self, imageStackName, offscreenRendering=True,
         camera.SetViewUp(xUp, yUp, zUp)
 
         renderer.ResetCameraClippingRange()
+        renderWindow.Render()
 
-        # The format specifier of the output filename should vary with the
-        # resolution.
-        outSpecifier = len(str(rotation_resolution))
-        outPath = "{}_{:0{}}.png".format(imageStackName, zI, outSpecifier)
-
-        save_snapshot(renderWindow, outPath)
+        yield zI, renderWindow
 
 
 def visualise_interact(self):
@@ -210,26 +543,389 @@ def visualise_interact(self):
     print("Camera view-up: {:3.3f}, {:3.3f}, {:3.3f}".format(*camera.GetViewUp()))
     print("Camera focal point: {:3.3f}, {:3.3f}, {:3.3f}".format(*camera.GetFocalPoint()))
 
-    renderWindow.Finalize()
+    # The window has been closed, so it cannot be reused.
+    self.release_renderer_and_window()
     interactor.TerminateApp()
 
 
-def visualise_save(self, imageFilename, offscreenRendering=True):
+def visualise_rotation_frames(self, rotation_resolution=360,
+                              offscreenRendering=True, xyMax=None, zMax=None,
+                              alpha=False):
+    """
+    Generator that renders frames of a camera rotating around a scene, and
+    yields them as numpy arrays instead of saving them to files. The frames
+    are the same as those saved by visualise_animate_rotate. Each frame is
+    rendered when it is requested.
+
+    Arguments:
+
+      - rotation_resolution: Integer determining number of frames to render.
+      - offscrenRendering: Boolean denoting whether or not to render
+          offscreen.
+      - xyMax: Float determining the distance in the xy plane of the camera
+          from x, y = 0, 0, or None.
+      - zMax: Float determining camera elevation, or None.
+      - alpha: Boolean denoting whether or not to include the alpha channel.
+
+    Yields, for each frame, a numpy array as described in visualise_to_array.
+    """
+    for zI, renderWindow in rotation_frames(self, rotation_resolution,
+                                            offscreenRendering, xyMax, zMax,
+                                            xrange(rotation_resolution),
+                                            False):
+        yield framebuffer_to_array(renderWindow, alpha=alpha)
+
+
+def visualise_save(self, imageFilename, offscreenRendering=True,
+                   asynchronous=False, compressionLevel=5):
     """
     Save a visualisation to a file.
 
     Create a vtkWindowToImageFilter and vtkPNGWriter to save a render window
     created from this class. Do so using offscreen rendering if desired.
 
+    PNG images can be written asynchronously, so that a batch of images can be
+    saved without waiting for each one to be compressed. In this case, call
+    flush_snapshots after the batch to wait for the images to be written.
+
     Arguments:
 
       - imageFilename: String to save output file to.
       - offscrenRendering: Boolean denoting whether or not to render offscreen.
+      - asynchronous: Boolean denoting whether or not to return before PNG
+          images have been written.
+      - compressionLevel: Integer between 0 and 9 denoting the zlib
+          compression level of PNG images.
+
+    Returns nothing.
+    """
+    renderer, renderWindow = self.build_renderer_and_window()
+    renderer.ResetCameraClippingRange()
+    renderWindow.SetOffScreenRendering(offscreenRendering)
+    renderWindow.Render()
+
+    if asynchronous is True:
+        if self._snapshotWriter is None:
+            self._snapshotWriter = SnapshotWriter()
+        save_snapshot(renderWindow, imageFilename,
+                      snapshotWriter=self._snapshotWriter,
+                      compressionLevel=compressionLevel,
+                      profiler=self._profiler)
+    else:
+        save_snapshot(renderWindow, imageFilename,
+                      compressionLevel=compressionLevel,
+                      profiler=self._profiler)
+
+
+def flush_snapshots(self):
+    """
+    Wait for all images saved asynchronously by visualise_save to be written.
 
     Returns nothing.
     """
+    if self._snapshotWriter is not None:
+        self._snapshotWriter.close()
+        self._snapshotWriter = None
+
+
+def visualise_save_series(self, filePaths, imagePattern, readerName=None,
+                          offscreenRendering=True, verbose=True,
+                          compressionLevel=5):
+    """
+    Save a visualisation of each file in a series of data files, such as the
+    timesteps of a simulation, to a series of image files.
+
+    The pipeline is built once, and the filename of the reader is swapped
+    between frames. As such, only the parts of the pipeline that depend on the
+    reader are re-executed for each frame, and the renderer and render window
+    are reused throughout. The camera is defined from the data loaded before
+    this call, so that all frames share the same view. Each file must be
+    readable by the same reader, so they should be of the same type. PNG
+    images are written in the background while later frames are rendered, and
+    all images have been written when this function returns. Each file is
+    read once, so if the reader uses the data set cache, the files of the
+    series are not cached. A reader whose file was loaded from the data set
+    cache has no filename to swap, and is rejected.
+
+    Arguments:
+
+      - filePaths: Iterable of strings denoting the paths of the files to
+          visualise, in order.
+      - imagePattern: String denoting the path of each output image, which is
+          formatted with the index of the frame. For example,
+          "output/frame_{:04d}.png".
+      - readerName: String denoting the name of the reader object to swap the
+          filename of, or None. If None, the visualisation must track exactly
+          one reader with a filename, which is used.
+      - offscrenRendering: Boolean denoting whether or not to render
+          offscreen.
+      - verbose: Boolean determining whether or not progress is printed.
+      - compressionLevel: Integer between 0 and 9 denoting the zlib
+          compression level of PNG images.
+
+    Returns a list of strings denoting the paths of the images saved.
+    """
+    filePaths = list(filePaths)
+
+    # Find the reader whose filename we are swapping. Sources loaded from the
+    # data set cache are found too, so that they can be rejected below.
+    if readerName is None:
+        readerNames = [objectName for objectName in self._order
+                       if self.is_reader(objectName) is True and
+                       (hasattr(self.get_vtk_object(objectName),
+                                "SetFileName") is True or
+                        hasattr(self.get_vtk_object(objectName),
+                                "from_cache") is True)]
+        if len(readerNames) != 1:
+            raise RuntimeError("Visualisation \"{}\" tracks {} readers, so "
+                               "I don't know which one to swap the filename "
+                               "of. Please specify one with the readerName "
+                               "argument.".format(self.name, len(readerNames)))
+        readerName = readerNames[0]
+    elif self.is_reader(readerName) is False or\
+            (hasattr(self.get_vtk_object(readerName), "SetFileName") is False
+             and hasattr(self.get_vtk_object(readerName),
+                         "from_cache") is False):
+        raise ValueError("Object \"{}\" is not a reader tracked by "
+                         "visualisation \"{}\".".format(readerName, self.name))
+    reader = self.get_vtk_object(readerName)
+    if getattr(reader, "from_cache", False) is True:
+        raise ValueError("Object \"{}\" was loaded from the data set cache, "
+                         "so its filename cannot be swapped. Please load it "
+                         "with useCache=False to visualise a series."
+                         .format(readerName))
+
+    # Check that the files exist before rendering anything.
+    for filePath in filePaths:
+        if os.path.isfile(filePath) is False:
+            raise ValueError("File \"{}\" does not exist.".format(filePath))
+
+    # Build the pipeline and the render window once. Changing the filename of
+    # the reader marks it as modified, so updating the pipeline for each frame
+    # re-executes only the objects downstream of it, once each, before the
+    # clipping range is computed from them.
+    renderer, renderWindow = self.build_renderer_and_window()
+    renderWindow.SetOffScreenRendering(offscreenRendering)
+
+    # Stop the reader filling the data set cache with data sets that are only
+    # read once, until the series has been rendered.
+    cacheObserver = getattr(reader, "cache_observer", None)
+    if cacheObserver is not None:
+        reader.RemoveObserver(cacheObserver)
+
+    snapshotWriter = SnapshotWriter()
+    imageFilenames = []
+    try:
+        for zI, filePath in enumerate(filePaths):
+            if verbose is True:
+                print "Rendering frame {} of {}.".format(zI + 1,
+                                                         len(filePaths))
+            reader.SetFileName(filePath)
+            self.update_pipeline()
+            renderer.ResetCameraClippingRange()
+            renderWindow.Render()
+
+            imageFilename = imagePattern.format(zI)
+            save_snapshot(renderWindow, imageFilename,
+                          snapshotWriter=snapshotWriter,
+                          compressionLevel=compressionLevel,
+                          profiler=self._profiler)
+            imageFilenames.append(imageFilename)
+    finally:
+        snapshotWriter.close()
+        if cacheObserver is not None:
+            reader.cache_observer = reader.AddObserver(
+                "EndEvent", sources.cache_reader_output)
+
+    return imageFilenames
+
+
+def check_streaming_sources(self):
+    """
+    Check that every reader tracked by this visualisation can produce its
+    data set in pieces, so that it can be drawn by visualise_stream. Readers
+    of XML image data, rectilinear grids, and structured grids read only the
+    extent of the piece requested, and readers of partitioned files (see
+    load_partitioned_visualisation_toolkit_file) read only the files of the
+    pieces requested. Other readers and sources produce their whole data set
+    for every piece, which would be drawn once per piece.
+
+    Returns nothing, but will raise an error if there is a problem.
+    """
+    for objectName in self._order:
+        if self.is_reader(objectName) is True:
+            vtkObject = self.get_vtk_object(objectName)
+            if isinstance(vtkObject, vtk.vtkXMLPDataReader) is False and\
+               isinstance(vtkObject, vtk.vtkXMLStructuredDataReader) is False:
+                raise ValueError("Source \"{}\" cannot produce its data set "
+                                 "in pieces, so it cannot be streamed."
+                                 .format(objectName))
+
+
+def stream_pieces(self, numberOfPieces):
+    """
+    Generator that passes each of a number of pieces of the data sets of this
+    visualisation through the pipeline to the mappers of the termini, one at a
+    time, so that they can be drawn a piece at a time.
+
+    For each piece, the object connected to each mapper is updated with a
+    request for that piece, which is passed up the pipeline to the readers
+    (see check_streaming_sources). The output is given to the mapper as its
+    input, so that drawing it does not update the pipeline again. Probe
+    filters are asked for the matching piece of their source instead of all of
+    it, and the points they sample outside of the piece are removed. The
+    mappers are connected back to the pipeline when the generator finishes.
+
+    Arguments:
+
+      - numberOfPieces: Integer denoting the number of pieces to split the data
+          sets into.
+
+    Yields the index of each piece once it is ready to be drawn.
+    """
+    # Find the mappers that are drawn from the pipeline, and what they are
+    # connected to.
+    mappers = []
+    for terminus in self._vtkTermini.itervalues():
+        mapper = terminus.actor.GetMapper()
+        if mapper is not None and mapper.IsA("vtkMapper") == 1 and\
+           mapper.GetNumberOfInputConnections(0) > 0:
+            mappers.append([mapper, mapper.GetInputConnection(0, 0)])
+
+    probeFilters = []
+    for mapper, connection in mappers:
+        producer = connection.GetProducer()
+        if producer.IsA("vtkProbeFilter") == 1:
+            probeFilters.append([producer, producer.GetSpatialMatch()])
+            producer.SpatialMatchOn()
+
+    try:
+        for piece in xrange(numberOfPieces):
+            for mapper, connection in mappers:
+                producer = connection.GetProducer()
+                helpers.update_piece(producer, piece, numberOfPieces)
+                output = producer.GetOutputDataObject(
+                    connection.GetIndex())
+                pieceData = output.NewInstance()
+                pieceData.ShallowCopy(output)
+
+                # Keep only the points sampled from this piece.
+                if pieceData.GetPointData().HasArray("vtkValidPointMask"):
+                    validPoints = vtk.vtkThresholdPoints()
+                    validPoints.SetInputData(pieceData)
+                    validPoints.SetInputArrayToProcess(
+                        0, 0, 0, vtk.vtkDataObject.FIELD_ASSOCIATION_POINTS,
+                        "vtkValidPointMask")
+                    validPoints.ThresholdByUpper(1)
+                    validPoints.Update()
+                    pieceData = validPoints.GetOutput()
+                mapper.SetInputData(pieceData)
+
+            yield piece
+
+    # Reconnect everything, even if drawing failed.
+    finally:
+        for mapper, connection in mappers:
+            mapper.SetInputConnection(0, connection)
+        for probeFilter, spatialMatch in probeFilters:
+            probeFilter.SetSpatialMatch(spatialMatch)
+
+
+def visualise_stream(self, imageFilename, numberOfPieces,
+                     offscreenRendering=True, verbose=False,
+                     compressionLevel=5):
+    """
+    Save a visualisation of data sets too large to hold in memory to a PNG
+    image, by drawing them a piece at a time.
+
+    Each piece is read, passed through the pipeline, and drawn over the pieces
+    before it (see stream_pieces), so that at most one piece of each data set
+    is in memory at once. As such, the readers must be able to read pieces
+    (see check_streaming_sources). The pipeline is built without drawing
+    anything if it has not been built already, and the bounding box is worked
+    out a piece at a time. Termini that work out their mask domains from the
+    bounding box do so when they are created, which reads their data sets
+    whole, so pass them a mask domain instead.
+
+    Stride masks sample each piece separately, so they may draw more glyphs
+    than they would when drawing the whole data set at once.
+
+    Arguments:
+
+      - imageFilename: String denoting the path of the PNG image to save.
+      - numberOfPieces: Integer denoting the number of pieces to split the data
+          sets into.
+      - offscrenRendering: Boolean denoting whether or not to render offscreen.
+      - verbose: Boolean determining whether or not progress is printed.
+      - compressionLevel: Integer between 0 and 9 denoting the zlib
+          compression level of the image.
+
+    Returns nothing.
+    """
+    if numberOfPieces < 1:
+        raise ValueError("Number of pieces ({}) must be at least one."
+                         .format(numberOfPieces))
+    check_streaming_sources(self)
+
+    # Connect the pipeline and find the bounding box without reading any data
+    # set whole.
+    if self._pipeline == []:
+        self.autopipe(update=False)
+    boundingBox = sources.resolve_bounding_box(
+        self, numberOfPieces=numberOfPieces)
+
+    renderer, renderWindow = self.build_renderer_and_window()
+    renderWindow.SetOffScreenRendering(offscreenRendering)
+
+    # The clipping range can't be fitted to what has been drawn, because only
+    # one piece is drawn at a time. Fit it to the bounding box instead, with
+    # room for glyphs that stick out of the data.
+    padding = np.linalg.norm(np.array(boundingBox[1::2]) -
+                             np.array(boundingBox[0::2])) / 10.
+    clippingBounds = [bound + padding * (zI % 2 * 2 - 1)
+                      for zI, bound in enumerate(boundingBox)]
+    renderer.ResetCameraClippingRange(*clippingBounds)
+
+    # Draw each piece into the same buffer without clearing it first, so the
+    # pieces accumulate.
+    renderWindow.SwapBuffersOff()
+    try:
+        for piece in stream_pieces(self, numberOfPieces):
+            if verbose is True:
+                print "Rendering piece {} of {}.".format(piece + 1,
+                                                         numberOfPieces)
+            renderer.SetErase(piece == 0)
+            renderWindow.Render()
+    finally:
+        renderer.EraseOn()
+        renderWindow.SwapBuffersOn()
+
+    # Show the buffer we drew into, and save it without rendering again.
+    renderWindow.Frame()
+    imageArray = framebuffer_to_array(renderWindow)
+    with profiling.stage(self._profiler, "png writer"):
+        write_png(imageArray, imageFilename,
+                  compressionLevel=compressionLevel)
+
+
+def visualise_to_array(self, offscreenRendering=True, alpha=False):
+    """
+    Render a visualisation into a numpy array, instead of saving it to a file.
+
+    The array is a view of the rendered image, rather than a copy, and is not
+    changed by later renders.
+
+    Arguments:
+
+      - offscrenRendering: Boolean denoting whether or not to render offscreen.
+      - alpha: Boolean denoting whether or not to include the alpha channel.
+
+    Returns a numpy array of unsigned bytes with shape (height, width, 3), or
+    (height, width, 4) if alpha is True, where the first row is the top of the
+    image.
+    """
     renderer, renderWindow = self.build_renderer_and_window()
     renderer.ResetCameraClippingRange()
     renderWindow.SetOffScreenRendering(offscreenRendering)
     renderWindow.Render()
-    save_snapshot(renderWindow, imageFilename)
+    return framebuffer_to_array(renderWindow, alpha=alpha)
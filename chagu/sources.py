@@ -1,16 +1,553 @@
 # This source file defines functions that load VTK data sources. These sources
 # are at the starting terminus of the pipeline, as one might expect.
 
+import glob
+import numbers
+import numpy as np
 import os
+import Queue
+import sys
+import threading
 import vtk
+from vtk.util import numpy_support
+import xml.etree.ElementTree
 
 import chagu.helpers as helpers
+import chagu.mask as mask
 
 
-def load_visualisation_toolkit_file(self, filePath, readerName=None):
+def advance_time_series(self, sourceName=None):
+    """
+    Replace the data set produced by a time series source with the next data
+    set in the series. Objects downstream of the source are re-executed the
+    next time the visualisation is rendered.
+
+    Arguments:
+
+      - sourceName: String denoting the name of the time series source to
+          advance, or None. If None, the visualisation must track exactly one
+          time series source, which is advanced.
+
+    Returns the path of the file (or dataset) now produced by the source, or
+    None if the series has been exhausted (in which case the source is
+    unchanged).
+    """
+
+    # Find the source to advance.
+    if sourceName is None:
+        sourceNames = [objectName for objectName in self._order
+                       if hasattr(self.get_vtk_object(objectName),
+                                  "time_series") is True]
+        if len(sourceNames) != 1:
+            raise RuntimeError("Visualisation \"{}\" tracks {} time series "
+                               "sources, so I don't know which one to "
+                               "advance. Please specify one with the "
+                               "sourceName argument."
+                               .format(self.name, len(sourceNames)))
+        sourceName = sourceNames[0]
+    source = self.get_vtk_object(sourceName)
+    if hasattr(source, "time_series") is False:
+        raise ValueError("Object \"{}\" is not a time series source."
+                         .format(sourceName))
+
+    try:
+        filePath, dataSet = source.time_series.next()
+    except StopIteration:
+        return None
+
+    source.SetOutput(dataSet)
+    source.file_path = filePath
+    expand_bounding_box(self, dataSet.GetBounds())
+    return filePath
+
+
+def append_data_sets(dataSets):
+    """
+    Combine the pieces of a partitioned data set into one data set. Image data
+    and structured grids are placed by their extents, so their type is
+    preserved (gaps between image data pieces are filled with zeros). Poly
+    data are appended as poly data, and other data sets are appended as an
+    unstructured grid. Versions of VTK older than 7 cannot append structured
+    grids, so structured grids are appended as an unstructured grid too.
+
+    Arguments:
+
+      - dataSets: Non-empty list of VTK data sets of the same type to combine.
+
+    Returns the combined data set.
+    """
+    if dataSets[0].IsA("vtkImageData") == 1:
+        appender = vtk.vtkImageAppend()
+        appender.PreserveExtentsOn()
+    elif dataSets[0].IsA("vtkStructuredGrid") == 1 and\
+            hasattr(vtk, "vtkStructuredGridAppend") is True:
+        appender = vtk.vtkStructuredGridAppend()
+    elif dataSets[0].IsA("vtkPolyData") == 1:
+        appender = vtk.vtkAppendPolyData()
+    else:
+        appender = vtk.vtkAppendFilter()
+
+    for dataSet in dataSets:
+        appender.AddInputData(dataSet)
+    appender.Update()
+
+    # Detach the data set from the filter, so that the filter can be freed.
+    output = appender.GetOutputDataObject(0)
+    dataSet = output.NewInstance()
+    dataSet.ShallowCopy(output)
+    return dataSet
+
+
+def bounds_intersect(boundsA, boundsB):
+    """
+    Returns True if two boxes in the form returned by vtkDataSet.GetBounds
+    intersect (or touch), and False otherwise.
+    """
+    for zI in xrange(3):
+        if boundsA[zI * 2] > boundsB[zI * 2 + 1] or\
+           boundsB[zI * 2] > boundsA[zI * 2 + 1]:
+            return False
+    return True
+
+
+def cache_reader_output(vtReader, event):
+    """
+    Store a shallow copy of the data set produced by a reader in dataSetCache,
+    so that the file need not be parsed again while it is unchanged. This is
+    an observer for the "EndEvent" of readers created with the cache enabled,
+    so that the cache is populated whenever the file is actually read.
+
+    Arguments:
+
+      - vtReader: Reader object that has finished executing.
+
+      - event: String denoting the event observed.
+
+    Returns nothing.
+    """
+    # Don't cache data read from memory, or partial data sets read when
+    # streaming pieces.
+    filePath = vtReader.GetFileName()
+    if filePath is None or vtReader.GetReadFromInputString() != 0:
+        return
+    information = vtReader.GetOutputInformation(0)
+    piecesKey = vtk.vtkStreamingDemandDrivenPipeline.UPDATE_NUMBER_OF_PIECES()
+    if information.Has(piecesKey) == 1 and information.Get(piecesKey) > 1:
+        return
+
+    output = vtReader.GetOutputDataObject(0)
+    dataSet = output.NewInstance()
+    dataSet.ShallowCopy(output)
+    dataSetCache.put(file_cache_key(filePath), dataSet)
+
+
+def data_set_memory_size(dataObject):
+    """
+    Returns the memory used by a VTK data object, in bytes.
+    """
+    return dataObject.GetActualMemorySize() * 1024
+
+
+def expand_bounding_box(self, bounds):
+    """
+    Expand the bounding box of a visualisation to contain a given bounding
+    box. This keeps the most extreme values of the two.
+
+    Arguments:
+
+      - bounds: Six-element iterable object denoting the bounding box to
+          contain, in the form returned by vtkDataSet.GetBounds.
+
+    Returns nothing.
+    """
+    boundingBox = self._resolvedBoundingBox
+    for zI in xrange(3):
+        boundingBox[zI * 2] = min(boundingBox[zI * 2], bounds[zI * 2])
+        boundingBox[zI * 2 + 1] = max(boundingBox[zI * 2 + 1],
+                                      bounds[zI * 2 + 1])
+
+
+def file_cache_key(filePath):
+    """
+    Returns a key that identifies the contents of the file "filePath" in
+    dataSetCache. The key changes if the file is modified.
+    """
+    fileStatus = os.stat(filePath)
+    return (os.path.realpath(filePath), fileStatus.st_mtime,
+            fileStatus.st_size)
+
+
+def grid_slices(gridSpec, stride=None, maskDomain=None, maskResolution=None,
+                maskType=None, glyphSize=1.):
+    """
+    Choose the points of a regular grid to read, either by taking every k-th
+    point along each axis, or by taking the points that a stride mask would
+    sample. In the latter case, the geometry of the mask is worked out from
+    the mask arguments as in mask.create_mask_from_opts, and the domain of the
+    mask must be aligned with the axes.
+
+    Arguments:
+
+      - gridSpec: Dictionary describing the regular grid, in the form accepted
+          by numpy_vector_field_data_set.
+
+      - stride: Integer or three-element iterable of integers denoting the
+          step between points to read along each axis, or None to read every
+          point. This is ignored if any mask argument is not None.
+
+      - maskDomain, maskResolution, maskType, glyphSize: As in
+          mask.create_mask_from_opts.
+
+    Returns a three-element list of slice objects selecting points along the
+    x, y, and z axes.
+    """
+    dimensions = [int(zI) for zI in gridSpec["dimensions"]]
+
+    # Take every k-th point if we're not masking.
+    if maskDomain is None and maskResolution is None and maskType is None:
+        if stride is None:
+            stride = 1
+        if isinstance(stride, numbers.Integral):
+            strides = [stride] * 3
+        else:
+            strides = list(stride)
+        return [slice(0, dimensions[zI], strides[zI]) for zI in xrange(3)]
+
+    # Otherwise, work out the geometry of the mask from the extent of the
+    # grid. Planes are cuboids with a single layer of points.
+    origin = gridSpec.get("origin", [0., 0., 0.])
+    spacing = gridSpec.get("spacing", [1., 1., 1.])
+    axisCoordinates = [origin[zI] + spacing[zI] * np.arange(dimensions[zI])
+                       for zI in xrange(3)]
+    boundingBox = []
+    for coordinates in axisCoordinates:
+        boundingBox += [coordinates[0], coordinates[-1]]
+    maskType, domain, resolution = mask.mask_geometry_from_opts(
+        boundingBox, glyphSize, maskDomain=maskDomain,
+        maskResolution=maskResolution, maskType=maskType)
+    if maskType == "plane":
+        domain = domain + domain[0:3]
+        resolution = list(resolution) + [1]
+
+    axisIndices = mask.stride_indices_in_domain(axisCoordinates, domain,
+                                                resolution)
+    if axisIndices is None:
+        raise ValueError("Mask domain \"{}\" is not aligned with the axes of "
+                         "the grid.".format(domain))
+
+    # The indices are evenly strided, so they can be expressed as slices.
+    slices = []
+    for indices in axisIndices:
+        step = indices[1] - indices[0] if len(indices) > 1 else 1
+        slices.append(slice(indices[0], indices[-1] + 1, step))
+    return slices
+
+
+def information_bounds(vtkAlgorithm):
+    """
+    Compute the bounds of the data set produced by a VTK algorithm (such as a
+    reader) from its pipeline information, without executing it. This is only
+    possible for image data, whose bounds follow from the whole extent, the
+    origin, and the spacing. For readers, the information pass reads the
+    header of the file only.
+
+    Arguments:
+
+      - vtkAlgorithm: VTK algorithm object whose first output to compute the
+          bounds of.
+
+    Returns the bounds in the form returned by vtkDataSet.GetBounds, or None
+    if they cannot be computed from the information.
+    """
+    vtkAlgorithm.UpdateInformation()
+    information = vtkAlgorithm.GetOutputInformation(0)
+    keys = [vtk.vtkStreamingDemandDrivenPipeline.WHOLE_EXTENT(),
+            vtk.vtkDataObject.ORIGIN(), vtk.vtkDataObject.SPACING()]
+    for key in keys:
+        if information.Has(key) == 0:
+            return None
+
+    extent, origin, spacing = [information.Get(key) for key in keys]
+    bounds = []
+    for zI in xrange(3):
+        bounds.append(origin[zI] + extent[zI * 2] * spacing[zI])
+        bounds.append(origin[zI] + extent[zI * 2 + 1] * spacing[zI])
+
+    # Negative spacings reverse the order.
+    for zI in xrange(3):
+        bounds[zI * 2:zI * 2 + 2] = sorted(bounds[zI * 2:zI * 2 + 2])
+    return bounds
+
+
+def legacy_data_set_type(filePath):
+    """
+    Find the type of data set stored in a legacy VTK file from its header.
+
+    The header of a legacy file is a version line, a title line (which may be
+    empty), a line denoting whether the data are ASCII or binary, and a line
+    starting with "DATASET" followed by the type. Only these lines are read,
+    in binary mode, so the cost does not depend on the size of the file. Blank
+    lines between them are tolerated.
+
+    Arguments:
+
+      - filePath: String containing the path to the file to read.
+
+    Returns a string denoting the type of data set, in upper case.
+    """
+    with open(filePath, "rb") as dataFile:
+
+        # Skip the version and title lines. The title may contain anything,
+        # including the word "DATASET".
+        dataFile.readline(legacyHeaderLineLength)
+        dataFile.readline(legacyHeaderLineLength)
+
+        for zI in xrange(legacyHeaderLines):
+            words = dataFile.readline(legacyHeaderLineLength).split()
+            if len(words) >= 2 and words[0].upper() == "DATASET":
+                return words[1].upper()
+
+    raise ValueError("File \"{}\" does not have a legacy VTK header with a "
+                     "DATASET line.".format(filePath))
+
+
+def load_hdf5_vector_field(self, filePath, datasetPaths, gridSpec=None,
+                           stride=None, maskDomain=None, maskResolution=None,
+                           maskType=None, glyphSize=1., sourceName=None,
+                           prefetchDepth=2):
+    """
+    Create a source that produces a vector field stored in an HDF5 file, or a
+    series of vector fields stored in datasets of the same HDF5 file, such as
+    the timesteps of a simulation. This requires h5py.
+
+    Each dataset holds a vector field on a regular grid, with shape (nz, ny,
+    nx, 3). Only part of each dataset can be read, either by taking every k-th
+    point, or by taking the points that a stride mask with the given mask
+    arguments would sample. Only the chunks of a chunked dataset that contain
+    these points are read from disk. To visualise the points read with cones,
+    pass the same mask arguments to act_cone_vector_field.
+
+    If a series of datasets is given, the source is a time series source, as
+    in load_visualisation_toolkit_time_series, and advance_time_series moves
+    it on to the next dataset. The source is treated as a reader when
+    building the pipeline.
+
+    Arguments:
+
+      - filePath: String containing the path to the HDF5 file to read.
+
+      - datasetPaths: String denoting the path of the dataset to read within
+          the file, or an iterable of such strings denoting a series.
+
+      - gridSpec: Dictionary describing the grid of the datasets, in the form
+          accepted by numpy_vector_field_data_set, or None. If None, the
+          dimensions are taken from the shape of the first dataset, and the
+          origin and spacing from its "origin" and "spacing" attributes, if it
+          has them.
+
+      - stride, maskDomain, maskResolution, maskType, glyphSize: As in
+          grid_slices.
+
+      - sourceName: String or None denoting the name to give to the source
+          object, as with readerName in load_visualisation_toolkit_file.
+
+      - prefetchDepth: Integer denoting the number of datasets of a series to
+          read ahead of the current one.
+
+    Returns the name of the source object.
+    """
+    if os.path.isfile(filePath) is False:
+        raise ValueError("File \"{}\" does not exist.".format(filePath))
+
+    isSeries = not isinstance(datasetPaths, basestring)
+    datasetPaths = list(datasetPaths) if isSeries else [datasetPaths]
+    if len(datasetPaths) == 0:
+        raise ValueError("No datasets were given to the time series.")
+
+    if gridSpec is None:
+        gridSpec = read_hdf5_grid_spec(filePath, datasetPaths[0])
+    axisSlices = grid_slices(gridSpec, stride=stride, maskDomain=maskDomain,
+                             maskResolution=maskResolution, maskType=maskType,
+                             glyphSize=glyphSize)
+
+    if isSeries is False:
+        subGridSpec, vectors = read_hdf5_vector_field(
+            filePath, datasetPaths[0], gridSpec, axisSlices)
+        return self.load_numpy_vector_field(
+            subGridSpec, vectors,
+            sourceName=sourceName if sourceName is not None else "reader")
+
+    # The arrays read are kept alive by the data sets wrapping them.
+    def load_dataset(datasetPath):
+        return numpy_vector_field_data_set(*read_hdf5_vector_field(
+            filePath, datasetPath, gridSpec, axisSlices))
+
+    return track_time_series(self, datasetPaths, load_dataset, sourceName,
+                             prefetchDepth)
+
+
+def load_numpy_vector_field(self, pointsOrGridSpec, vectors, scalars=None,
+                            sourceName=None):
+    """
+    Create a source that produces a data set wrapping a vector field held in
+    numpy arrays, so that data in memory can be visualised without writing it
+    to a file. The source is treated as a reader when building the pipeline.
+
+    The arrays are not copied if they are contiguous and of a type VTK
+    supports, so they must not be modified while they are being visualised.
+    The source keeps them alive, so they need not be kept by the caller. See
+    numpy_vector_field_data_set for details of the data set created.
+
+    Arguments:
+
+      - pointsOrGridSpec: Either a dictionary describing a regular grid, or a
+          numpy array of point co-ordinates, as in
+          numpy_vector_field_data_set.
+
+      - vectors: Numpy array of vectors at each point, as in
+          numpy_vector_field_data_set.
+
+      - scalars: Numpy array of scalars at each point, or None.
+
+      - sourceName: String or None denoting the name to give to the source
+          object, as with readerName in load_visualisation_toolkit_file.
+
+    Returns the name of the source object.
+    """
+
+    # Come up with a name for the object.
+    sensibleName = sourceName if sourceName is not None else "numpy_source"
+    sensibleName = helpers.generate_sensible_name(sensibleName,
+                                                  self.is_tracked,
+                                                  self._nameCounters)
+
+    dataSet = numpy_vector_field_data_set(pointsOrGridSpec, vectors, scalars)
+
+    # The source produces the data set it has been given.
+    source = vtk.vtkTrivialProducer()
+    source.is_source = True
+    source.SetOutput(dataSet)
+    self.track_object(source, sensibleName)
+
+    expand_bounding_box(self, dataSet.GetBounds())
+
+    return sensibleName
+
+
+def load_oommf_file(self, filePath, sourceName=None):
+    """
+    Create a source that produces the vector field stored in an OOMMF vector
+    field file (.omf, .ohf, .obf, or .ovf). See read_oommf_file for the
+    formats supported. The source is treated as a reader when building the
+    pipeline.
+
+    Binary data are memory-mapped rather than read, so only the parts of the
+    file that are used are read from disk, when they are used. The source
+    keeps the arrays read from the file alive (see numpy_to_vtk_array), so the
+    file stays mapped while the source exists.
+
+    Arguments:
+
+      - filePath: String containing the path to the file to read.
+
+      - sourceName: String or None denoting the name to give to the source
+          object, as with readerName in load_visualisation_toolkit_file.
+
+    Returns the name of the source object.
+    """
+    if os.path.isfile(filePath) is False:
+        raise ValueError("File \"{}\" does not exist.".format(filePath))
+
+    gridSpec, vectors = read_oommf_file(filePath)
+    sensibleName = sourceName if sourceName is not None else "reader"
+    sensibleName = self.load_numpy_vector_field(gridSpec, vectors,
+                                                sourceName=sensibleName)
+    self.get_vtk_object(sensibleName).file_path = filePath
+    return sensibleName
+
+
+def load_partitioned_visualisation_toolkit_file(self, filePath,
+                                                sourceName=None,
+                                                maskDomain=None,
+                                                streaming=False):
+    """
+    Create a source that produces the data set stored in a partitioned VTK
+    file (.pvti, .pvtp, .pvtr, .pvts, or .pvtu), such as those written by
+    parallel solvers. The pieces are read one at a time and combined with
+    append_data_sets, and the bounding box is expanded to contain every piece
+    kept. The source is treated as a reader when building the pipeline.
+
+    If maskDomain is given, only the pieces that intersect it are kept. The
+    extents of image data pieces are stored in the partitioned file, so
+    pieces of image data outside the domain are not read at all. The extents
+    of other pieces are only known once they have been read, so they are
+    read and then discarded.
+
+    If streaming is True, the pieces are not read now. Instead, a VTK reader
+    for partitioned files is tracked, which reads only the pieces requested
+    of it, so that visualise_stream can draw the data set a few pieces at a
+    time. In this case, maskDomain is ignored.
+
+    Arguments:
+
+      - filePath: String containing the path to the partitioned file to read.
+
+      - sourceName: String or None denoting the name to give to the source
+          object, as with readerName in load_visualisation_toolkit_file.
+
+      - maskDomain: Nine or twelve element list defining a rectangle or
+          cuboid, as in mask.create_mask_from_opts, or None to keep every
+          piece.
+
+      - streaming: Boolean denoting whether or not to read pieces only when
+          they are requested.
+
+    Returns the name of the source object.
+    """
+
+    # Come up with a name for the object.
+    sensibleName = sourceName if sourceName is not None else "reader"
+    sensibleName = helpers.generate_sensible_name(sensibleName,
+                                                  self.is_tracked,
+                                                  self._nameCounters)
+
+    # Track a reader that reads pieces on request. Its contribution to the
+    # bounding box is worked out when the bounding box is next used.
+    if streaming is True:
+        partitioned_file_pieces(filePath)
+        vtReader = partitionedExtensions[filePath.split(".")[-1]]()
+        vtReader.SetFileName(filePath)
+        self.track_object(vtReader, sensibleName)
+        self._unresolvedBoundingBoxSources.append(vtReader)
+        return sensibleName
+
+    dataSet = read_partitioned_visualisation_toolkit_file(
+        filePath, maskDomain=maskDomain)
+
+    source = vtk.vtkTrivialProducer()
+    source.is_source = True
+    source.file_path = filePath
+    source.SetOutput(dataSet)
+
+    self.track_object(source, sensibleName)
+    expand_bounding_box(self, dataSet.GetBounds())
+    return sensibleName
+
+
+def load_visualisation_toolkit_file(self, filePath, readerName=None,
+                                    useCache=False, maskDomain=None):
     """
     Create a vtkXMLDataReader object that loads the file "filePath". The type
-    of object created depends on the extension of "filePath".
+    of object created depends on the extension of "filePath". OOMMF vector
+    field files are loaded with load_oommf_file instead, and partitioned files
+    are loaded with load_partitioned_visualisation_toolkit_file.
+
+    If the cache is used, data sets read from files are kept in dataSetCache,
+    which is shared between all visualisations in this process. If the file
+    has already been read and has not changed since, a source that produces a
+    shallow copy of the cached data set is created instead of a reader, so the
+    file is not parsed again. This source is treated as a reader when building
+    the pipeline, but its filename cannot be changed.
 
     Arguments:
 
@@ -21,18 +558,614 @@ def load_visualisation_toolkit_file(self, filePath, readerName=None):
           a sensible name is chosen. If there is a clash, the name is changed
           (and returned).
 
+      - useCache: Boolean denoting whether or not to use the data set cache.
+          Partitioned files are not cached. If the file is in the cache, the
+          source produced cannot be used with visualise_save_series.
+
+      - maskDomain: Nine or twelve element list defining a rectangle or
+          cuboid, as in mask.create_mask_from_opts, or None. If this is not
+          None, only the pieces of a partitioned file that intersect it are
+          loaded. This is ignored for other files.
+
     Returns the name of the filereader object.
     """
 
-    # Check that the file exists.
-    if os.path.isfile(filePath) is False:
-        errorMsg = ("File \"{}\" does not exist.".format(filePath))
-        raise ValueError(errorMsg)
+    if filePath.split(".")[-1] in oommfExtensions:
+        return self.load_oommf_file(filePath, sourceName=readerName)
+    if filePath.split(".")[-1] in partitionedExtensions:
+        return self.load_partitioned_visualisation_toolkit_file(
+            filePath, sourceName=readerName, maskDomain=maskDomain)
 
     # Come up with a name for the object.
     sensibleName = readerName if readerName is not None else "reader"
     sensibleName = helpers.generate_sensible_name(sensibleName,
-                                                  self.is_tracked)
+                                                  self.is_tracked,
+                                                  self._nameCounters)
+
+    vtReader = reader_for_file(filePath)
+
+    # If the file has already been read, produce the data set from the cache.
+    # The producer cannot have its file changed, so it is marked for
+    # visualise_save_series to reject.
+    if useCache is True:
+        dataSet = dataSetCache.get(file_cache_key(filePath))
+        if dataSet is not None:
+            source = vtk.vtkTrivialProducer()
+            source.is_source = True
+            source.file_path = filePath
+            source.from_cache = True
+            output = dataSet.NewInstance()
+            output.ShallowCopy(dataSet)
+            source.SetOutput(output)
+
+            self.track_object(source, sensibleName)
+            expand_bounding_box(self, output.GetBounds())
+            return sensibleName
+
+        # Otherwise, cache the data set when the file is read. The observer
+        # is kept so that caching can be suspended.
+        vtReader.cache_observer = vtReader.AddObserver("EndEvent",
+                                                       cache_reader_output)
+
+    vtReader.SetFileName(filePath)
+
+    self.track_object(vtReader, sensibleName)
+
+    # The file is not read until it is needed. Its contribution to the
+    # bounding box is worked out when the bounding box is next used.
+    self._unresolvedBoundingBoxSources.append(vtReader)
+
+    return sensibleName
+
+
+def load_visualisation_toolkit_time_series(self, filePaths, sourceName=None,
+                                           prefetchDepth=2):
+    """
+    Create a source that produces the data sets in a series of files, such as
+    the timesteps of a simulation, one at a time. The first file is loaded
+    immediately, and advance_time_series moves the source on to the next file.
+
+    The files after the current one are read and parsed by a background
+    thread, so that the next data set is ready by the time the current one
+    has been rendered. At most prefetchDepth data sets are held in memory
+    besides the current one.
+
+    Each file is read by the reader that load_visualisation_toolkit_file would
+    use for it. The source is treated as a reader when building the pipeline.
+
+    Arguments:
+
+      - filePaths: Iterable of strings denoting the paths of the files to
+          load, in order, or a string denoting a glob pattern matching them
+          (which are loaded in sorted order).
+
+      - sourceName: String or None denoting the name to give to the source
+          object, as with readerName in load_visualisation_toolkit_file.
+
+      - prefetchDepth: Integer denoting the number of data sets to read ahead
+          of the current one.
+
+    Returns the name of the source object.
+    """
+
+    # Find and check the files.
+    if isinstance(filePaths, basestring):
+        filePaths = sorted(glob.glob(filePaths))
+    else:
+        filePaths = list(filePaths)
+    if len(filePaths) == 0:
+        raise ValueError("No files were given to the time series.")
+    for filePath in filePaths:
+        if os.path.isfile(filePath) is False:
+            raise ValueError("File \"{}\" does not exist.".format(filePath))
+
+    return track_time_series(self, filePaths, read_visualisation_toolkit_file,
+                             sourceName, prefetchDepth)
+
+
+def track_time_series(self, keys, loadFunction, sourceName, prefetchDepth):
+    """
+    Create and track a time series source, which produces the data sets
+    loaded by a TimeSeriesPrefetcher one at a time, and advance it to the
+    first data set.
+
+    Arguments:
+
+      - keys, loadFunction, prefetchDepth: As in TimeSeriesPrefetcher, where
+          loadFunction returns a VTK data object.
+
+      - sourceName: String or None denoting the name to give to the source
+          object, as with readerName in load_visualisation_toolkit_file.
+
+    Returns the name of the source object.
+    """
+
+    # Come up with a name for the object.
+    sensibleName = sourceName if sourceName is not None else "time_series"
+    sensibleName = helpers.generate_sensible_name(sensibleName,
+                                                  self.is_tracked,
+                                                  self._nameCounters)
+
+    # The source produces whichever data set it has been given.
+    source = vtk.vtkTrivialProducer()
+    source.is_source = True
+    source.time_series = TimeSeriesPrefetcher(keys, loadFunction,
+                                              prefetchDepth=prefetchDepth)
+    self.track_object(source, sensibleName)
+    self.advance_time_series(sensibleName)
+
+    return sensibleName
+
+
+def numpy_to_vtk_array(numpyArray, name=None):
+    """
+    Wrap a contiguous numpy array in a VTK data array, without copying it if
+    VTK supports its type. The VTK array does not own the memory it wraps, so
+    a reference to the numpy array is stored on the VTK array, which keeps the
+    numpy array alive for as long as the VTK array is (as numpy_support does
+    itself from VTK 7.1). Otherwise, the VTK array would point at freed memory
+    once the numpy array is collected. Arrays of other types, including those
+    not in the byte order of this machine, are converted to a type VTK
+    supports, and the converted copy is kept alive instead.
+
+    Arguments:
+
+      - numpyArray: Contiguous numpy array to wrap.
+
+      - name: String denoting the name to give to the VTK array, or None.
+
+    Returns the VTK data array.
+    """
+    vtkType = numpy_support.get_vtk_array_type(numpyArray.dtype)
+    numpyArray = np.ascontiguousarray(
+        numpyArray, dtype=numpy_support.get_numpy_array_type(vtkType))
+    vtkArray = numpy_support.numpy_to_vtk(numpyArray)
+    vtkArray._numpy_reference = numpyArray
+    if name is not None:
+        vtkArray.SetName(name)
+    return vtkArray
+
+
+def numpy_vector_field_data_set(pointsOrGridSpec, vectors, scalars=None):
+    """
+    Create a VTK data set that wraps a vector field held in numpy arrays. The
+    arrays are not copied if they are contiguous and of a type VTK supports,
+    in which case the data set keeps them alive (see numpy_to_vtk_array), so
+    they need not be kept by the caller. The vectors and scalars are the
+    active vectors and scalars of the point data of the data set, and are
+    named "vectors" and "scalars" respectively.
+
+    Arguments:
+
+      - pointsOrGridSpec: Either a dictionary describing a regular grid, in
+          which case a vtkImageData is created, or a numpy array of point
+          co-ordinates with shape (N, 3), in which case a vtkUnstructuredGrid
+          with a vertex cell at each point is created. Vertex cells have no
+          volume, so data on unstructured points cannot be probed by masks.
+          Valid keys of the dictionary are:
+            > dimensions: A three-element iterable object denoting the number
+                of points along each axis. This key is required.
+            > origin: A three-element iterable object denoting the position
+                of the first point. Defaults to zeros.
+            > spacing: A three-element iterable object denoting the distance
+                between points along each axis. Defaults to ones.
+
+      - vectors: Numpy array of vectors at each point, with shape (N, 3). For
+          regular grids, points are ordered with x varying fastest, so an
+          array with shape (nz, ny, nx, 3) may also be passed.
+
+      - scalars: Numpy array of scalars at each point, with N elements, or
+          None.
+
+    Returns the VTK data set.
+    """
+    vectors = np.ascontiguousarray(vectors).reshape(-1, 3)
+    if scalars is not None:
+        scalars = np.ascontiguousarray(scalars).reshape(-1)
+        if len(scalars) != len(vectors):
+            raise ValueError("There are {} scalars, but {} vectors."
+                             .format(len(scalars), len(vectors)))
+
+    # Create the geometry.
+    if isinstance(pointsOrGridSpec, dict):
+        if "dimensions" not in pointsOrGridSpec:
+            raise ValueError("Grid specification \"{}\" has no dimensions."
+                             .format(pointsOrGridSpec))
+        dimensions = [int(zI) for zI in pointsOrGridSpec["dimensions"]]
+        if np.prod(dimensions) != len(vectors):
+            raise ValueError("Grid with dimensions {} has {} points, but "
+                             "there are {} vectors."
+                             .format(dimensions, np.prod(dimensions),
+                                     len(vectors)))
+        dataSet = vtk.vtkImageData()
+        dataSet.SetDimensions(*dimensions)
+        dataSet.SetOrigin(*pointsOrGridSpec.get("origin", [0., 0., 0.]))
+        dataSet.SetSpacing(*pointsOrGridSpec.get("spacing", [1., 1., 1.]))
+
+    else:
+        points = np.ascontiguousarray(pointsOrGridSpec)
+        if points.ndim != 2 or points.shape[1] != 3:
+            raise ValueError("Points must have shape (N, 3), not {}."
+                             .format(points.shape))
+        if len(points) != len(vectors):
+            raise ValueError("There are {} points, but {} vectors."
+                             .format(len(points), len(vectors)))
+        numberOfPoints = len(points)
+
+        vtkPoints = vtk.vtkPoints()
+        vtkPoints.SetData(numpy_to_vtk_array(points))
+
+        # Each vertex cell is stored as its number of points (one), followed by
+        # the index of its point.
+        connectivity = np.empty((numberOfPoints, 2),
+                                dtype=numpy_support.ID_TYPE_CODE)
+        connectivity[:, 0] = 1
+        connectivity[:, 1] = np.arange(numberOfPoints)
+        cells = vtk.vtkCellArray()
+        cells.SetCells(numberOfPoints, numpy_support.numpy_to_vtkIdTypeArray(
+            connectivity.reshape(-1), deep=True))
+        cellTypes = numpy_support.numpy_to_vtk(
+            np.full(numberOfPoints, vtk.VTK_VERTEX, dtype=np.uint8), deep=True,
+            array_type=vtk.VTK_UNSIGNED_CHAR)
+        cellLocations = numpy_support.numpy_to_vtkIdTypeArray(
+            np.arange(0, 2 * numberOfPoints, 2,
+                      dtype=numpy_support.ID_TYPE_CODE), deep=True)
+
+        dataSet = vtk.vtkUnstructuredGrid()
+        dataSet.SetPoints(vtkPoints)
+        dataSet.SetCells(cellTypes, cellLocations, cells)
+
+    # Attach the data to the points.
+    dataSet.GetPointData().SetVectors(numpy_to_vtk_array(vectors, "vectors"))
+    if scalars is not None:
+        dataSet.GetPointData().SetScalars(numpy_to_vtk_array(scalars,
+                                                             "scalars"))
+
+    return dataSet
+
+
+def read_hdf5_grid_spec(filePath, datasetPath):
+    """
+    Describe the grid of a vector field stored in an HDF5 dataset with shape
+    (nz, ny, nx, 3), using its "origin" and "spacing" attributes if it has
+    them. This requires h5py.
+
+    Arguments:
+
+      - filePath: String containing the path to the HDF5 file to read.
+
+      - datasetPath: String denoting the path of the dataset within the file.
+
+    Returns a dictionary describing the grid, in the form accepted by
+    numpy_vector_field_data_set.
+    """
+    import h5py
+
+    with h5py.File(filePath, "r") as dataFile:
+        dataset = dataFile[datasetPath]
+        if len(dataset.shape) != 4 or dataset.shape[3] != 3:
+            raise ValueError("Dataset \"{}\" has shape {}, but a shape of "
+                             "(nz, ny, nx, 3) was expected."
+                             .format(datasetPath, dataset.shape))
+        return {"dimensions": list(dataset.shape[2::-1]),
+                "origin": [float(zI) for zI in
+                           dataset.attrs.get("origin", [0., 0., 0.])],
+                "spacing": [float(zI) for zI in
+                            dataset.attrs.get("spacing", [1., 1., 1.])]}
+
+
+def read_hdf5_vector_field(filePath, datasetPath, gridSpec, axisSlices):
+    """
+    Read part of a vector field stored in an HDF5 dataset with shape (nz, ny,
+    nx, 3). Only the chunks of the dataset containing the points selected are
+    read. This requires h5py.
+
+    Arguments:
+
+      - filePath: String containing the path to the HDF5 file to read.
+
+      - datasetPath: String denoting the path of the dataset within the file.
+
+      - gridSpec: Dictionary describing the grid of the dataset, in the form
+          accepted by numpy_vector_field_data_set.
+
+      - axisSlices: Three-element list of slice objects selecting points along
+          the x, y, and z axes, as returned by grid_slices.
+
+    Returns, in order, a dictionary describing the grid of the points read,
+    and a numpy array of vectors at those points with shape (nz, ny, nx, 3).
+    """
+    import h5py
+
+    with h5py.File(filePath, "r") as dataFile:
+        vectors = dataFile[datasetPath][axisSlices[2], axisSlices[1],
+                                        axisSlices[0], :]
+
+    # Describe the grid of the points read.
+    dimensions = [int(zI) for zI in gridSpec["dimensions"]]
+    origin = gridSpec.get("origin", [0., 0., 0.])
+    spacing = gridSpec.get("spacing", [1., 1., 1.])
+    subGridSpec = {"dimensions": [], "origin": [], "spacing": []}
+    for zI in xrange(3):
+        start, stop, step = axisSlices[zI].indices(dimensions[zI])
+        subGridSpec["dimensions"].append(len(xrange(start, stop, step)))
+        subGridSpec["origin"].append(origin[zI] + start * spacing[zI])
+        subGridSpec["spacing"].append(spacing[zI] * step)
+
+    return subGridSpec, vectors
+
+
+def read_oommf_file(filePath):
+    """
+    Read the first segment of an OOMMF vector field file in the OVF 1.0 or OVF
+    2.0 format, with text, 4-byte binary, or 8-byte binary data, on a
+    rectangular mesh.
+
+    Binary data are memory-mapped in copy-on-write mode, so the array returned
+    is backed by the file and no intermediate copies are made. The exception
+    is OVF 1.0 binary data, which are big-endian and so must be converted to
+    the byte order of this machine, which is a copy on most machines.
+
+    Arguments:
+
+      - filePath: String containing the path to the file to read.
+
+    Returns, in order, a dictionary describing the grid in the form accepted
+    by numpy_vector_field_data_set, and a numpy array of vectors at each
+    point, with shape (N, 3).
+    """
+    header = {}
+    with open(filePath, "rb") as dataFile:
+        firstLine = dataFile.readline(oommfHeaderLineLength).lower()
+        if "oommf" not in firstLine:
+            raise ValueError("File \"{}\" is not an OOMMF vector field file."
+                             .format(filePath))
+        version = 2 if "ovf 2" in firstLine else 1
+
+        # Read header lines, which are of the form "# key: value", until the
+        # start of the data. Lines starting with "##" are comments.
+        while True:
+            line = dataFile.readline(oommfHeaderLineLength)
+            if line == "":
+                raise ValueError("File \"{}\" has no data block."
+                                 .format(filePath))
+            if line.startswith("##") or ":" not in line:
+                continue
+            key, value = [zI.strip() for zI in
+                          line.lstrip("#").split(":", 1)]
+            key = key.lower()
+            if key == "begin" and value.lower().startswith("data"):
+                dataFormat = value.lower().split()[1:]
+                dataOffset = dataFile.tell()
+                break
+            header[key] = value
+
+    # Build the grid. Values are stored at the centres of cells, which are
+    # ordered with x varying fastest.
+    if header.get("meshtype", "rectangular").lower() != "rectangular":
+        raise NotImplementedError("Only rectangular meshes are supported, but "
+                                  "file \"{}\" has a {} mesh."
+                                  .format(filePath, header["meshtype"]))
+    valueDimension = int(header.get("valuedim", 3))
+    if valueDimension != 3:
+        raise NotImplementedError("Only vector fields are supported, but file "
+                                  "\"{}\" has {} values at each point."
+                                  .format(filePath, valueDimension))
+    gridSpec = {"dimensions": [int(header[axis + "nodes"])
+                               for axis in "xyz"],
+                "origin": [float(header[axis + "base"]) for axis in "xyz"],
+                "spacing": [float(header[axis + "stepsize"])
+                            for axis in "xyz"]}
+    numberOfValues = int(np.prod(gridSpec["dimensions"])) * valueDimension
+
+    # Read the data.
+    if dataFormat[0] == "text":
+        with open(filePath, "rb") as dataFile:
+            dataFile.seek(dataOffset)
+            text = dataFile.read().split("#", 1)[0]
+        values = np.fromstring(text, sep=" ")
+
+    elif dataFormat[0] == "binary" and dataFormat[1] in ["4", "8"]:
+
+        # Binary data start with a known value, to check the byte order.
+        valueSize = int(dataFormat[1])
+        byteOrder = ">" if version == 1 else "<"
+        dataType = np.dtype("{}f{}".format(byteOrder, valueSize))
+        values = np.memmap(filePath, dtype=dataType, mode="c",
+                           offset=dataOffset, shape=(numberOfValues + 1,))
+        if values[0] != oommfBinaryCheckValues[valueSize]:
+            raise ValueError("File \"{}\" has check value {}, but {} was "
+                             "expected.".format(filePath, values[0],
+                                                oommfBinaryCheckValues
+                                                [valueSize]))
+        values = values[1:]
+        if dataType.isnative is False:
+            values = values.astype(dataType.newbyteorder("="))
+
+    else:
+        raise NotImplementedError("Data format \"{}\" of file \"{}\" is not "
+                                  "supported.".format(" ".join(dataFormat),
+                                                      filePath))
+
+    if len(values) != numberOfValues:
+        raise ValueError("File \"{}\" has {} values, but {} were expected."
+                         .format(filePath, len(values), numberOfValues))
+
+    return gridSpec, values.reshape(-1, valueDimension)
+
+
+def partitioned_file_pieces(filePath):
+    """
+    Read the description of the pieces of a partitioned VTK file (.pvti,
+    .pvtp, .pvtr, .pvts, or .pvtu). The pieces themselves are not read.
+
+    Arguments:
+
+      - filePath: String containing the path to the partitioned file to read.
+
+    Returns a list with a two-element list for each piece, containing, in
+    order, the path to the file storing the piece, and the bounds of the piece
+    in the form returned by vtkDataSet.GetBounds if they are known without
+    reading it (which is the case for image data), or None otherwise.
+    """
+    if os.path.isfile(filePath) is False:
+        raise ValueError("File \"{}\" does not exist.".format(filePath))
+
+    root = xml.etree.ElementTree.parse(filePath).getroot()
+    dataSetElement = root.find(root.get("type", ""))
+    if root.tag != "VTKFile" or dataSetElement is None:
+        raise ValueError("File \"{}\" is not a partitioned VTK file."
+                         .format(filePath))
+
+    # Image data pieces can be placed from their extents.
+    origin = spacing = None
+    if dataSetElement.tag == "PImageData":
+        origin = [float(zI) for zI in
+                  dataSetElement.get("Origin", "0 0 0").split()]
+        spacing = [float(zI) for zI in
+                   dataSetElement.get("Spacing", "1 1 1").split()]
+
+    # Piece files are found relative to the partitioned file.
+    directory = os.path.dirname(filePath)
+    pieces = []
+    for pieceElement in dataSetElement.findall("Piece"):
+        piecePath = os.path.join(directory, pieceElement.get("Source"))
+        bounds = None
+        if origin is not None:
+            extent = [int(zI) for zI in pieceElement.get("Extent").split()]
+            bounds = []
+            for zI in xrange(3):
+                bounds += sorted([origin[zI] + extent[zI * 2] * spacing[zI],
+                                  origin[zI] +
+                                  extent[zI * 2 + 1] * spacing[zI]])
+        pieces.append([piecePath, bounds])
+
+    if len(pieces) == 0:
+        raise ValueError("File \"{}\" has no pieces.".format(filePath))
+    return pieces
+
+
+def read_partitioned_visualisation_toolkit_file(filePath, maskDomain=None):
+    """
+    Read the pieces of a partitioned VTK file (.pvti, .pvtp, .pvtr, .pvts, or
+    .pvtu) one at a time with read_visualisation_toolkit_file, and combine
+    them with append_data_sets.
+
+    Arguments:
+
+      - filePath: String containing the path to the partitioned file to read.
+
+      - maskDomain: As in load_partitioned_visualisation_toolkit_file.
+
+    Returns the combined VTK data set.
+    """
+    pieces = partitioned_file_pieces(filePath)
+
+    # Don't read pieces that we know are outside the mask domain.
+    domainBounds = None
+    if maskDomain is not None:
+        domainBounds = mask.domain_bounds(maskDomain)
+        pieces = [piece for piece in pieces if piece[1] is None or
+                  bounds_intersect(piece[1], domainBounds) is True]
+
+    dataSets = [read_visualisation_toolkit_file(piece[0]) for piece in pieces]
+
+    # Discard the pieces we now know are outside the mask domain.
+    if domainBounds is not None:
+        dataSets = [dataSet for dataSet in dataSets
+                    if bounds_intersect(dataSet.GetBounds(),
+                                        domainBounds) is True]
+    if len(dataSets) == 0:
+        raise ValueError("No pieces of file \"{}\" intersect mask domain {}."
+                         .format(filePath, maskDomain))
+
+    return append_data_sets(dataSets)
+
+
+def read_visualisation_toolkit_file(filePath):
+    """
+    Read the file "filePath" with the reader that
+    load_visualisation_toolkit_file would use for it, and return the data set
+    without the reader.
+
+    OOMMF vector field files are read with read_oommf_file, and partitioned
+    files are read with read_partitioned_visualisation_toolkit_file.
+
+    Arguments:
+
+      - filePath: String containing the path to the file to read.
+
+    Returns the VTK data object read from the file.
+    """
+    if filePath.split(".")[-1] in oommfExtensions:
+        return numpy_vector_field_data_set(*read_oommf_file(filePath))
+    if filePath.split(".")[-1] in partitionedExtensions:
+        return read_partitioned_visualisation_toolkit_file(filePath)
+
+    vtReader = reader_for_file(filePath)
+    vtReader.SetFileName(filePath)
+    vtReader.Update()
+
+    # Detach the data set from the reader, so that the reader can be freed.
+    output = vtReader.GetOutputDataObject(0)
+    dataSet = output.NewInstance()
+    dataSet.ShallowCopy(output)
+    return dataSet
+
+
+def resolve_bounding_box(self, numberOfPieces=1):
+    """
+    Expand the bounding box of a visualisation to contain the data sets of the
+    files loaded since it was last resolved, and return it.
+
+    The bounds of image data are computed from the header of the file. Other
+    data sets are read in full, which is the only time the file is read unless
+    it is later modified, because the pipeline does not re-execute readers that
+    are up to date. Data sets can instead be read one piece at a time, so that
+    the whole data set is never in memory at once.
+
+    Arguments:
+
+      - numberOfPieces: Integer denoting the number of pieces to read data
+          sets in.
+
+    Returns the bounding box, which is a six-element list in the form returned
+    by vtkDataSet.GetBounds.
+    """
+    while len(self._unresolvedBoundingBoxSources) != 0:
+        source = self._unresolvedBoundingBoxSources.pop(0)
+        bounds = information_bounds(source)
+        if bounds is not None:
+            expand_bounding_box(self, bounds)
+            continue
+
+        for piece in xrange(numberOfPieces):
+            helpers.update_piece(source, piece, numberOfPieces)
+            output = source.GetOutputDataObject(0)
+
+            # Empty pieces have no bounds to contain.
+            if output.GetNumberOfPoints() > 0:
+                expand_bounding_box(self, output.GetBounds())
+    return self._resolvedBoundingBox
+
+
+def reader_for_file(filePath):
+    """
+    Create a VTK reader object that can read the file "filePath". The type of
+    object created depends on the extension of "filePath". The filename of the
+    reader is not set.
+
+    Arguments:
+
+      - filePath: String containing the path to the file to read.
+
+    Returns the reader object.
+    """
+
+    # Check that the file exists.
+    if os.path.isfile(filePath) is False:
+        errorMsg = ("File \"{}\" does not exist.".format(filePath))
+        raise ValueError(errorMsg)
 
     # Get the extension.
     extension = filePath.split(".")[-1]
@@ -42,15 +1175,10 @@ def load_visualisation_toolkit_file(self, filePath, readerName=None):
     errorMsg = ("I don't know what to do with data set type {}. Please "
                 "consider modifying my code to include this type :(.")
     if extension == "vtk":
-        with open(filePath, "r") as dataFile:
-            for line in dataFile.readlines():
-                if len(line.split()) != 0:
-                    if line.split()[0] == "DATASET":
-                        dataSetType = line.split()[1]
-                        if dataSetType not in validBinaryDataTypes.keys():
-                            raise NotImplementedError(errorMsg.format(dataSetType))
-                        vtReader = validBinaryDataTypes[dataSetType]()
-                        break
+        dataSetType = legacy_data_set_type(filePath)
+        if dataSetType not in validBinaryDataTypes.keys():
+            raise NotImplementedError(errorMsg.format(dataSetType))
+        vtReader = validBinaryDataTypes[dataSetType]()
 
     # Complain if we don't recognise the extension.
     elif extension not in validExtensions.keys():
@@ -60,26 +1188,124 @@ def load_visualisation_toolkit_file(self, filePath, readerName=None):
         raise ValueError(errorMsg)
 
     # If we do recognise the extension, create an instance of the class for
-    # this extension and track it.
+    # this extension.
     else:
         vtReader = validExtensions[extension]()
 
-    vtReader.SetFileName(filePath)
-    vtReader.Update()
+    return vtReader
 
-    self.track_object(vtReader, sensibleName)
 
-    # Get some bounding box data for later. If we have already loaded some
-    # data, keep the most extreme.
-    thisBoundingBox = vtReader.GetOutputDataObject(0).GetBounds()
-    for zI in xrange(3):
-        self._boundingBox[zI * 2] = min(self._boundingBox[zI * 2],
-                                        thisBoundingBox[zI * 2])
-        self._boundingBox[zI * 2 + 1] = max(self._boundingBox[zI * 2 + 1],
-                                            thisBoundingBox[zI * 2 + 1])
+class TimeSeriesPrefetcher(object):
+    """
+    This class loads a series of items in order on a background thread,
+    keeping a limited number of loaded items ahead of the one last taken. It
+    is an iterator, which yields each key with its loaded item. The thread
+    stops once the last item is taken, or when the prefetcher is closed.
 
-    return sensibleName
+    Initialisation arguments:
+
+      - keys: Iterable of keys denoting the items to load, in order.
+
+      - loadFunction: Function that takes a key as a solitary argument, and
+          returns the loaded item.
+
+      - prefetchDepth: Integer denoting the number of items to load ahead of
+          the one last taken.
+    """
+
+    def __init__(self, keys, loadFunction, prefetchDepth=2):
+        if prefetchDepth < 1:
+            raise ValueError("Prefetch depth ({}) must be at least one."
+                             .format(prefetchDepth))
+        self.keys = list(keys)
+        self.loadFunction = loadFunction
+        self.prefetchDepth = prefetchDepth
+
+        self._itemsTaken = 0
+        self._queue = Queue.Queue()
+        self._slots = threading.Semaphore(prefetchDepth)
+        self._stopping = False
+        self._thread = threading.Thread(target=self._work)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def __iter__(self):
+        return self
+
+    def _work(self):
+        """
+        Load each item once there is a free slot for it, and queue it. Errors
+        are queued in place of the item with their traceback, and raised when
+        it is taken.
+        """
+        for key in self.keys:
+            self._slots.acquire()
+            if self._stopping is True:
+                return
+            try:
+                self._queue.put((key, self.loadFunction(key), None))
+            except Exception:
+                self._queue.put((key, None, sys.exc_info()))
+
+    def close(self):
+        """
+        Stop loading items, and discard those that have been loaded. Closing a
+        closed prefetcher does nothing.
+        """
+        if self._stopping is True:
+            return
+        self._stopping = True
+        self._slots.release()
+        self._thread.join()
+        self._itemsTaken = len(self.keys)
+        while self._queue.empty() is False:
+            self._queue.get()
+
+    def next(self):
+        """
+        Returns the next key and its loaded item, waiting for it to load if
+        needed. Raises StopIteration if all items have been taken, and closes
+        this prefetcher once the last item is taken.
+        """
+        if self._itemsTaken == len(self.keys):
+            raise StopIteration
+        key, item, error = self._queue.get()
+        self._itemsTaken += 1
+        self._slots.release()
+        if self._itemsTaken == len(self.keys):
+            self.close()
+        if error is not None:
+            raise error[0], error[1], error[2]
+        return key, item
+
+
+# Define the cache of data sets read from files used by
+# load_visualisation_toolkit_file, which is shared by all visualisations. The
+# maximum size is in bytes, and can be changed to suit the memory available.
+dataSetCache = helpers.LRUCache(maximumSize=2 ** 30,
+                                sizeFunction=data_set_memory_size)
+
+# Define how much of the header of legacy VTK files legacy_data_set_type
+# reads. Lines in the header are at most 256 characters long, and a few blank
+# lines are allowed after the title.
+legacyHeaderLineLength = 257
+legacyHeaderLines = 8
+
+# Define the extensions of OOMMF vector field files, which are loaded with
+# load_oommf_file, the values that start binary data in these files, and the
+# length at which header lines are split when reading them.
+oommfExtensions = ["obf", "ohf", "omf", "ovf"]
+oommfBinaryCheckValues = {4: 1234567.0, 8: 123456789012345.0}
+oommfHeaderLineLength = 4096
 
+# Define the extensions of partitioned VTK files, which are loaded with
+# load_partitioned_visualisation_toolkit_file. Each extension is mapped to the
+# VTK reader class used when streaming them.
+partitionedExtensions = {"pvti": vtk.vtkXMLPImageDataReader,
+                         "pvtp": vtk.vtkXMLPPolyDataReader,
+                         "pvtr": vtk.vtkXMLPRectilinearGridReader,
+                         "pvts": vtk.vtkXMLPStructuredGridReader,
+                         "pvtu": vtk.vtkXMLPUnstructuredGridReader}
 
 # Define valid extensions for load_visualisation_toolkit_file to
 # support. Each extension is mapped to a class, so that an instance can
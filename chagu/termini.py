@@ -6,6 +6,7 @@
 import matplotlib.cm
 import numpy as np
 import vtk
+from vtk.util import numpy_support
 
 import chagu.helpers as helpers
 import chagu.mask as mask
@@ -49,6 +50,7 @@ class Terminus:
 
         self.actor = actor
         self.variety = variety
+        self.vtkEndObject = vtkEndObject
 
         if self.actor.GetMapper() is not None:
             self.Update = self.actor.GetMapper().Update
@@ -58,6 +60,68 @@ class Terminus:
             self.GetNumberOfInputPorts = vtkEndObject.GetNumberOfInputPorts
 
 
+class GlyphLevelOfDetail(object):
+    """
+    This class chooses which of a series of masks a glyph mapper draws from,
+    so that fewer glyphs are drawn when they would be too close together on
+    the screen to make out. It is an observer for the "StartEvent" of a
+    renderer, so that the choice is made each time the scene is drawn, from
+    the size of the renderer and the camera at that time.
+
+    The mask with the most points whose points are at least
+    minimumGlyphSpacing pixels apart on the screen (at the focal point of the
+    camera) is chosen, or the mask with the fewest points if there is none.
+    The mapper is left alone if it is not drawing from one of the masks, for
+    example while its data are being streamed.
+
+    Initialisation arguments:
+
+      - mapper: vtkGlyph3DMapper to choose the input of.
+
+      - maskPyramid: List of masks and the distances between the points they
+          sample, as returned by mask.create_mask_pyramid_from_opts.
+
+      - minimumGlyphSpacing: Float denoting the smallest distance in pixels
+          between the points of the mask chosen.
+    """
+    def __init__(self, mapper, maskPyramid, minimumGlyphSpacing=4.):
+        self.mapper = mapper
+        self.maskFilters = [level[0] for level in maskPyramid]
+        self.spacings = [level[1] for level in maskPyramid]
+        self.minimumGlyphSpacing = minimumGlyphSpacing
+
+    def __call__(self, renderer, event):
+        self.select(renderer)
+
+    def select(self, renderer):
+        """
+        Connect the mapper to the mask appropriate for a renderer, and return
+        the index of that mask.
+        """
+        camera = renderer.GetActiveCamera()
+        height = renderer.GetSize()[1]
+        if camera.GetParallelProjection() == 1:
+            viewHeight = 2 * camera.GetParallelScale()
+        else:
+            viewHeight = 2 * camera.GetDistance() *\
+                np.tan(np.radians(camera.GetViewAngle()) / 2.)
+        pixelsPerUnit = height / viewHeight if viewHeight > 0 else 0.
+
+        level = len(self.maskFilters) - 1
+        for zI, spacing in enumerate(self.spacings):
+            if spacing * pixelsPerUnit >= self.minimumGlyphSpacing:
+                level = zI
+                break
+
+        # Don't interfere with anything else drawn by the mapper.
+        producer = self.mapper.GetInputAlgorithm()
+        if producer in self.maskFilters and\
+           producer is not self.maskFilters[level]:
+            self.mapper.SetInputConnection(
+                self.maskFilters[level].GetOutputPort())
+        return level
+
+
 def act_colourbar(self, colourBarName=None, colourMap=None, labelProps={},
                   numLabels=5, resolution=1024, title=None, titleProps={}):
     """
@@ -102,7 +166,8 @@ def act_colourbar(self, colourBarName=None, colourMap=None, labelProps={},
     # Come up with a name for the object.
     sensibleName = colourBarName if colourBarName is not None else "colourbar"
     sensibleName = helpers.generate_sensible_name(sensibleName,
-                                                  self.is_tracked)
+                                                  self.is_tracked,
+                                                  self._nameCounters)
 
     # Create the lookup table for this colourbar if a different map is
     # required.
@@ -159,8 +224,10 @@ def act_colourbar(self, colourBarName=None, colourMap=None, labelProps={},
 
 
 def act_cone_vector_field(self, coneLength, coneRadius, coneResolution,
-                          colourMap="PuOr", coneCentre="base", maskDomain=None,
-                          maskResolution=None, maskType=None,
+                          colourMap="PuOr", coneCentre="base",
+                          levelsOfDetail=1, maskDomain=None,
+                          maskResolution=None, maskStride=False,
+                          maskType=None, minimumGlyphSpacing=4.,
                           uniformLength=True, vectorsName=None):
     """
     Define a vtkActor that draws a vector field of cones representing the data.
@@ -187,6 +254,12 @@ def act_cone_vector_field(self, coneLength, coneRadius, coneResolution,
           cones locally. If "base", centre cones at their base. Changing this
           is great if your cones look misaligned with each other.
 
+      - levelsOfDetail: Integer denoting the number of masks to create, each
+          with half the resolution of the one before it. If this is more than
+          one, the mask drawn is chosen each time the scene is drawn, so that
+          cones are not drawn closer together on the screen than
+          minimumGlyphSpacing (see GlyphLevelOfDetail). This requires masking.
+
       - maskDomain: Nine element list that defines a rectangle in
           three-dimensional space. The input data represents three adjacent
           corners as follows:
@@ -203,6 +276,13 @@ def act_cone_vector_field(self, coneLength, coneRadius, coneResolution,
            "volume", three elements are required. If "maskType" is "plane", two
            elements are required.
 
+      - maskStride: Boolean denoting whether or not to mask image,
+          rectilinear, and structured grid data by picking points at regular
+          index strides, as opposed to interpolating the data. This is much
+          faster for large grids, but glyphs are placed at the nearest grid
+          points rather than on the mask, and invalid points are not
+          filtered out. Other data are always interpolated.
+
       - maskType: String denoting the type of masking to do. Either "plane",
           "volume", or None.
 
@@ -210,6 +290,9 @@ def act_cone_vector_field(self, coneLength, coneRadius, coneResolution,
       # masking behaviours the user may wish to consider. They are summarised
       # by the table in the documentation of mask.create_mask_from_opts.
 
+      - minimumGlyphSpacing: Float denoting the smallest distance in pixels
+          between cones drawn, if there is more than one level of detail.
+
       - uniformLength: Boolean determining whether or not to make all cones the
           same length.
 
@@ -223,7 +306,8 @@ def act_cone_vector_field(self, coneLength, coneRadius, coneResolution,
     # Come up with a name for the object.
     sensibleName = vectorsName if vectorsName is not None else "cones"
     sensibleName = helpers.generate_sensible_name(sensibleName,
-                                                  self.is_tracked)
+                                                  self.is_tracked,
+                                                  self._nameCounters)
 
     # Create the lookup table for this colourbar if a different map is
     # required.
@@ -232,28 +316,23 @@ def act_cone_vector_field(self, coneLength, coneRadius, coneResolution,
     else:
         lut = self._colourmap_lut
 
-    # Create the mask (resampling) filter if desired.
+    # Create the mask (resampling) filters if desired.
     if maskDomain is None and maskResolution is None and maskType is None:
         masking = False
+        if levelsOfDetail != 1:
+            raise ValueError("Levels of detail can only be used with a mask.")
     else:
         masking = True
         glyphSize = (coneLength if coneLength > 2 * coneRadius else
                      coneRadius * 2)
-        maskFilter = mask.create_mask_from_opts(self._boundingBox, glyphSize,
-                                                maskDomain=maskDomain,
-                                                maskResolution=maskResolution,
-                                                maskType=maskType)
-
-    # Define vector glyphs.
-    cones = vtk.vtkConeSource()
-    cones.SetRadius(coneRadius)
-    cones.SetHeight(coneLength)
-    cones.SetResolution(coneResolution)
+        maskPyramid = mask.create_mask_pyramid_from_opts(
+            self._boundingBox, glyphSize, levelsOfDetail,
+            maskDomain=maskDomain, maskResolution=maskResolution,
+            maskType=maskType, regularGridStride=maskStride)
 
-    if coneCentre == "base":
-        cones.SetCenter(coneLength / 3., 0., 0.)
-    else:
-        cones.SetCenter(*coneCentre)
+    # Define vector glyphs, which are shared with other termini drawing the
+    # same cones.
+    cones = cone_source(coneLength, coneRadius, coneResolution, coneCentre)
 
     # Create the mapper for the vectors.
     vectorMapper = vtk.vtkGlyph3DMapper()
@@ -273,13 +352,8 @@ def act_cone_vector_field(self, coneLength, coneRadius, coneResolution,
     vectorActor.SetMapper(vectorMapper)
 
     if masking is True:
-        vectorMapper.SetInputConnection(maskFilter.GetOutputPort())
-        terminus = Terminus(vectorActor, variety="cone_field",
-                            vtkEndObject=maskFilter)
-
-        # Secretly, maskFilter has two input ports; one for the input and one
-        # for the source. Hence, we need to be specific here...
-        terminus.default_input_port = 1
+        terminus = masked_glyph_terminus(vectorActor, "cone_field",
+                                         maskPyramid, minimumGlyphSpacing)
     else:
         terminus = Terminus(vectorActor, variety="cone_field",
                             vtkEndObject=vectorMapper)
@@ -289,7 +363,9 @@ def act_cone_vector_field(self, coneLength, coneRadius, coneResolution,
 
 
 def act_nasty_vector_field(self, arrowLength, arrowColour=[0., 0., 0.],
-                           maskDomain=None, maskResolution=None, maskType=None,
+                           levelsOfDetail=1, maskDomain=None,
+                           maskResolution=None, maskStride=False,
+                           maskType=None, minimumGlyphSpacing=4.,
                            uniformLength=True, vectorsName=None):
     """
     Define a vtkActor that draws a vector field of nasty arrows representing
@@ -302,6 +378,9 @@ def act_nasty_vector_field(self, arrowLength, arrowColour=[0., 0., 0.],
       - arrowColour: Three element list of floats between 0 and 1 that define
           the colour of the arrows in RGB format.
 
+      - levelsOfDetail: Integer denoting the number of masks to create, as in
+          act_cone_vector_field. This requires masking.
+
       - maskDomain: Nine element list that defines a rectangle in
           three-dimensional space. The input data represents three adjacent
           corners as follows:
@@ -318,6 +397,13 @@ def act_nasty_vector_field(self, arrowLength, arrowColour=[0., 0., 0.],
            "volume", three elements are required. If "maskType" is "plane", two
            elements are required.
 
+      - maskStride: Boolean denoting whether or not to mask image,
+          rectilinear, and structured grid data by picking points at regular
+          index strides, as opposed to interpolating the data. This is much
+          faster for large grids, but glyphs are placed at the nearest grid
+          points rather than on the mask, and invalid points are not
+          filtered out. Other data are always interpolated.
+
       - maskType: String denoting the type of masking to do. Either "plane",
           "volume", or None.
 
@@ -325,6 +411,9 @@ def act_nasty_vector_field(self, arrowLength, arrowColour=[0., 0., 0.],
       # masking behaviours the user may wish to consider. They are summarised
       # by the table in the documentation of mask.create_mask_from_opts.
 
+      - minimumGlyphSpacing: Float denoting the smallest distance in pixels
+          between arrows drawn, if there is more than one level of detail.
+
       - uniformLength: Boolean determining whether or not to make all arrows
           the same length.
 
@@ -338,17 +427,20 @@ def act_nasty_vector_field(self, arrowLength, arrowColour=[0., 0., 0.],
     # Come up with a name for the object.
     sensibleName = vectorsName if vectorsName is not None else "nasty_arrows"
     sensibleName = helpers.generate_sensible_name(sensibleName,
-                                                  self.is_tracked)
+                                                  self.is_tracked,
+                                                  self._nameCounters)
 
-    # Create the mask (resampling) filter if desired.
+    # Create the mask (resampling) filters if desired.
     if maskDomain is None and maskResolution is None and maskType is None:
         masking = False
+        if levelsOfDetail != 1:
+            raise ValueError("Levels of detail can only be used with a mask.")
     else:
         masking = True
-        maskFilter = mask.create_mask_from_opts(self._boundingBox, arrowLength,
-                                                maskDomain=maskDomain,
-                                                maskResolution=maskResolution,
-                                                maskType=maskType)
+        maskPyramid = mask.create_mask_pyramid_from_opts(
+            self._boundingBox, arrowLength, levelsOfDetail,
+            maskDomain=maskDomain, maskResolution=maskResolution,
+            maskType=maskType, regularGridStride=maskStride)
 
     # Create the nasty arrow polydata.
     arrowPolyData = nasty_arrow_polydata(arrowLength, arrowLength / 2.,
@@ -375,13 +467,8 @@ def act_nasty_vector_field(self, arrowLength, arrowColour=[0., 0., 0.],
         vectorMapper.SetSourceData(arrowPolyData)
 
     if masking is True:
-        vectorMapper.SetInputConnection(maskFilter.GetOutputPort())
-        terminus = Terminus(vectorActor, variety="nasty_vector_field",
-                            vtkEndObject=maskFilter)
-
-        # Secretly, maskFilter has two input ports; one for the input and one
-        # for the source. Hence, we need to be specific here...
-        terminus.default_input_port = 1
+        terminus = masked_glyph_terminus(vectorActor, "nasty_vector_field",
+                                         maskPyramid, minimumGlyphSpacing)
     else:
         terminus = Terminus(vectorActor, variety="nasty_vector_field",
                             vtkEndObject=vectorMapper)
@@ -422,7 +509,8 @@ def act_surface(self, colourMap="PuOr", opacity=1., position=[0., 0., 0.],
     # Come up with a name for the object.
     sensibleName = surfaceName if surfaceName is not None else "surface"
     sensibleName = helpers.generate_sensible_name(sensibleName,
-                                                  self.is_tracked)
+                                                  self.is_tracked,
+                                                  self._nameCounters)
 
     # Create the lookup table for this colourbar if a different map is
     # required.
@@ -454,6 +542,44 @@ def act_surface(self, colourMap="PuOr", opacity=1., position=[0., 0., 0.],
     return sensibleName
 
 
+def cone_source(coneLength, coneRadius, coneResolution, coneCentre="base"):
+    """
+    Create a vtkConeSource that produces the cones drawn by
+    act_cone_vector_field, pointing in the positive x-direction.
+
+    Cone sources are cached in glyphSourceCache, so that termini asking for
+    the same cone share one object. As such, modifying the returned source
+    modifies it for everyone that uses it.
+
+    Arguments:
+
+      - coneLength, coneRadius, coneResolution, coneCentre: As in
+          act_cone_vector_field.
+
+    Returns the vtkConeSource object.
+    """
+
+    # Use the cached source if we have built this one before.
+    centreKey = coneCentre if coneCentre == "base" else tuple(coneCentre)
+    cacheKey = ("cone", coneLength, coneRadius, coneResolution, centreKey)
+    cones = glyphSourceCache.get(cacheKey)
+    if cones is not None:
+        return cones
+
+    cones = vtk.vtkConeSource()
+    cones.SetRadius(coneRadius)
+    cones.SetHeight(coneLength)
+    cones.SetResolution(coneResolution)
+
+    if coneCentre == "base":
+        cones.SetCenter(coneLength / 3., 0., 0.)
+    else:
+        cones.SetCenter(*coneCentre)
+
+    glyphSourceCache.put(cacheKey, cones)
+    return cones
+
+
 def lookup_table_from_RGB_colourmap(colourMap, scalarRange=[-1., 1.],
                                     tableSize=1024):
     """
@@ -462,6 +588,11 @@ def lookup_table_from_RGB_colourmap(colourMap, scalarRange=[-1., 1.],
     resulting lookup table can be used to colour scalar fields and vector
     fields.
 
+    The colours of lookup tables created from the name of a colourmap are
+    cached, so that the colourmap is only evaluated once for each table size.
+    Each call returns a new table with its own copy of the colours, so
+    modifying the returned table does not affect any other.
+
     Arguments:
 
       - colourMap: LinearSegmentedColormap object from matplotlib to create a
@@ -476,7 +607,43 @@ def lookup_table_from_RGB_colourmap(colourMap, scalarRange=[-1., 1.],
     Returns the resulting vtkLookupTable object.
     """
 
-    if type(colourMap) is str:
+    # Use the cached colours if we have built this table before.
+    cacheKey = None
+    tableColours = None
+    if isinstance(colourMap, basestring):
+        cacheKey = (colourMap, tableSize)
+        tableColours = lookupTableColourCache.get(cacheKey)
+    if tableColours is None:
+        tableColours = lookup_table_colours(colourMap, tableSize)
+        if cacheKey is not None:
+            lookupTableColourCache.put(cacheKey, tableColours)
+
+    # Give the table its own copy of the colours, so that changing them does
+    # not change the colours of other tables.
+    lutColours = vtk.vtkUnsignedCharArray()
+    lutColours.DeepCopy(tableColours)
+    lutOutput = vtk.vtkLookupTable()
+    lutOutput.SetRange(*scalarRange)
+    lutOutput.SetTable(lutColours)
+    return lutOutput
+
+
+def lookup_table_colours(colourMap, tableSize):
+    """
+    Evaluate a matplotlib LinearSegmentedColormap at evenly-spaced positions,
+    to give the colours of a vtkLookupTable.
+
+    Arguments:
+
+      - colourMap: LinearSegmentedColormap object from matplotlib, or the name
+          of an attribute from matplotlib.cm as a string.
+
+      - tableSize: Number of colours to evaluate.
+
+    Returns a vtkUnsignedCharArray of RGBA colours, with one tuple for each
+    colour.
+    """
+    if isinstance(colourMap, basestring):
         colourMap = getattr(matplotlib.cm, colourMap)
 
     # Create the colour function from the input colourmap. This colour function
@@ -496,17 +663,71 @@ def lookup_table_from_RGB_colourmap(colourMap, scalarRange=[-1., 1.],
         ctf.AddRGBPoint(point, segments['red'][zI][1],
                         segments['green'][zI][1], segments['blue'][zI][1])
 
-    # Define the lookup table.
-    lutOutput = vtk.vtkLookupTable()
-    lutOutput.SetNumberOfTableValues(tableSize)
-    lutOutput.SetRange(*scalarRange)
+    # Evaluate the colour function for every entry of the table at once.
+    tablePositions = numpy_support.numpy_to_vtk(
+        np.arange(tableSize) / float(tableSize), deep=True)
+    tableColours = ctf.MapScalars(tablePositions,
+                                  vtk.VTK_COLOR_MODE_MAP_SCALARS, -1)
 
-    lutOutput.Build()
-    for zI in range(0, tableSize):
-        rgb = list(ctf.GetColor(float(zI) / tableSize)) + [1]
-        lutOutput.SetTableValue(zI, rgb)
+    # MapScalars returns a new reference, which the Python wrapper does not
+    # take ownership of unless VTK marks the method as returning one. Drop
+    # the extra reference, so that the array is freed with its wrapper.
+    if tableColours.GetReferenceCount() > 1:
+        tableColours.UnRegister(None)
+    return tableColours
 
-    return lutOutput
+
+# Colours of lookup tables created by lookup_table_from_RGB_colourmap, keyed
+# by colourmap name and table size.
+lookupTableColourCache = helpers.LRUCache(maximumSize=32)
+
+
+def masked_glyph_terminus(vectorActor, variety, maskPyramid,
+                          minimumGlyphSpacing):
+    """
+    Create a terminus that draws glyphs from one or more masks, where the
+    mapper of the actor draws the glyphs. If there is more than one mask, the
+    input of the terminus is passed to all of them, and a GlyphLevelOfDetail
+    is attached to the terminus as its "level_of_detail" attribute.
+
+    Arguments:
+
+      - vectorActor: vtkActor with a vtkGlyph3DMapper.
+
+      - variety: String denoting the variety of the terminus.
+
+      - maskPyramid: List of masks and the distances between the points they
+          sample, as returned by mask.create_mask_pyramid_from_opts.
+
+      - minimumGlyphSpacing: As in GlyphLevelOfDetail.
+
+    Returns the terminus.
+    """
+    vectorMapper = vectorActor.GetMapper()
+    maskFilters = [level[0] for level in maskPyramid]
+    vectorMapper.SetInputConnection(maskFilters[0].GetOutputPort())
+
+    # Secretly, probe filters have two input ports; one for the input and one
+    # for the source. Hence, we need to be specific here...
+    inputPorts = [1 if maskFilter.IsA("vtkProbeFilter") else 0
+                  for maskFilter in maskFilters]
+
+    if len(maskFilters) == 1:
+        terminus = Terminus(vectorActor, variety=variety,
+                            vtkEndObject=maskFilters[0])
+        if inputPorts[0] == 1:
+            terminus.default_input_port = 1
+        return terminus
+
+    # Share the input between the masks.
+    passThrough = vtk.vtkPassThrough()
+    for maskFilter, inputPort in zip(maskFilters, inputPorts):
+        maskFilter.SetInputConnection(inputPort, passThrough.GetOutputPort())
+    terminus = Terminus(vectorActor, variety=variety,
+                        vtkEndObject=passThrough)
+    terminus.level_of_detail = GlyphLevelOfDetail(
+        vectorMapper, maskPyramid, minimumGlyphSpacing=minimumGlyphSpacing)
+    return terminus
 
 
 def nasty_arrow_polydata(length, width, thickness):
@@ -516,6 +737,10 @@ def nasty_arrow_polydata(length, width, thickness):
     x-direction. Polydata in this case is a series of points, and the
     connectivity between these points used to form cells.
 
+    Arrows are cached in glyphSourceCache, so that termini asking for the same
+    arrow share one object. As such, modifying the returned polydata modifies
+    it for everyone that uses it.
+
     Arguments:
 
       - length: Floating point number denoting the length of the arrow, from
@@ -530,6 +755,13 @@ def nasty_arrow_polydata(length, width, thickness):
 
     Returns a vtkPolyData object representing the arrow.
     """
+
+    # Use the cached arrow if we have built this one before.
+    cacheKey = ("nasty_arrow", length, width, thickness)
+    arrowPolyData = glyphSourceCache.get(cacheKey)
+    if arrowPolyData is not None:
+        return arrowPolyData
+
     # Some shorthand for readability.
     lHf = length / 2.
     wHf = width / 2.
@@ -551,61 +783,27 @@ def nasty_arrow_polydata(length, width, thickness):
     # Pointy bit.
     points[4] = lHf, 0., zHf
 
-    # Abusing symmetry to analyse negative width coordinates.
-    for zI in xrange(4):
-        cloneIx = 3 - zI
-        points[zI + 5] = [points[cloneIx, 0], -points[cloneIx, 1],
-                          points[cloneIx, 2]]
-
-    # Abusing symmetry to analyse negative depth coordinates.
-    for zI in xrange(9):
-        points[9 + zI] = points[zI, 0], points[zI, 1], -points[zI, 2]
+    # Abusing symmetry to analyse negative width coordinates, then negative
+    # depth coordinates.
+    points[5:9] = points[3::-1] * [1., -1., 1.]
+    points[9:] = points[:9] * [1., 1., -1.]
 
-    # Create a vtkPoints object to use with polydata, and populate it.
+    # Create a vtkPoints object to use with polydata from the array.
     arrowPoints = vtk.vtkPoints()
-    for point in points:
-        arrowPoints.InsertNextPoint(*point)
-
-    # Define cells representing faces of the arrow.
+    arrowPoints.SetData(numpy_support.numpy_to_vtk(points.astype(np.float32),
+                                                   deep=True))
+
+    # Define cells representing faces of the arrow, which are the upper face,
+    # the lower face, and the middle faces in that order. Cells are stored as
+    # the number of points in the cell followed by their indices, which we
+    # give to the cell array all at once.
+    connectivity = np.concatenate([[len(cellData)] + cellData
+                                   for cellData in nastyArrowCellIndices])
     arrowCells = vtk.vtkCellArray()
-
-    # Upper face.
-    upperCellIndices = [[0, 1, 7, 8],
-                        [1, 2, 3, 4],
-                        [4, 5, 6, 7],
-                        [1, 4, 7]]
-
-    for cellData in upperCellIndices:
-        arrowCells.InsertNextCell(len(cellData))
-        for cellIndex in cellData:
-            arrowCells.InsertCellPoint(cellIndex)
-
-    # Lower face.
-    lowerCellIndices = [[9, 10, 16, 17],
-                        [10, 11, 12, 13],
-                        [13, 14, 15, 16],
-                        [10, 13, 16]]
-
-    for cellData in lowerCellIndices:
-        arrowCells.InsertNextCell(len(cellData))
-        for cellIndex in cellData:
-            arrowCells.InsertCellPoint(cellIndex)
-
-    # Middle faces.
-    middleCellIndices = [[0, 1, 9, 10],
-                         [1, 2, 11, 10],
-                         [2, 3, 12, 11],
-                         [3, 4, 13, 12],
-                         [4, 5, 14, 13],
-                         [5, 6, 15, 14],
-                         [6, 7, 16, 15],
-                         [7, 8, 17, 16],
-                         [8, 0, 9, 17]]
-
-    for cellData in middleCellIndices:
-        arrowCells.InsertNextCell(len(cellData))
-        for cellIndex in cellData:
-            arrowCells.InsertCellPoint(cellIndex)
+    arrowCells.SetCells(len(nastyArrowCellIndices),
+                        numpy_support.numpy_to_vtkIdTypeArray(
+                            connectivity.astype(numpy_support.ID_TYPE_CODE),
+                            deep=True))
 
     # Create polydata representing the glyph.
     arrowPolyData = vtk.vtkPolyData()
@@ -615,4 +813,31 @@ def nasty_arrow_polydata(length, width, thickness):
     if helpers.vtk_base_version() < 6:
         arrowPolyData.Update()
 
+    glyphSourceCache.put(cacheKey, arrowPolyData)
     return arrowPolyData
+
+
+# Glyph sources created by cone_source and nasty_arrow_polydata, keyed by the
+# type of glyph and its parameters.
+glyphSourceCache = helpers.LRUCache(maximumSize=32)
+
+# Define the faces of the arrows created by nasty_arrow_polydata, in terms of
+# the indices of its points. These are the upper face, the lower face, and the
+# middle faces in that order.
+nastyArrowCellIndices = [[0, 1, 7, 8],
+                         [1, 2, 3, 4],
+                         [4, 5, 6, 7],
+                         [1, 4, 7],
+                         [9, 10, 16, 17],
+                         [10, 11, 12, 13],
+                         [13, 14, 15, 16],
+                         [10, 13, 16],
+                         [0, 1, 9, 10],
+                         [1, 2, 11, 10],
+                         [2, 3, 12, 11],
+                         [3, 4, 13, 12],
+                         [4, 5, 14, 13],
+                         [5, 6, 15, 14],
+                         [6, 7, 16, 15],
+                         [7, 8, 17, 16],
+                         [8, 0, 9, 17]]
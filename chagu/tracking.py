@@ -39,12 +39,16 @@ def is_nasty(self, objectName):
 def is_reader(self, objectName):
     """
     Returns True if the object is tracked and is a reader, and False otherwise.
+    Sources that produce data sets without reading them directly, such as time
+    series sources, are marked with an "is_source" attribute and are treated
+    as readers.
     """
 
     if self.is_tracked(objectName):
         vtkObject = self.get_vtk_object(objectName)
         return isinstance(vtkObject, vtk.vtkXMLReader) or\
-            isinstance(vtkObject, vtk.vtkDataReader)
+            isinstance(vtkObject, vtk.vtkDataReader) or\
+            getattr(vtkObject, "is_source", False) is True
     return False
 
 
@@ -60,7 +64,7 @@ def is_tracked(self, objectName):
     False otherwise.
     """
 
-    return True if objectName in self._vtkObjects.keys() else False
+    return objectName in self._vtkObjects
 
 
 def track_object(self, objectToTrack, objectName):
@@ -106,6 +110,11 @@ def track_object(self, objectToTrack, objectName):
                                  "is required for the pipeline."
                                  .format(objectName, methodHandle))
 
+    # Stop loading the series of a time series source that is being replaced.
+    replacedObject = self._vtkObjects.get(objectName)
+    if hasattr(replacedObject, "time_series") is True:
+        replacedObject.time_series.close()
+
     # All pipeline methods are defined, so we track the object.
     self._order.append(objectName)
     if isTerminus is True:
@@ -113,3 +122,7 @@ def track_object(self, objectToTrack, objectName):
         self._vtkTermini[objectName] = objectToTrack
     else:
         self._vtkObjects[objectName] = objectToTrack
+
+    # Profile the object if the visualisation is being profiled.
+    if self._profiler is not None and self._profiler.enabled is True:
+        self.profile_object(objectName)
@@ -3,7 +3,9 @@
 # other methods that don't fit into the other source files.
 
 import filters
+import graph
 import pipeline
+import profiling
 import render
 import sources
 import termini
@@ -77,19 +79,63 @@ class Visualisation(object):
 
         # Set initial values for member variables that the public shouldn't
         # see.
-        self._boundingBox = [0 for zI in range(6)]
         self._colourmap_lut = termini.lookup_table_from_RGB_colourmap("PuOr")
+        self._levelOfDetailObservers = []  # Tags of renderer observers.
+        self._nameCounters = {}  # Next name suffix to try for each default
+                                 # name, see generate_sensible_name.
         self._order = []  # This list maintains the order objects were
                           # added. This is for autopiping.
         self._pipeline = []
+        self._profiler = None  # PipelineProfiler, see start_profiling.
+        self._renderer = None
+        self._renderWindow = None
+        self._resolvedBoundingBox = [0 for zI in range(6)]
+        self._snapshotWriter = None
+        self._unresolvedBoundingBoxSources = []  # Sources whose bounds have
+                                                 # not yet been computed.
         self._vtkObjects = {}
         self._vtkTermini = {}
+        self._pipelineGraph = graph.PipelineGraph(self._vtkObjects,
+                                                  self._order)
 
         # Load file if needed.
         if filePath is not None:
             self.load_visualisation_toolkit_file(filePath)
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exceptionType, exceptionValue, traceback):
+        self.close()
+
+    def close(self):
+        """
+        Release the resources held by this visualisation that would otherwise
+        outlive it, by waiting for the images saved asynchronously by
+        visualise_save to be written, stopping the threads writing them,
+        stopping profiling, which removes the observers added by
+        start_profiling, and stopping the threads loading the series of time
+        series sources. This is called on leaving a "with" block over the
+        visualisation. The visualisation can still be used afterwards, but
+        time series sources can no longer be advanced.
+
+        Returns nothing.
+        """
+        self.flush_snapshots()
+        self.stop_profiling()
+        for vtkObject in self._vtkObjects.values():
+            if hasattr(vtkObject, "time_series") is True:
+                vtkObject.time_series.close()
+
     ## Properties and setters.
+    @property
+    def _boundingBox(self):
+        """
+        The bounding box containing all of the data loaded by this
+        visualisation, which is computed lazily when it is needed.
+        """
+        return sources.resolve_bounding_box(self)
+
     @property
     def background(self):
         return self._background
@@ -237,20 +283,50 @@ class Visualisation(object):
     slice_data_with_plane = filters.slice_data_with_plane
 
     # Pipeline functions.
+    add_connection = pipeline.add_connection
     autopipe = pipeline.autopipe
     build_pipeline_from_dict = pipeline.build_pipeline_from_dict
     check_connection = pipeline.check_connection
     connect_vtk_objects = pipeline.connect_vtk_objects
+    connection_ports = pipeline.connection_ports
+    disconnect_vtk_objects = pipeline.disconnect_vtk_objects
     draw_pipeline_graphviz = pipeline.draw_pipeline_graphviz
+    get_pipeline_graph = pipeline.get_pipeline_graph
+    pipeline_graphviz = pipeline.pipeline_graphviz
+    remove_connection = pipeline.remove_connection
+    update_pipeline = pipeline.update_pipeline
+
+    # Profiling functions.
+    pipeline_profile = profiling.pipeline_profile
+    profile_object = profiling.profile_object
+    profile_results = profiling.profile_results
+    profile_table = profiling.profile_table
+    save_pipeline_profile = profiling.save_pipeline_profile
+    start_profiling = profiling.start_profiling
+    stop_profiling = profiling.stop_profiling
 
     # Rendering-related functions.
     build_renderer_and_window = render.build_renderer_and_window
+    flush_snapshots = render.flush_snapshots
+    release_renderer_and_window = render.release_renderer_and_window
     visualise_animate_rotate = render.visualise_animate_rotate
     visualise_interact = render.visualise_interact
+    visualise_rotation_frames = render.visualise_rotation_frames
     visualise_save = render.visualise_save
+    visualise_save_series = render.visualise_save_series
+    visualise_stream = render.visualise_stream
+    visualise_to_array = render.visualise_to_array
 
     # Sourcing functions.
+    advance_time_series = sources.advance_time_series
+    load_hdf5_vector_field = sources.load_hdf5_vector_field
+    load_numpy_vector_field = sources.load_numpy_vector_field
+    load_oommf_file = sources.load_oommf_file
+    load_partitioned_visualisation_toolkit_file = \
+        sources.load_partitioned_visualisation_toolkit_file
     load_visualisation_toolkit_file = sources.load_visualisation_toolkit_file
+    load_visualisation_toolkit_time_series = \
+        sources.load_visualisation_toolkit_time_series
 
     # Terminus / actor functions.
     act_colourbar = termini.act_colourbar
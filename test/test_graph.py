@@ -0,0 +1,128 @@
+"""
+This python file tests the functionality of functions and classes defined in
+chagu/graph.py. Tests are detailed in the function documentation.
+"""
+
+import chagu
+import os
+import pytest
+import vtk
+
+
+pathToThisFile = os.path.dirname(os.path.realpath(__file__))
+relativeVtuFilePathData = "../example/data/data.vtu"
+absFilePathData = "{}/{}".format(pathToThisFile, relativeVtuFilePathData)
+
+
+def test_modified_time():
+    """
+    Test chagu.graph.modified_time. We test the following cases:
+
+    1. The modified time of a VTK object is its own modified time, and
+        increases when it is modified.
+    2. The modified time of a terminus is the modified time of its mapper.
+    3. Objects without a modified time have a modified time of zero.
+    """
+
+    # Test 1: The modified time of a VTK object is its own modified time, and
+    # increases when it is modified.
+    vtkObject = vtk.vtkArrowSource()
+    initialTime = chagu.graph.modified_time(vtkObject)
+    assert initialTime == vtkObject.GetMTime()
+    vtkObject.SetTipLength(0.5)
+    assert chagu.graph.modified_time(vtkObject) > initialTime
+    assert chagu.graph.current_time() > chagu.graph.modified_time(vtkObject)
+
+    # Test 2: The modified time of a terminus is the modified time of its
+    # mapper.
+    mapper = vtk.vtkPolyDataMapper()
+    actor = vtk.vtkActor()
+    actor.SetMapper(mapper)
+    terminus = chagu.termini.Terminus(actor)
+    actor.SetPosition(1, 2, 3)
+    assert chagu.graph.modified_time(terminus) == mapper.GetMTime()
+
+    # Test 3: Objects without a modified time have a modified time of zero.
+    assert chagu.graph.modified_time(object()) == 0
+
+
+def test_pipeline_graph():
+    """
+    Test chagu.graph.PipelineGraph. We test the following cases:
+
+    1. Upstream and downstream nodes are found through every path of the
+        graph.
+    2. Nodes are ordered topologically, with ties broken by the order they
+        were tracked in.
+    3. If nodes are connected in a cycle, a ValueError is raised when
+        ordering them.
+    4. Before the graph is updated, every connected node is dirty, and
+        updating it updates only the dirty nodes without dirty nodes
+        downstream of them.
+    5. Once updated, no nodes are dirty.
+    6. Modifying a node makes it and the nodes downstream of it dirty, and
+        updating the graph does not re-execute the nodes upstream of it.
+    """
+
+    vis = chagu.Visualisation()
+    readerName = vis.load_visualisation_toolkit_file(absFilePathData)
+    compName = vis.extract_vector_components(component=2)
+    surfaceName = vis.act_surface()
+    conesName = vis.act_cone_vector_field(1, 1, 1)
+    cmapName = vis.act_colourbar()
+    vis.build_pipeline_from_dict([[compName, surfaceName],
+                                  [readerName, compName],
+                                  [readerName, conesName]], update=False)
+    pipelineGraph = vis.get_pipeline_graph()
+
+    # Test 1: Upstream and downstream nodes are found through every path of
+    # the graph.
+    assert pipelineGraph.upstream(surfaceName) == set([readerName, compName])
+    assert pipelineGraph.downstream(readerName) ==\
+        set([compName, surfaceName, conesName])
+    assert pipelineGraph.downstream(cmapName) == set()
+    assert pipelineGraph.inputs(compName) == [(readerName, compName, 0, 0)]
+
+    # Test 2: Nodes are ordered topologically, with ties broken by the order
+    # they were tracked in.
+    assert pipelineGraph.topological_order() ==\
+        [readerName, compName, surfaceName, conesName, cmapName]
+
+    # Test 3: If nodes are connected in a cycle, a ValueError is raised when
+    # ordering them.
+    cyclicGraph = chagu.graph.PipelineGraph(dict.fromkeys(["a", "b", "c"]))
+    cyclicGraph.set_connections([("a", "b", 0, 0), ("b", "c", 0, 0),
+                                 ("c", "b", 0, 0)])
+    with pytest.raises(ValueError) as testException:
+        cyclicGraph.topological_order()
+    assert "cycle" in testException.value.message
+    assert "['b', 'c']" in testException.value.message
+
+    # Test 4: Before the graph is updated, every connected node is dirty, and
+    # updating it updates only the dirty nodes without dirty nodes downstream
+    # of them.
+    assert pipelineGraph.dirty_nodes() ==\
+        [readerName, compName, surfaceName, conesName]
+    assert pipelineGraph.update() == [surfaceName, conesName]
+    compOutputData = vis.get_vtk_object(compName).GetOutputDataObject(2)
+    assert compOutputData.GetNumberOfPoints() > 0
+
+    # Test 5: Once updated, no nodes are dirty.
+    assert pipelineGraph.dirty_nodes() == []
+    assert vis.update_pipeline() == []
+
+    # Test 6: Modifying a node makes it and the nodes downstream of it dirty,
+    # and updating the graph does not re-execute the nodes upstream of it.
+    readerOutputData = vis.get_vtk_object(readerName).GetOutputDataObject(0)
+    readerMTime = readerOutputData.GetMTime()
+    compMTime = compOutputData.GetMTime()
+    vis.get_vtk_object(compName).Modified()
+    assert pipelineGraph.dirty_nodes() == [compName, surfaceName]
+    assert vis.update_pipeline() == [surfaceName]
+    assert readerOutputData.GetMTime() == readerMTime
+    assert compOutputData.GetMTime() > compMTime
+
+
+if __name__ == "__main__":
+    test_modified_time()
+    test_pipeline_graph()
@@ -5,6 +5,7 @@ chagu/helpers.py. Tests are detailed in the function documentation.
 
 import chagu
 import pytest
+import vtk
 
 
 def test_generate_sensible_name():
@@ -21,6 +22,9 @@ def test_generate_sensible_name():
          ["{}_{}".format(testName, zI) for zI in range(11)],
          "{}_11".format(guessName) is returned.
     5. As with test 4, but where testName ends with "_11".
+    6. If a dictionary of name counters is passed, names are handed out in
+         the same order as without it, suffixes handed out already are not
+         tested again, and names that clash with other names are skipped.
     """
 
     # Test 1: If testFunction is not callable, a TypeError is raised.
@@ -80,6 +84,49 @@ def test_generate_sensible_name():
     out_5 = chagu.helpers.generate_sensible_name(guessName_5, testFunction_5)
     assert out_5 == "{}_11".format(guessName_5)
 
+    # Test 6: If a dictionary of name counters is passed, names are handed out
+    # in the same order as without it, suffixes handed out already are not
+    # tested again, and names that clash with other names are skipped.
+    guessName_6 = guessName_1
+    takenNames_6 = set([guessName_6, "{}_2".format(guessName_6)])
+    testedNames_6 = []
+
+    def testFunction_6(guessName):
+        testedNames_6.append(guessName)
+        return guessName in takenNames_6
+
+    nameCounters = {}
+    outs_6 = []
+    for zI in range(4):
+        outs_6.append(chagu.helpers.generate_sensible_name(
+            guessName_6, testFunction_6, nameCounters))
+        takenNames_6.add(outs_6[-1])
+    assert outs_6 == ["{}_{}".format(guessName_6, zI) for zI in [0, 1, 3, 4]]
+    assert len(testedNames_6) == 9
+    assert nameCounters == {guessName_6: 5}
+
+
+def test_update_piece():
+    """
+    Test chagu.helpers.update_piece. We test the following cases:
+
+    1. The output of the algorithm holds only the piece requested, and the
+        pieces together cover the whole data set.
+    """
+
+    # Test 1: The output of the algorithm holds only the piece requested, and
+    # the pieces together cover the whole data set.
+    source = vtk.vtkRTAnalyticSource()
+    source.SetWholeExtent(0, 7, 0, 7, 0, 7)
+    extents = []
+    for piece in xrange(4):
+        chagu.helpers.update_piece(source, piece, 4)
+        extents.append(source.GetOutput().GetExtent())
+    assert len(set(extents)) == 4
+    for zI in xrange(3):
+        assert min(extent[zI * 2] for extent in extents) == 0
+        assert max(extent[zI * 2 + 1] for extent in extents) == 7
+
 
 def test_vtk_base_version():
     """
@@ -104,6 +151,56 @@ def test_vtk_base_version():
         assert hasattr(chagu.helpers.vtk, "vtkDataObjectSource") is False
 
 
+def test_lru_cache():
+    """
+    Test chagu.helpers.LRUCache. We test the following cases:
+
+    1. Values that are put in the cache can be got out again, and missing keys
+         return the default value.
+    2. If the cache is full, the least recently used entry is discarded.
+    3. With a size function, least recently used entries are discarded until
+         the sizes of the values fit, and values too large to fit are not
+         stored.
+    """
+
+    # Test 1: Values that are put in the cache can be got out again, and
+    # missing keys return the default value.
+    cache = chagu.helpers.LRUCache(maximumSize=2)
+    cache.put("a", 1)
+    assert cache.get("a") == 1
+    assert "a" in cache
+    assert cache.get("b") is None
+    assert cache.get("b", 5) == 5
+
+    # Test 2: If the cache is full, the least recently used entry is
+    # discarded.
+    cache.put("b", 2)
+    cache.get("a")  # "b" is now the least recently used entry.
+    cache.put("c", 3)
+    assert len(cache) == 2
+    assert "b" not in cache
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+    # Test 3: With a size function, least recently used entries are discarded
+    # until the sizes of the values fit, and values too large to fit are not
+    # stored.
+    cache = chagu.helpers.LRUCache(maximumSize=10, sizeFunction=len)
+    cache.put("a", "aaaa")
+    cache.put("b", "bbbb")
+    assert cache.size == 8
+    cache.put("c", "cccccc")
+    assert "a" not in cache
+    assert cache.size == 10
+    cache.put("d", "d" * 11)
+    assert "d" not in cache
+    assert cache.get("c") == "cccccc"
+    cache.remove("c")
+    assert cache.size == 4
+
+
 if __name__ == "__main__":
     test_generate_sensible_name()
+    test_update_piece()
     test_vtk_base_version()
+    test_lru_cache()
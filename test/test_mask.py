@@ -7,6 +7,24 @@ import chagu
 import numpy as np
 import pytest
 import vtk
+from vtk.util import numpy_support
+
+
+def image_data_with_position_vectors(dimensions, origin, spacing):
+    """
+    Create a vtkImageData object whose active point vectors are equal to the
+    position of each point, so that interpolation is easy to spot.
+    """
+    imageData = vtk.vtkImageData()
+    imageData.SetDimensions(*dimensions)
+    imageData.SetOrigin(*origin)
+    imageData.SetSpacing(*spacing)
+    positions = np.array([imageData.GetPoint(zI) for zI in
+                          xrange(imageData.GetNumberOfPoints())])
+    vectors = numpy_support.numpy_to_vtk(positions, deep=True)
+    vectors.SetName("position")
+    imageData.GetPointData().SetVectors(vectors)
+    return imageData
 
 
 def test_create_mask_from_opts():
@@ -261,6 +279,59 @@ def test_create_mask_from_opts():
     # Well that was fun!
 
 
+def test_create_mask_pyramid_from_opts():
+    """
+    Test chagu.mask.create_mask_pyramid_from_opts. We test the following
+    cases:
+
+    1. If fewer than one level is requested, a ValueError is raised.
+    2. Each mask has half the resolution of the one before it (but at least
+        one point in each direction), and its spacing is given.
+    """
+
+    # Test 1: If fewer than one level is requested, a ValueError is raised.
+    boundingBox = [0., 8., 0., 8., 0., 8.]
+    with pytest.raises(ValueError):
+        chagu.mask.create_mask_pyramid_from_opts(boundingBox, 1., 0,
+                                                 maskType="plane")
+
+    # Test 2: Each mask has half the resolution of the one before it (but at
+    # least one point in each direction), and its spacing is given.
+    domain = [0., 0., 0., 8., 0., 0., 0., 4., 0., 0., 0., 8.]
+    pyramid = chagu.mask.create_mask_pyramid_from_opts(
+        boundingBox, 1., 4, maskDomain=domain, maskResolution=[8, 4, 2])
+    assert len(pyramid) == 4
+    numbersOfPoints = [9 * 5 * 2, 5 * 3 * 1, 3 * 2 * 1, 2 * 2 * 1]
+    for zI, (maskFilter, spacing) in enumerate(pyramid):
+        lattice = maskFilter.GetInputDataObject(0, 0)
+        assert lattice.GetNumberOfPoints() == numbersOfPoints[zI]
+    assert np.allclose([level[1] for level in pyramid], [1., 2., 4., 4.],
+                       rtol=1e-2)
+
+
+def test_domain_bounds():
+    """
+    Test chagu.mask.domain_bounds. We test the following cases:
+
+    1. The bounds of a cuboid aligned with the axes are its extremes.
+    2. The bounds of a rotated rectangle contain all four of its corners.
+    3. If the domain has the wrong length, a ValueError is raised.
+    """
+
+    # Test 1: The bounds of a cuboid aligned with the axes are its extremes.
+    domain = [1, 2, 3, 4, 2, 3, 1, 5, 3, 1, 2, 6]
+    assert chagu.mask.domain_bounds(domain) == [1, 4, 2, 5, 3, 6]
+
+    # Test 2: The bounds of a rotated rectangle contain all four of its
+    # corners.
+    domain = [0, 0, 0, 1, 1, 0, -1, 1, 0]
+    assert chagu.mask.domain_bounds(domain) == [-1, 1, 0, 2, 0, 0]
+
+    # Test 3: If the domain has the wrong length, a ValueError is raised.
+    with pytest.raises(ValueError):
+        chagu.mask.domain_bounds([0, 0, 0])
+
+
 def test_plane_mask():
     """
     Test chagu.mask.plane_mask. These tests are very similar to those used in
@@ -400,6 +471,222 @@ def test_cube_mask():
                                                             resolution)
 
 
+def test_lattice_polydata():
+    """
+    Test chagu.mask.lattice_polydata. We test the following cases:
+
+    1. The lattice has the same points and cells as the equivalent planes
+        created by quadrilateral_plane_source, appended together.
+    2. A lattice with one plane places that plane halfway between P1 and P4.
+    3. A resolution of zero in either direction of the planes is treated as
+        one, as in quadrilateral_plane_source.
+    """
+
+    # Test 1: The lattice has the same points and cells as the equivalent
+    # planes created by quadrilateral_plane_source, appended together.
+    domain = [-2, -1, -3,
+               2, -1, -3,
+              -2,  1, -3,
+              -2, -1,  3]
+    resolution = [4, 3, 5]
+    lattice = chagu.mask.lattice_polydata(domain, resolution)
+
+    planes = []
+    appendPlanes = vtk.vtkAppendPolyData()
+    for zPos in np.linspace(domain[2], domain[11], resolution[2]):
+        planes.append(chagu.mask.quadrilateral_plane_source(
+            [domain[0], domain[1], zPos,
+             domain[3], domain[4], zPos,
+             domain[6], domain[7], zPos], resolution[:2]))
+        appendPlanes.AddInputConnection(planes[-1].GetOutputPort())
+    appendPlanes.Update()
+    expected = appendPlanes.GetOutput()
+
+    assert lattice.GetNumberOfPoints() == expected.GetNumberOfPoints()
+    assert lattice.GetNumberOfCells() == expected.GetNumberOfCells()
+    for zI in xrange(expected.GetNumberOfPoints()):
+        assert lattice.GetPoint(zI) == expected.GetPoint(zI)
+    for zI in xrange(expected.GetNumberOfCells()):
+        latticeIds = lattice.GetCell(zI).GetPointIds()
+        expectedIds = expected.GetCell(zI).GetPointIds()
+        assert [latticeIds.GetId(zJ) for zJ in xrange(4)] ==\
+            [expectedIds.GetId(zJ) for zJ in xrange(4)]
+
+    # Test 2: A lattice with one plane places that plane halfway between P1
+    # and P4.
+    lattice = chagu.mask.lattice_polydata(domain, [4, 3, 1])
+    assert lattice.GetBounds()[4:] == (0., 0.)
+    assert lattice.GetNumberOfCells() == 4 * 3
+
+    # Test 3: A resolution of zero in either direction of the planes is
+    # treated as one, as in quadrilateral_plane_source.
+    plane = chagu.mask.quadrilateral_plane_source(domain[:9], [0, 2])
+    plane.Update()
+    lattice = chagu.mask.lattice_polydata(domain, [0, 2, 1])
+    assert lattice.GetNumberOfPoints() == plane.GetOutput().GetNumberOfPoints()
+    assert lattice.GetNumberOfCells() == plane.GetOutput().GetNumberOfCells()
+    lattice = chagu.mask.lattice_polydata(domain, [0, 2, 2])
+    assert lattice.GetNumberOfPoints() == 12
+    assert lattice.GetNumberOfCells() == 4
+    lattice = chagu.mask.lattice_polydata(domain, [3, 0, 2])
+    assert lattice.GetNumberOfPoints() == 16
+    assert lattice.GetNumberOfCells() == 6
+
+
+@pytest.mark.skipif(chagu.mask.strideMaskSupported is False,
+                    reason="Python algorithms are not supported by this VTK.")
+def test_stride_mask():
+    """
+    Test chagu.mask.StrideMask. We test the following cases:
+
+    1. create_mask_from_opts creates a StrideMask if regularGridStride is True.
+    2. Image data is sampled by striding, so the sampled vectors are exactly
+        those at the sampled points, and there are at least as many points as
+        requested.
+    3. Data that is not a regular grid is resampled with a probe filter.
+    """
+
+    # Test 1: create_mask_from_opts creates a StrideMask if regularGridStride
+    # is True.
+    imageData = image_data_with_position_vectors([11, 11, 11], [-5, -5, -5],
+                                                 [1, 1, 1])
+    planeDomain = [-4, -4, 0,
+                    4, -4, 0,
+                   -4,  4, 0]
+    mask = chagu.mask.create_mask_from_opts(imageData.GetBounds(), 1,
+                                            maskDomain=planeDomain,
+                                            maskResolution=[4, 2],
+                                            regularGridStride=True)
+    assert isinstance(mask, chagu.mask.StrideMask)
+    assert mask.GetNumberOfInputPorts() == 1
+
+    # Test 2: Image data is sampled by striding, so the sampled vectors are
+    # exactly those at the sampled points, and there are at least as many
+    # points as requested.
+    mask.SetInputDataObject(imageData)
+    mask.Update()
+    output = mask.GetOutputDataObject(0)
+    points = numpy_support.vtk_to_numpy(output.GetPoints().GetData())
+    vectors = numpy_support.vtk_to_numpy(output.GetPointData().GetVectors())
+    assert output.GetPointData().GetVectors().GetName() == "position"
+    assert (points == vectors).all()
+    assert output.GetNumberOfPoints() >= 5 * 3
+    assert (points[:, 2] == 0).all()
+
+    # Test 3: Data that is not a regular grid is resampled with a probe
+    # filter.
+    appendFilter = vtk.vtkAppendFilter()
+    appendFilter.AddInputData(imageData)
+    appendFilter.Update()
+    mask.SetInputConnection(appendFilter.GetOutputPort())
+    mask.Update()
+    assert mask.GetOutputDataObject(0).GetNumberOfPoints() == 5 * 3
+
+
+def test_stride_sample():
+    """
+    Test chagu.mask.stride_sample. We test the following cases:
+
+    1. If the domain is not aligned with the axes, None is returned.
+    2. If the data set has cell data, None is returned.
+    3. If the data set is not a regular grid, None is returned.
+    4. Rectilinear grids are sampled at their own co-ordinates.
+    """
+
+    imageData = image_data_with_position_vectors([6, 6, 6], [0, 0, 0],
+                                                 [1, 1, 1])
+    volumeDomain = [0, 0, 0,
+                    5, 0, 0,
+                    0, 5, 0,
+                    0, 0, 5]
+
+    # Test 1: If the domain is not aligned with the axes, None is returned.
+    skewedDomain = [0, 0, 0,
+                    5, 1, 0,
+                    0, 5, 0,
+                    0, 0, 5]
+    assert chagu.mask.stride_sample(imageData, skewedDomain, [2, 2, 2])\
+        is None
+    assert chagu.mask.stride_sample(imageData, volumeDomain, [2, 2, 2])\
+        is not None
+
+    # Test 2: If the data set has cell data, None is returned.
+    cellData = vtk.vtkImageData()
+    cellData.DeepCopy(imageData)
+    cellValues = numpy_support.numpy_to_vtk(
+        np.zeros(cellData.GetNumberOfCells()), deep=True)
+    cellValues.SetName("cell values")
+    cellData.GetCellData().AddArray(cellValues)
+    assert chagu.mask.stride_sample(cellData, volumeDomain, [2, 2, 2]) is None
+
+    # Test 3: If the data set is not a regular grid, None is returned.
+    assert chagu.mask.stride_sample(vtk.vtkPolyData(), volumeDomain,
+                                    [2, 2, 2]) is None
+
+    # Test 4: Rectilinear grids are sampled at their own co-ordinates.
+    grid = vtk.vtkRectilinearGrid()
+    grid.SetDimensions(4, 2, 1)
+    grid.SetXCoordinates(numpy_support.numpy_to_vtk(
+        np.array([0., 1., 3., 6.]), deep=True))
+    grid.SetYCoordinates(numpy_support.numpy_to_vtk(np.array([0., 2.]),
+                                                    deep=True))
+    grid.SetZCoordinates(numpy_support.numpy_to_vtk(np.array([0.]),
+                                                    deep=True))
+    planeDomain = [0, 0, 0,
+                   6, 0, 0,
+                   0, 2, 0,
+                   0, 0, 0]
+    sample = chagu.mask.stride_sample(grid, planeDomain, [1, 1, 1])
+    samplePoints = numpy_support.vtk_to_numpy(sample.GetPoints().GetData())
+    assert samplePoints[:, 0].tolist() == [0., 6., 0., 6.]
+    assert samplePoints[:, 1].tolist() == [0., 0., 2., 2.]
+
+
+def test_lattice_spacing():
+    """
+    Test chagu.mask.lattice_spacing. We test the following cases:
+
+    1. The spacing is the smallest distance between neighbouring points in
+        any direction.
+    2. Directions without extent or with a single plane are ignored.
+    """
+
+    # Test 1: The spacing is the smallest distance between neighbouring points
+    # in any direction.
+    domain = [0, 0, 0, 6, 0, 0, 0, 4, 0, 0, 0, 9]
+    assert chagu.mask.lattice_spacing(domain, [3, 4, 4]) == 1.
+    assert chagu.mask.lattice_spacing(domain, [3, 1, 4]) == 2.
+    assert chagu.mask.lattice_spacing(domain[:9], [3, 1]) == 2.
+
+    # Test 2: Directions without extent or with a single plane are ignored.
+    assert chagu.mask.lattice_spacing(domain, [3, 1, 1]) == 2.
+    assert chagu.mask.lattice_spacing([0] * 9, [2, 2]) == 0.
+
+
+def test_strided_indices():
+    """
+    Test chagu.mask.strided_indices. We test the following cases:
+
+    1. Indices are evenly strided between the bounds, with at least as many
+        indices as requested.
+    2. If one sample is requested, the index closest to the centre of the
+        bounds is returned.
+    """
+
+    # Test 1: Indices are evenly strided between the bounds, with at least as
+    # many indices as requested.
+    coordinates = np.arange(11.)
+    indices = chagu.mask.strided_indices(coordinates, 1.5, 9, 3)
+    assert indices.tolist() == [2, 5, 8]
+    indices = chagu.mask.strided_indices(coordinates, 0, 10, 4)
+    assert indices.tolist() == [0, 3, 6, 9]
+
+    # Test 2: If one sample is requested, the index closest to the centre of
+    # the bounds is returned.
+    indices = chagu.mask.strided_indices(coordinates, 2, 5, 1)
+    assert indices.tolist() == [3]
+
+
 def test_quadrilateral_plane_source():
     """
     Test chagu.mask.quadrilateral_plane_source. We test the following cases:
@@ -467,6 +754,13 @@ def test_quadrilateral_plane_source():
 
 if __name__ == "__main__":
     test_create_mask_from_opts()
+    test_create_mask_pyramid_from_opts()
+    test_domain_bounds()
     test_plane_mask()
     test_cube_mask()
+    test_lattice_polydata()
+    test_stride_mask()
+    test_stride_sample()
+    test_lattice_spacing()
+    test_strided_indices()
     test_quadrilateral_plane_source()
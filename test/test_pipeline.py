@@ -14,6 +14,49 @@ relativeVtuFilePathData = "../example/data/data.vtu"
 absFilePathData = "{}/{}".format(pathToThisFile, relativeVtuFilePathData)
 
 
+def test_add_connection():
+    """
+    Test chagu.pipeline.add_connection. We test the following cases:
+
+    1. Adding a connection connects the objects according to VTK, and records
+        the connection in vis._pipeline.
+    2. Adding a connection to an input port that is already connected replaces
+        the old connection, both according to VTK and in vis._pipeline.
+    3. Objects upstream of the new connection are not executed again.
+    """
+
+    vis = chagu.Visualisation()
+    readerName = vis.load_visualisation_toolkit_file(absFilePathData)
+    compName = vis.extract_vector_components(component=2)
+    surfaceName = vis.act_surface()
+    conesName = vis.act_cone_vector_field(1, 1, 1)
+    vis.build_pipeline_from_dict([[readerName, compName],
+                                  [compName, surfaceName]])
+    readerOutputData = vis.get_vtk_object(readerName).GetOutputDataObject(0)
+    readerMTime = readerOutputData.GetMTime()
+
+    # Test 1: Adding a connection connects the objects according to VTK, and
+    # records the connection in vis._pipeline.
+    vis.add_connection(compName, conesName)
+    compObjectOutputData = vis.get_vtk_object(compName).GetOutputDataObject(2)
+    coneMapper = vis.get_vtk_object(conesName).actor.GetMapper()
+    assert coneMapper.GetInputDataObject(0, 0) == compObjectOutputData
+    assert [compName, [conesName, 2, 0]] in vis._pipeline
+    assert len(vis._pipeline) == 3
+
+    # Test 2: Adding a connection to an input port that is already connected
+    # replaces the old connection, both according to VTK and in vis._pipeline.
+    vis.add_connection(readerName, conesName, inputPortIndex=0)
+    assert coneMapper.GetNumberOfInputConnections(0) == 1
+    assert coneMapper.GetInputDataObject(0, 0) == readerOutputData
+    assert [readerName, [conesName, 0, 0]] in vis._pipeline
+    assert [compName, [conesName, 2, 0]] not in vis._pipeline
+    assert len(vis._pipeline) == 3
+
+    # Test 3: Objects upstream of the new connection are not executed again.
+    assert readerMTime == readerOutputData.GetMTime()
+
+
 def test_autopipe():
     """
     Test chagu.pipeline.autopipe. We test the following cases:
@@ -99,7 +142,8 @@ def test_build_pipeline_from_dict():
     5. If a default input port is specified in an object, ensure that port is
         used in the connection if no other port information is passed.
     6. If build_pipeline_from_dict is called again after a successful pipeline
-        build, a RuntimeError is raised.
+        build, connections missing from the new description are removed, and
+        objects upstream of the change are not executed again.
     7. A successful connection writes the pipeline to vis._pipeline.
     """
 
@@ -181,11 +225,20 @@ def test_build_pipeline_from_dict():
     assert compObjectOutputData == coneObjectInputData
 
     # Test 6: If build_pipeline_from_dict is called again after a successful
-    # pipeline build, a RuntimeError is raised.
-    expectedMsg = "once per visualisation instance"
-    with pytest.raises(RuntimeError) as testException:
-        vis.build_pipeline_from_dict([])
-    assert expectedMsg in testException.value.message
+    # pipeline build, connections missing from the new description are
+    # removed, and objects upstream of the change are not executed again.
+    compMTime = vis.get_vtk_object(compName).GetOutputDataObject(2).GetMTime()
+    pipeline = [[readerName, compName],
+                [compName, surfaceName]]
+    vis.build_pipeline_from_dict(pipeline)
+
+    coneMapper = vis.get_vtk_object(conesName).actor.GetMapper()
+    assert coneMapper.GetNumberOfInputConnections(0) == 0
+    surfObjectInputData = vis.get_vtk_object(surfaceName).actor.GetMapper()\
+                          .GetInputDataObject(0, 0)
+    assert compObjectOutputData == surfObjectInputData
+    assert compMTime == vis.get_vtk_object(compName).GetOutputDataObject(2)\
+        .GetMTime()
 
     # Test 7: A successful connection writes the pipeline to vis._pipeline.
     assert pipeline == vis._pipeline
@@ -311,6 +364,8 @@ def test_draw_pipeline_graphviz():
 
     1. Test that the PDF is produced using the name of the visualisation.
     2. Test that all object names are in the PDF.
+    3. Test that a profiled PDF is produced, along with a JSON file holding
+        the profile.
     """
 
     visName = "test_draw_pipeline_graphviz"
@@ -324,8 +379,13 @@ def test_draw_pipeline_graphviz():
     objectNames.append(vis.act_colourbar())
     vis.autopipe()
 
-    graphvizFile = "{}/{}_pipeline.gv.pdf".format(pathToThisFile, visName)
+    graphvizSource = "{}/{}_pipeline.gv".format(pathToThisFile, visName)
+    graphvizFile = "{}.pdf".format(graphvizSource)
     textFile = "{}.txt".format(graphvizFile[:-4])
+    profileName = "{}_profile".format(visName)
+    profileSource = "{}/{}.gv".format(pathToThisFile, profileName)
+    profileFile = "{}.pdf".format(profileSource)
+    jsonFile = "{}/{}.json".format(pathToThisFile, profileName)
 
     try:
         # Test 1: Test that the PDF is produced using the name of the
@@ -340,17 +400,126 @@ def test_draw_pipeline_graphviz():
         for objectName in objectNames:
             assert objectName in content
 
+        # Test 3: Test that a profiled PDF is produced, along with a JSON file
+        # holding the profile.
+        vis.start_profiling()
+        vis.draw_pipeline_graphviz(directory=pathToThisFile, name=profileName,
+                                   profile=True)
+        assert os.path.isfile(profileFile)
+        assert os.path.isfile(jsonFile)
+
     # Cleanup
     finally:
-        if os.path.exists(graphvizFile):
-            os.remove(graphvizFile)
-        if os.path.exists(textFile):
-            os.remove(textFile)
+        for filePath in [graphvizSource, graphvizFile, textFile,
+                         profileSource, profileFile, jsonFile]:
+            if os.path.exists(filePath):
+                os.remove(filePath)
+
+
+def test_remove_connection():
+    """
+    Test chagu.pipeline.remove_connection. We test the following cases:
+
+    1. Removing a connection that is not in the pipeline raises a ValueError.
+    2. Removing a connection disconnects the objects according to VTK, and
+        removes the connection from vis._pipeline.
+    """
+
+    vis = chagu.Visualisation()
+    readerName = vis.load_visualisation_toolkit_file(absFilePathData)
+    compName = vis.extract_vector_components(component=2)
+    surfaceName = vis.act_surface()
+    conesName = vis.act_cone_vector_field(1, 1, 1)
+    vis.build_pipeline_from_dict([[readerName, compName],
+                                  [compName, surfaceName],
+                                  [compName, conesName]])
+
+    # Test 1: Removing a connection that is not in the pipeline raises a
+    # ValueError.
+    expectedMsgs = ["not connected", readerName, surfaceName]
+    with pytest.raises(ValueError) as testException:
+        vis.remove_connection(readerName, surfaceName)
+    for expectedMsg in expectedMsgs:
+        assert expectedMsg in testException.value.message
+
+    # Test 2: Removing a connection disconnects the objects according to VTK,
+    # and removes the connection from vis._pipeline.
+    vis.remove_connection(compName, conesName)
+    coneMapper = vis.get_vtk_object(conesName).actor.GetMapper()
+    assert coneMapper.GetNumberOfInputConnections(0) == 0
+    assert vis._pipeline == [[readerName, compName],
+                             [compName, surfaceName]]
+
+
+def test_pipeline_graphviz():
+    """
+    Test chagu.pipeline.pipeline_graphviz. We test the following cases:
+
+    1. Without profiling, each object is a node and each connection an edge.
+    2. If a profile is requested before profiling has started, a RuntimeError
+        is raised.
+    3. With profiling, nodes are annotated with their last execution time,
+        memory and point and cell counts, or marked as not executed.
+    4. The slowest object is coloured as the hottest node, and work outside
+        the pipeline is drawn as a box.
+    5. Connections made with unicode names are edges.
+    """
+    vis = chagu.Visualisation()
+    readerName = vis.load_visualisation_toolkit_file(absFilePathData)
+    compName = vis.extract_vector_components(component=2)
+    surfaceName = vis.act_surface()
+    vis.build_pipeline_from_dict([[readerName, surfaceName]])
+
+    # Test 1: Without profiling, each object is a node and each connection an
+    # edge.
+    source = vis.pipeline_graphviz().source
+    for objectName in [readerName, compName, surfaceName]:
+        assert "\t{}\n".format(objectName) in source
+    assert "{} -> {}".format(readerName, surfaceName) in source
+
+    # Test 2: If a profile is requested before profiling has started, a
+    # RuntimeError is raised.
+    with pytest.raises(RuntimeError) as testException:
+        vis.pipeline_graphviz(profile=True)
+    assert "rofiling has not been started" in testException.value.message
+
+    # Test 3: With profiling, nodes are annotated with their last execution
+    # time, memory and point and cell counts, or marked as not executed.
+    vis.start_profiling()
+    vis.get_vtk_object(readerName).Modified()
+    vis.update_pipeline()
+    vis._profiler.record("png writer", 1e3)
+    source = vis.pipeline_graphviz(profile=True).source
+    statements = dict((statement.split(" [")[0], statement)
+                      for statement in source.split("\n\t"))
+    points = vis.get_vtk_object(readerName).GetOutput().GetNumberOfPoints()
+    assert "last time:" in statements[readerName]
+    assert "memory:" in statements[readerName]
+    assert "points: {},".format(points) in statements[readerName]
+    assert "not executed" in statements[compName]
+
+    # Test 4: The slowest object is coloured as the hottest node, and work
+    # outside the pipeline is drawn as a box.
+    assert "fillcolor=\"#800026\"" in statements["\"png writer\""]
+    assert "shape=box" in statements["\"png writer\""]
+    assert "fillcolor=\"#800026\"" not in statements[readerName]
+
+    # Test 5: Connections made with unicode names are edges.
+    vis = chagu.Visualisation()
+    readerName = vis.load_visualisation_toolkit_file(absFilePathData)
+    surfaceName = vis.act_surface()
+    vis.build_pipeline_from_dict([[unicode(readerName),
+                                   unicode(surfaceName)]])
+    source = vis.pipeline_graphviz().source
+    assert "{} -> {}".format(readerName, surfaceName) in source
 
 
 if __name__ == "__main__":
+    test_add_connection()
     test_autopipe()
     test_build_pipeline_from_dict()
     test_check_connection()
     test_connect_vtk_objects()
     test_draw_pipeline_graphviz()
+    test_pipeline_graphviz()
+    test_remove_connection()
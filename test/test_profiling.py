@@ -0,0 +1,276 @@
+"""
+This python file tests the functionality of functions and classes defined in
+chagu/profiling.py. Tests are detailed in the function documentation.
+"""
+
+import chagu
+import gc
+import json
+import os
+import time
+import vtk
+import weakref
+
+
+pathToThisFile = os.path.dirname(os.path.realpath(__file__))
+relativeVtuFilePathData = "../example/data/data.vtu"
+absFilePathData = "{}/{}".format(pathToThisFile, relativeVtuFilePathData)
+
+
+def test_output_size():
+    """
+    Test chagu.profiling.output_size. We test the following cases:
+
+    1. The size of the output of an algorithm is measured.
+    2. The size of the input of an object without outputs, such as a mapper,
+        is measured.
+    3. Objects without data have zero size.
+    """
+
+    # Test 1: The size of the output of an algorithm is measured.
+    source = vtk.vtkSphereSource()
+    source.Update()
+    points, cells, numberOfBytes = chagu.profiling.output_size(source)
+    assert points == source.GetOutput().GetNumberOfPoints()
+    assert cells == source.GetOutput().GetNumberOfCells()
+    assert numberOfBytes == source.GetOutput().GetActualMemorySize() * 1024
+
+    # Test 2: The size of the input of an object without outputs, such as a
+    # mapper, is measured.
+    mapper = vtk.vtkPolyDataMapper()
+    mapper.SetInputConnection(source.GetOutputPort())
+    assert chagu.profiling.output_size(mapper) == (points, cells,
+                                                   numberOfBytes)
+
+    # Test 3: Objects without data have zero size.
+    assert chagu.profiling.output_size(vtk.vtkPolyDataMapper()) == (0, 0, 0)
+    assert chagu.profiling.output_size(vtk.vtkRenderer()) == (0, 0, 0)
+
+
+def test_pipeline_profiler():
+    """
+    Test chagu.profiling.PipelineProfiler. We test the following cases:
+
+    1. Each execution of an attached VTK object is counted and timed, and the
+        size of its output is recorded.
+    2. Objects that are already attached are not attached again.
+    3. Time spent in a stage nested inside another stage is not counted
+        towards the other.
+    4. The table lists the slowest labels first.
+    5. Once detached, executions are no longer recorded, but records are
+        kept.
+    """
+    profiler = chagu.profiling.PipelineProfiler()
+    source = vtk.vtkSphereSource()
+    assert profiler.attach("sphere", source) is True
+
+    # Test 1: Each execution of an attached VTK object is counted and timed,
+    # and the size of its output is recorded.
+    source.Update()
+    source.SetThetaResolution(16)
+    source.Update()
+    record = profiler.results()["sphere"]
+    assert record["executions"] == 2
+    assert record["total time"] >= record["last time"] >= 0
+    assert record["points"] == source.GetOutput().GetNumberOfPoints()
+    assert record["cells"] == source.GetOutput().GetNumberOfCells()
+    assert record["bytes"] > 0
+    assert record["progress"] == 1.
+
+    # Test 2: Objects that are already attached are not attached again.
+    assert profiler.attach("sphere again", source) is False
+    source.Modified()
+    source.Update()
+    assert profiler.results()["sphere"]["executions"] == 3
+    assert "sphere again" not in profiler.results()
+
+    # Test 3: Time spent in a stage nested inside another stage is not counted
+    # towards the other.
+    with profiler.stage("outer"):
+        with profiler.stage("inner"):
+            time.sleep(0.05)
+    results = profiler.results()
+    assert results["inner"]["last time"] >= 0.05
+    assert results["outer"]["last time"] < 0.05
+
+    # Test 4: The table lists the slowest labels first.
+    lines = profiler.table().split("\n")
+    assert lines[0].split()[0] == "Name"
+    assert lines[1].split()[0] == "inner"
+    assert len(lines) == 4
+
+    # Test 5: Once detached, executions are no longer recorded, but records
+    # are kept.
+    profiler.detach()
+    source.Modified()
+    source.Update()
+    assert profiler.results()["sphere"]["executions"] == 3
+    assert profiler.enabled is False
+
+
+def test_pipeline_profile():
+    """
+    Test chagu.profiling.pipeline_profile. We test the following cases:
+
+    1. Each tracked object has a record, including objects that have not
+        executed, which have zero time and size.
+    2. The records of termini combine the records of the objects inside them.
+    3. Connections are listed with their ports, and records that do not
+        belong to tracked objects are listed as stages.
+    """
+    vis = chagu.Visualisation()
+    readerName = vis.load_visualisation_toolkit_file(absFilePathData)
+    compName = vis.extract_vector_components(component=2)
+    maskDomain = [-8., -8., 0., 8., -8., 0., -8., 8., 0.]
+    conesName = vis.act_cone_vector_field(0.5, 0.1, 4, maskDomain=maskDomain,
+                                          maskResolution=[32, 32],
+                                          maskStride=True)
+    vis.start_profiling()
+    vis.get_vtk_object(readerName).Modified()
+    vis.build_pipeline_from_dict([[readerName, conesName]])
+    with chagu.profiling.stage(vis._profiler, "png writer"):
+        pass
+    pipelineProfile = vis.pipeline_profile()
+    results = vis.profile_results()
+
+    # Test 1: Each tracked object has a record, including objects that have
+    # not executed, which have zero time and size.
+    nodes = pipelineProfile["nodes"]
+    assert nodes.keys() == [readerName, compName, conesName]
+    assert nodes[readerName]["last time"] == results[readerName]["last time"]
+    assert nodes[readerName]["parts"] == {}
+    assert nodes[compName]["executions"] == 0
+    assert nodes[compName]["last time"] == 0
+    assert nodes[compName]["bytes"] == 0
+
+    # Test 2: The records of termini combine the records of the objects inside
+    # them.
+    parts = nodes[conesName]["parts"]
+    assert "{}/StrideMask".format(conesName) in parts
+    assert all(label.startswith("{}/".format(conesName)) for label in parts)
+    assert abs(nodes[conesName]["total time"] -
+               sum(results[label]["total time"] for label in results
+                   if label.startswith(conesName))) < 1e-12
+
+    # Test 3: Connections are listed with their ports, and records that do
+    # not belong to tracked objects are listed as stages.
+    assert pipelineProfile["edges"] == [[readerName, conesName, 0, 0]]
+    assert pipelineProfile["stages"].keys() == ["png writer"]
+
+
+def test_save_pipeline_profile():
+    """
+    Test chagu.profiling.save_pipeline_profile. We test the following cases:
+
+    1. The JSON file written holds the profile collected by pipeline_profile.
+    """
+    vis = chagu.Visualisation()
+    readerName = vis.load_visualisation_toolkit_file(absFilePathData)
+    surfaceName = vis.act_surface()
+    vis.start_profiling()
+    vis.get_vtk_object(readerName).Modified()
+    vis.autopipe()
+    jsonPath = "{}/test_save_pipeline_profile.json".format(pathToThisFile)
+
+    try:
+        # Test 1: The JSON file written holds the profile collected by
+        # pipeline_profile.
+        vis.save_pipeline_profile(jsonPath)
+        with open(jsonPath) as jsonFile:
+            savedProfile = json.load(jsonFile)
+        assert savedProfile == json.loads(json.dumps(vis.pipeline_profile()))
+        assert savedProfile["nodes"][readerName]["executions"] == 1
+
+    # Cleanup
+    finally:
+        if os.path.exists(jsonPath):
+            os.remove(jsonPath)
+
+
+def test_start_profiling():
+    """
+    Test chagu.profiling.start_profiling, and the functions that report its
+    results. We test the following cases:
+
+    1. Tracked objects are profiled under their names, and the objects inside
+        termini that feed their mappers are profiled as well.
+    2. Objects tracked after profiling starts are profiled.
+    3. Stopping profiling keeps the results, and starting it again discards
+        them.
+    4. Closing a profiled visualisation removes the observers from the
+        objects it profiled.
+    5. A profiled visualisation with a stride-masked cone terminus that is
+        deleted without being closed is collected.
+    """
+    vis = chagu.Visualisation()
+    readerName = vis.load_visualisation_toolkit_file(absFilePathData)
+    compName = vis.extract_vector_components(component=2)
+    maskDomain = [-8., -8., 0., 8., -8., 0., -8., 8., 0.]
+    conesName = vis.act_cone_vector_field(0.5, 0.1, 4, maskDomain=maskDomain,
+                                          maskResolution=[32, 32],
+                                          maskStride=True)
+    assert len(vis.profile_results()) == 0
+
+    # Test 1: Tracked objects are profiled under their names, and the objects
+    # inside termini that feed their mappers are profiled as well.
+    vis.start_profiling()
+    vis.get_vtk_object(readerName).Modified()
+    vis.build_pipeline_from_dict([[readerName, conesName]])
+    results = vis.profile_results()
+    assert results[readerName]["executions"] == 1
+    assert results[readerName]["points"] > 0
+    assert "{}/StrideMask".format(conesName) in results
+    assert "{}/vtkConeSource".format(conesName) in vis._profiler.labels()
+    assert compName not in results
+    assert readerName in vis.profile_table()
+
+    # Test 2: Objects tracked after profiling starts are profiled.
+    surfaceName = vis.act_surface()
+    surfaceMapper = vis.get_vtk_object(surfaceName).actor.GetMapper()
+    assert vis._profiler.is_attached(surfaceMapper)
+    vis.add_connection(readerName, compName)
+    vis.add_connection(compName, surfaceName)
+    results = vis.profile_results()
+    assert results[compName]["executions"] == 1
+    assert results[readerName]["executions"] == 1
+
+    # Test 3: Stopping profiling keeps the results, and starting it again
+    # discards them.
+    vis.stop_profiling()
+    vis.get_vtk_object(readerName).Modified()
+    vis.update_pipeline()
+    assert vis.profile_results()[readerName]["executions"] == 1
+    vis.start_profiling()
+    assert len(vis.profile_results()) == 0
+
+    # Test 4: Closing a profiled visualisation removes the observers from the
+    # objects it profiled.
+    reader = vis.get_vtk_object(readerName)
+    mapper = vis.get_vtk_object(conesName).actor.GetMapper()
+    assert reader.HasObserver("StartEvent") == 1
+    vis.close()
+    assert reader.HasObserver("StartEvent") == 0
+    assert mapper.HasObserver("StartEvent") == 0
+
+    # Test 5: A profiled visualisation with a stride-masked cone terminus
+    # that is deleted without being closed is collected.
+    vis = chagu.Visualisation()
+    readerName = vis.load_visualisation_toolkit_file(absFilePathData)
+    conesName = vis.act_cone_vector_field(0.5, 0.1, 4, maskDomain=maskDomain,
+                                          maskResolution=[32, 32],
+                                          maskStride=True)
+    vis.start_profiling()
+    vis.build_pipeline_from_dict([[readerName, conesName]])
+    visReference = weakref.ref(vis)
+    del vis
+    gc.collect()
+    assert visReference() is None
+    assert gc.garbage == []
+
+
+if __name__ == "__main__":
+    test_output_size()
+    test_pipeline_profiler()
+    test_pipeline_profile()
+    test_save_pipeline_profile()
+    test_start_profiling()
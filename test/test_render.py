@@ -4,9 +4,11 @@ chagu/helpers.py. Tests are detailed in the function documentation.
 """
 
 import chagu
+import numpy as np
 import os
 import pytest
 import vtk
+from vtk.util import numpy_support
 
 
 pathToThisFile = os.path.dirname(os.path.realpath(__file__))
@@ -22,6 +24,9 @@ def test_build_renderer_and_window():
          is raised.
     2. A vtkRenderer and a vtkRenderWindow are both returned if successful.
     3. The visualisation object has a pipeline defined.
+    4. Building again reuses the same vtkRenderer and vtkRenderWindow, with a
+         new camera and any new actors.
+    5. After releasing them, a new vtkRenderer and vtkRenderWindow are built.
     """
     vis = chagu.Visualisation()
 
@@ -42,6 +47,23 @@ def test_build_renderer_and_window():
     # Test 3: The visualisation object has a pipeline defined.
     assert vis._pipeline != []
 
+    # Test 4: Building again reuses the same vtkRenderer and vtkRenderWindow,
+    # with a new camera and any new actors.
+    camera = renderer.GetActiveCamera()
+    vis.act_colourbar()
+    renderer_4, renderWindow_4 = vis.build_renderer_and_window()
+    assert renderer_4 is renderer
+    assert renderWindow_4 is renderWindow
+    assert renderer_4.GetActiveCamera() is not camera
+    assert renderer_4.GetViewProps().GetNumberOfItems() == 2
+
+    # Test 5: After releasing them, a new vtkRenderer and vtkRenderWindow are
+    # built.
+    vis.release_renderer_and_window()
+    renderer_5, renderWindow_5 = vis.build_renderer_and_window()
+    assert renderer_5 is not renderer
+    assert renderWindow_5 is not renderWindow
+
 
 @pytest.mark.skipif(vtk.vtkVersion().GetVTKVersion() != "5.8.0",
                     reason="vtkGL2PSExporter is not defined in VTK 5.8.")
@@ -83,12 +105,159 @@ def test_save_snapshot():
                 os.remove(imageFilename)
 
 
+def read_png(imageFilename):
+    """
+    Read a PNG file with VTK, and return it as a numpy array with shape
+    (height, width, components) where the first row is the top of the image.
+    """
+    reader = vtk.vtkPNGReader()
+    reader.SetFileName(imageFilename)
+    reader.Update()
+    image = reader.GetOutput()
+    width, height = image.GetDimensions()[:2]
+    pixels = numpy_support.vtk_to_numpy(image.GetPointData().GetScalars())
+    return pixels.reshape(height, width, -1)[::-1].copy()
+
+
+def test_snapshot_writer():
+    """
+    Test chagu.render.SnapshotWriter. We test the following cases:
+
+    1. Flushing the writer writes all of the images submitted to it, even if
+         more images are submitted than the queue can hold.
+    2. An error raised while writing an image is raised by flush.
+    3. Submitting an image to a closed writer raises a RuntimeError.
+    """
+    imagePattern = "{}/test_snapshot_writer_{{}}.png".format(pathToThisFile)
+    images = [np.random.randint(0, 256, (17, 23, 3)).astype(np.uint8)
+              for zI in xrange(6)]
+    writer = chagu.render.SnapshotWriter(threads=2, maximumQueueSize=2)
+
+    try:
+        # Test 1: Flushing the writer writes all of the images submitted to it,
+        # even if more images are submitted than the queue can hold.
+        for zI, image in enumerate(images):
+            writer.submit(image, imagePattern.format(zI))
+        writer.flush()
+        for zI, image in enumerate(images):
+            assert (read_png(imagePattern.format(zI)) == image).all()
+
+        # Test 2: An error raised while writing an image is raised by flush.
+        writer.submit(images[0], "{}/not_a_directory/image.png"
+                      .format(pathToThisFile))
+        with pytest.raises(IOError):
+            writer.flush()
+
+        # Test 3: Submitting an image to a closed writer raises a
+        # RuntimeError.
+        writer.close()
+        with pytest.raises(RuntimeError):
+            writer.submit(images[0], imagePattern.format(0))
+
+    # Remove the images as a cleanup activity.
+    finally:
+        for zI in xrange(len(images)):
+            if os.path.exists(imagePattern.format(zI)):
+                os.remove(imagePattern.format(zI))
+
+
+def write_vector_field_image(filePath):
+    """
+    Write a vector field on an 8x8x8 unit grid to an XML image data file, with
+    vectors equal to the position of each point.
+    """
+    z, y, x = np.mgrid[0:8, 0:8, 0:8]
+    vectors = np.stack([x, y, z], axis=-1).astype(float)
+    dataSet = chagu.sources.numpy_vector_field_data_set(
+        {"dimensions": [8, 8, 8]}, vectors)
+    writer = vtk.vtkXMLImageDataWriter()
+    writer.SetInputData(dataSet)
+    writer.SetFileName(filePath)
+    writer.Write()
+
+
+def test_stream_pieces():
+    """
+    Test chagu.render.stream_pieces and
+    chagu.render.check_streaming_sources. We test the following cases:
+
+    1. If a reader cannot produce pieces, a ValueError is raised.
+    2. Each mapper is given one piece at a time, and the pieces cover the data
+         set.
+    3. Mappers drawing from probe filters are given only the points sampled
+         from each piece, which together are the points sampled from the whole
+         data set.
+    4. Once the pieces have been streamed, the mappers are connected back to
+         the pipeline, and the probe filters are restored.
+    """
+
+    # Test 1: If a reader cannot produce pieces, a ValueError is raised.
+    vis = chagu.Visualisation()
+    vis.load_visualisation_toolkit_file(absFilePath)
+    with pytest.raises(ValueError):
+        chagu.render.check_streaming_sources(vis)
+
+    imageFilePath = "{}/test_stream_pieces.vti".format(pathToThisFile)
+    write_vector_field_image(imageFilePath)
+
+    try:
+        vis = chagu.Visualisation()
+        vis.load_visualisation_toolkit_file(imageFilePath)
+        chagu.render.check_streaming_sources(vis)
+        maskDomain = [0.5, 0.5, 0.5, 6.5, 0.5, 0.5, 0.5, 6.5, 0.5,
+                      0.5, 0.5, 6.5]
+        conesName = vis.act_cone_vector_field(
+            1., 0.2, 4, maskDomain=maskDomain, maskResolution=[3, 3, 3],
+            maskStride=False)
+        surfaceName = vis.act_surface()
+        vis.autopipe(update=False)
+        surfaceMapper = vis.get_vtk_object(surfaceName).actor.GetMapper()
+        conesMapper = vis.get_vtk_object(conesName).actor.GetMapper()
+        probeFilter = conesMapper.GetInputAlgorithm()
+
+        # Test 2: Each mapper is given one piece at a time, and the pieces
+        # cover the data set.
+        pieceBounds = []
+        samplePoints = []
+        for piece in chagu.render.stream_pieces(vis, 4):
+            surfacePiece = surfaceMapper.GetInput()
+            assert 0 < surfacePiece.GetNumberOfPoints() < 512
+            pieceBounds.append(surfacePiece.GetBounds())
+
+            # Test 3: Mappers drawing from probe filters are given only the
+            # points sampled from each piece, which together are the points
+            # sampled from the whole data set.
+            conesPiece = conesMapper.GetInput()
+            if conesPiece.GetNumberOfPoints() > 0:
+                samplePoints += numpy_support.vtk_to_numpy(
+                    conesPiece.GetPoints().GetData()).tolist()
+        assert piece == 3
+        pieceBounds = np.array(pieceBounds)
+        assert pieceBounds[:, 0::2].min(axis=0).tolist() == [0, 0, 0]
+        assert pieceBounds[:, 1::2].max(axis=0).tolist() == [7, 7, 7]
+        samplePoints = set(tuple(point) for point in samplePoints)
+        assert len(samplePoints) == 4 * 4 * 3
+
+        # Test 4: Once the pieces have been streamed, the mappers are
+        # connected back to the pipeline, and the probe filters are restored.
+        assert conesMapper.GetInputAlgorithm() is probeFilter
+        assert probeFilter.GetSpatialMatch() == 0
+        surfaceMapper.Update()
+        assert surfaceMapper.GetInput().GetNumberOfPoints() == 512
+
+    # Remove the test file as a cleanup activity.
+    finally:
+        os.remove(imageFilePath)
+
+
 def test_visualise_animate_rotate():
     """
     Test chagu.render.visualise_animate_rotate. We test the following cases:
 
     1. If rotationResolution is 0, no images are produced.
     2. If rotationResolution is 200, 200 images are produced.
+    3. If processes is less than one, a ValueError is raised.
+    4. If rotationResolution is 20 and processes is 4, 20 images are produced.
 
     This function is largely tested by test_save_snapshot and
     test_build_renderer_and_window.
@@ -112,10 +281,23 @@ def test_visualise_animate_rotate():
         for zI in xrange(10):
             assert os.path.exists("{}_2_{:03d}.png".format(imageStackName, zI))
 
+        # Test 3: If processes is less than one, a ValueError is raised.
+        with pytest.raises(ValueError):
+            vis.visualise_animate_rotate(imageStackName + "_3", processes=0)
+
+        # Test 4: If rotationResolution is 20 and processes is 4, 20 images
+        # are produced.
+        vis.visualise_animate_rotate(imageStackName + "_4",
+                                     rotation_resolution=20, processes=4)
+        for zI in xrange(20):
+            assert os.path.exists("{}_4_{:02d}.png".format(imageStackName, zI))
+
     # Remove images as a cleanup activity.
     finally:
         filesToRemove = [imageStackName + "_1"] +\
            ["{}_2_{:03d}.png".format(imageStackName, zI) for zI in xrange(200)]
+        filesToRemove +=\
+           ["{}_4_{:02d}.png".format(imageStackName, zI) for zI in xrange(20)]
         for imageFilename in filesToRemove:
             if os.path.exists(imageFilename):
                 os.remove(imageFilename)
@@ -130,6 +312,33 @@ def test_visualise_interact():
     vtk.vtkRenderWindowInteractor()
 
 
+def test_visualise_rotation_frames():
+    """
+    Test chagu.render.visualise_rotation_frames. We test the following cases:
+
+    1. One array is yielded for each frame, each with the shape of the window.
+    2. Frames from different angles differ.
+
+    This function is largely tested by test_visualise_animate_rotate and
+    test_visualise_to_array.
+    """
+    vis = chagu.Visualisation()
+    vis.load_visualisation_toolkit_file(absFilePath)
+    vis.extract_vector_components(component=2)
+    vis.act_surface()
+    vis.windowSize = [60, 40]
+
+    # Test 1: One array is yielded for each frame, each with the shape of the
+    # window.
+    frames = list(vis.visualise_rotation_frames(rotation_resolution=4))
+    assert len(frames) == 4
+    for frame in frames:
+        assert frame.shape == (40, 60, 3)
+
+    # Test 2: Frames from different angles differ.
+    assert (frames[0] != frames[1]).any()
+
+
 def test_visualise_save():
     """
     Test chagu.render.visualise_save. We test the following cases:
@@ -157,6 +366,201 @@ def test_visualise_save():
             os.remove(imageFilename)
 
 
+def test_visualise_save_series():
+    """
+    Test chagu.render.visualise_save_series. We test the following cases:
+
+    1. If the visualisation tracks no readers, a RuntimeError is raised.
+    2. If a file in the series does not exist, a ValueError is raised and no
+         images are produced.
+    3. One image is produced for each file in the series, and the reader is
+         left reading the last file.
+    4. If the reader uses the data set cache, the files of the series are not
+         cached, but the reader caches the files it reads afterwards.
+    5. If the data set of the reader was loaded from the cache, a ValueError
+         is raised and no images are produced.
+    """
+    imagePattern = "{}/test_visualise_save_series_{{}}.png"\
+        .format(pathToThisFile)
+    filePaths = ["{}/../example/data/{}".format(pathToThisFile, zI)
+                 for zI in ["data.vtu", "data2.vtu", "data3.vtu"]]
+
+    # Test 1: If the visualisation tracks no readers, a RuntimeError is
+    # raised.
+    vis = chagu.Visualisation()
+    with pytest.raises(RuntimeError):
+        vis.visualise_save_series(filePaths, imagePattern)
+
+    vis.load_visualisation_toolkit_file(filePaths[0], readerName="reader")
+    vis.extract_vector_components(component=2)
+    vis.act_surface()
+
+    try:
+        # Test 2: If a file in the series does not exist, a ValueError is
+        # raised and no images are produced.
+        with pytest.raises(ValueError):
+            vis.visualise_save_series(filePaths + ["not_a_file.vtu"],
+                                      imagePattern)
+        assert os.path.exists(imagePattern.format(0)) is False
+
+        # Test 3: One image is produced for each file in the series, and the
+        # reader is left reading the last file.
+        imageFilenames = vis.visualise_save_series(filePaths, imagePattern)
+        assert len(imageFilenames) == len(filePaths)
+        for imageFilename in imageFilenames:
+            assert os.path.exists(imageFilename)
+        assert vis.get_vtk_object("reader").GetFileName() == filePaths[-1]
+
+        # Test 4: If the reader uses the data set cache, the files of the
+        # series are not cached, but the reader caches the files it reads
+        # afterwards.
+        chagu.sources.dataSetCache.clear()
+        vis = chagu.Visualisation()
+        vis.load_visualisation_toolkit_file(filePaths[0], readerName="reader",
+                                            useCache=True)
+        vis.act_surface()
+        vis.visualise_save_series(filePaths[1:], imagePattern)
+        cacheKeys = [chagu.sources.file_cache_key(filePath)
+                     for filePath in filePaths]
+        assert cacheKeys[1] not in chagu.sources.dataSetCache
+        assert cacheKeys[2] not in chagu.sources.dataSetCache
+        reader = vis.get_vtk_object("reader")
+        reader.SetFileName(filePaths[1])
+        reader.Update()
+        assert cacheKeys[1] in chagu.sources.dataSetCache
+
+        # Test 5: If the data set of the reader was loaded from the cache, a
+        # ValueError is raised and no images are produced.
+        vis = chagu.Visualisation()
+        vis.load_visualisation_toolkit_file(filePaths[1], readerName="reader",
+                                            useCache=True)
+        vis.act_surface()
+        for zI in xrange(len(filePaths)):
+            if os.path.exists(imagePattern.format(zI)):
+                os.remove(imagePattern.format(zI))
+        with pytest.raises(ValueError):
+            vis.visualise_save_series(filePaths, imagePattern)
+        with pytest.raises(ValueError):
+            vis.visualise_save_series(filePaths, imagePattern,
+                                      readerName="reader")
+        assert os.path.exists(imagePattern.format(0)) is False
+
+    # Remove the images as a cleanup activity.
+    finally:
+        for zI in xrange(len(filePaths)):
+            if os.path.exists(imagePattern.format(zI)):
+                os.remove(imagePattern.format(zI))
+
+
+def test_visualise_stream():
+    """
+    Test chagu.render.visualise_stream. We test the following cases:
+
+    1. If the number of pieces is less than one, or a reader cannot produce
+         pieces, a ValueError is raised.
+    2. Streaming a visualisation in pieces produces an image.
+
+    This function is largely tested by test_stream_pieces.
+    """
+    imageFilename = "{}/test_visualise_stream.png".format(pathToThisFile)
+    imageFilePath = "{}/test_visualise_stream.vti".format(pathToThisFile)
+    write_vector_field_image(imageFilePath)
+
+    try:
+        # Test 1: If the number of pieces is less than one, or a reader cannot
+        # produce pieces, a ValueError is raised.
+        vis = chagu.Visualisation()
+        vis.load_visualisation_toolkit_file(absFilePath)
+        vis.act_surface()
+        with pytest.raises(ValueError):
+            vis.visualise_stream(imageFilename, 4)
+
+        vis = chagu.Visualisation()
+        vis.load_visualisation_toolkit_file(imageFilePath)
+        vis.act_surface()
+        with pytest.raises(ValueError):
+            vis.visualise_stream(imageFilename, 0)
+
+        # Test 2: Streaming a visualisation in pieces produces an image.
+        vis.visualise_stream(imageFilename, 4)
+        assert os.path.exists(imageFilename)
+
+    # Remove the test files as a cleanup activity.
+    finally:
+        for filePath in [imageFilename, imageFilePath]:
+            if os.path.exists(filePath):
+                os.remove(filePath)
+
+
+def test_visualise_to_array():
+    """
+    Test chagu.render.visualise_to_array. We test the following cases:
+
+    1. An array of unsigned bytes with the shape of the window, and with three
+         components, is returned.
+    2. If alpha is True, the array has four components.
+    3. The array is not changed by later renders.
+    """
+    vis = chagu.Visualisation()
+    vis.load_visualisation_toolkit_file(absFilePath)
+    vis.extract_vector_components(component=2)
+    vis.act_surface()
+    vis.windowSize = [60, 40]
+    vis.background = [1., 1., 1.]
+
+    # Test 1: An array of unsigned bytes with the shape of the window, and with
+    # three components, is returned.
+    image = vis.visualise_to_array()
+    assert image.dtype == np.uint8
+    assert image.shape == (40, 60, 3)
+
+    # Test 2: If alpha is True, the array has four components.
+    assert vis.visualise_to_array(alpha=True).shape == (40, 60, 4)
+
+    # Test 3: The array is not changed by later renders.
+    imageCopy = image.copy()
+    vis.background = [0., 0., 0.]
+    vis.visualise_to_array()
+    assert (image == imageCopy).all()
+
+
+def test_write_png():
+    """
+    Test chagu.render.write_png. We test the following cases:
+
+    1. Images with one to four components are read back by VTK unchanged, for
+         any compression level.
+    2. Two-dimensional arrays are written as greyscale images.
+    3. If the image has more than four components, a ValueError is raised.
+    """
+    imageFilename = "{}/test_write_png.png".format(pathToThisFile)
+    try:
+        # Test 1: Images with one to four components are read back by VTK
+        # unchanged, for any compression level.
+        for components in xrange(1, 5):
+            for compressionLevel in [0, 5, 9]:
+                image = np.random.randint(0, 256, (31, 19, components))\
+                    .astype(np.uint8)
+                chagu.render.write_png(image, imageFilename,
+                                       compressionLevel=compressionLevel)
+                assert (read_png(imageFilename) == image).all()
+
+        # Test 2: Two-dimensional arrays are written as greyscale images.
+        image = np.arange(256, dtype=np.uint8).reshape(16, 16)
+        chagu.render.write_png(image, imageFilename)
+        assert (read_png(imageFilename)[:, :, 0] == image).all()
+
+        # Test 3: If the image has more than four components, a ValueError is
+        # raised.
+        with pytest.raises(ValueError):
+            chagu.render.write_png(np.zeros((4, 4, 5)), imageFilename)
+
+    # Remove the image as a cleanup activity.
+    finally:
+        if os.path.exists(imageFilename):
+            os.remove(imageFilename)
+
+
 if __name__ == "__main__":
     test_build_renderer_and_window()
     test_save_snapshot()
@@ -4,8 +4,13 @@ chagu/sources.py. Tests are detailed in the function documentation
 """
 
 import chagu
+import gc
+import numpy as np
 import os
 import pytest
+import shutil
+import vtk
+from vtk.util import numpy_support
 
 
 pathToThisFile = os.path.dirname(os.path.realpath(__file__))
@@ -19,6 +24,505 @@ relativeVtkFilePathDataAscii = "../example/data/data_ascii_space.vtk"
 absFilePathDataAscii = "{}/{}".format(pathToThisFile,
                                       relativeVtkFilePathDataAscii)
 
+relativeVtuFilePathData3 = "../example/data/data3.vtu"
+absFilePathData3 = "{}/{}".format(pathToThisFile, relativeVtuFilePathData3)
+
+
+def structured_grid_piece(extent):
+    """
+    Create a structured grid with the given extent, whose points are at their
+    (i, j, k) indices.
+    """
+    grid = vtk.vtkStructuredGrid()
+    grid.SetExtent(extent)
+    points = vtk.vtkPoints()
+    for k in xrange(extent[4], extent[5] + 1):
+        for j in xrange(extent[2], extent[3] + 1):
+            for i in xrange(extent[0], extent[1] + 1):
+                points.InsertNextPoint(i, j, k)
+    grid.SetPoints(points)
+    return grid
+
+
+def write_oommf_file(filePath, vectors, version, dataFormat):
+    """
+    Write a vector field with shape (nz, ny, nx, 3) to an OOMMF vector field
+    file, with a unit grid whose first point is at (0.5, 1.5, 2.5).
+    """
+    nz, ny, nx = vectors.shape[:3]
+    if version == 1:
+        lines = ["# OOMMF: rectangular mesh v1.0", "# Segment count: 1",
+                 "# Begin: Segment", "# Begin: Header"]
+    else:
+        lines = ["# OOMMF OVF 2.0", "# Segment count: 1",
+                 "# Begin: Segment", "# Begin: Header", "# valuedim: 3"]
+    lines += ["# Title: test", "## A comment: with a colon",
+              "# meshtype: rectangular", "# meshunit: m",
+              "# xbase: 0.5", "# ybase: 1.5", "# zbase: 2.5",
+              "# xstepsize: 1", "# ystepsize: 1", "# zstepsize: 1",
+              "# xnodes: {}".format(nx), "# ynodes: {}".format(ny),
+              "# znodes: {}".format(nz), "# End: Header",
+              "# Begin: Data {}".format(dataFormat)]
+
+    with open(filePath, "wb") as fl:
+        fl.write("\n".join(lines) + "\n")
+        if dataFormat == "Text":
+            np.savetxt(fl, vectors.reshape(-1, 3))
+        else:
+            valueSize = int(dataFormat.split()[1])
+            byteOrder = ">" if version == 1 else "<"
+            values = np.concatenate(
+                [[chagu.sources.oommfBinaryCheckValues[valueSize]],
+                 vectors.reshape(-1)])
+            fl.write(values.astype("{}f{}".format(byteOrder, valueSize))
+                     .tostring())
+            fl.write("\n")
+        fl.write("# End: Data {}\n# End: Segment\n".format(dataFormat))
+
+
+@pytest.mark.skipif(hasattr(vtk, "vtkStructuredGridAppend") is False,
+                    reason="Requires vtkStructuredGridAppend (VTK 7+).")
+def test_append_data_sets():
+    """
+    Test chagu.sources.append_data_sets. We test the following cases:
+
+    1. Structured grid pieces are combined into a structured grid placed by
+         their extents, with points shared by pieces appearing once.
+    """
+
+    # Test 1: Structured grid pieces are combined into a structured grid
+    # placed by their extents, with points shared by pieces appearing once.
+    pieces = [structured_grid_piece([0, 3, 0, 3, 0, 1]),
+              structured_grid_piece([0, 3, 0, 3, 1, 2])]
+    grid = chagu.sources.append_data_sets(pieces)
+    assert grid.IsA("vtkStructuredGrid") == 1
+    assert grid.GetExtent() == (0, 3, 0, 3, 0, 2)
+    assert grid.GetNumberOfPoints() == 48
+    assert grid.GetBounds() == (0, 3, 0, 3, 0, 2)
+
+
+def test_data_set_cache():
+    """
+    Test the data set cache used by
+    chagu.sources.load_visualisation_toolkit_file. We test the following
+    cases:
+
+    1. If the cache is not used, data sets are not cached.
+    2. If the cache is used, the data set is cached when the file is read.
+    3. Loading the file again produces a copy of the cached data set without a
+         reader, and sets the _boundingBox value.
+    4. If the file is modified, it is read again.
+    """
+    testFile = "{}/test_data_set_cache.vtu".format(pathToThisFile)
+    shutil.copy(absFilePathData, testFile)
+    cache = chagu.sources.dataSetCache
+    cache.clear()
+
+    try:
+        # Test 1: If the cache is not used, data sets are not cached.
+        vis = chagu.Visualisation()
+        vis.load_visualisation_toolkit_file(testFile)
+        vis._boundingBox
+        assert len(cache) == 0
+
+        # Test 2: If the cache is used, the data set is cached when the file is
+        # read.
+        vis = chagu.Visualisation()
+        readerName = vis.load_visualisation_toolkit_file(testFile,
+                                                         useCache=True)
+        assert vis.get_vtk_object(readerName).IsA("vtkXMLReader")
+        assert len(cache) == 0
+        vis._boundingBox
+        assert len(cache) == 1
+        assert cache.size > 0
+
+        # Test 3: Loading the file again produces a copy of the cached data set
+        # without a reader, and sets the _boundingBox value.
+        vis = chagu.Visualisation()
+        sourceName = vis.load_visualisation_toolkit_file(testFile,
+                                                         useCache=True)
+        source = vis.get_vtk_object(sourceName)
+        assert source.IsA("vtkXMLReader") == 0
+        assert vis.is_reader(sourceName) is True
+        assert source.GetOutputDataObject(0).GetNumberOfPoints() == 7752
+        assert vis._boundingBox[:-2] == [-9.3, 9.3, -16.1, 16.1]
+
+        # Test 4: If the file is modified, it is read again.
+        fileStatus = os.stat(testFile)
+        os.utime(testFile, (fileStatus.st_atime, fileStatus.st_mtime + 10))
+        vis = chagu.Visualisation()
+        readerName = vis.load_visualisation_toolkit_file(testFile,
+                                                         useCache=True)
+        assert vis.get_vtk_object(readerName).IsA("vtkXMLReader")
+
+    # Remove the test file and cached data sets as a cleanup activity.
+    finally:
+        cache.clear()
+        if os.path.exists(testFile):
+            os.remove(testFile)
+
+
+def test_grid_slices():
+    """
+    Test chagu.sources.grid_slices. We test the following cases:
+
+    1. Without a stride or mask arguments, every point is selected.
+    2. With a stride, every k-th point along each axis is selected. A single
+         integer stride of any integer type applies to every axis.
+    3. With mask arguments, the points a stride mask would sample are
+         selected.
+    4. If the mask domain is not aligned with the axes, a ValueError is
+         raised.
+    """
+    gridSpec = {"dimensions": [32, 16, 8], "origin": [1., 2., 3.],
+                "spacing": [0.5, 0.5, 1.]}
+
+    # Test 1: Without a stride or mask arguments, every point is selected.
+    assert chagu.sources.grid_slices(gridSpec) ==\
+        [slice(0, 32, 1), slice(0, 16, 1), slice(0, 8, 1)]
+
+    # Test 2: With a stride, every k-th point along each axis is selected.
+    assert chagu.sources.grid_slices(gridSpec, stride=[4, 2, 1]) ==\
+        [slice(0, 32, 4), slice(0, 16, 2), slice(0, 8, 1)]
+    for stride in [2, 2L, np.int32(2)]:
+        assert chagu.sources.grid_slices(gridSpec, stride=stride) ==\
+            [slice(0, 32, 2), slice(0, 16, 2), slice(0, 8, 2)]
+
+    # Test 3: With mask arguments, the points a stride mask would sample are
+    # selected.
+    axisCoordinates = [1. + 0.5 * np.arange(32), 2. + 0.5 * np.arange(16),
+                       3. + np.arange(8)]
+    maskDomain = [2., 3., 5., 12., 3., 5., 2., 8., 5.]
+    maskType, domain, resolution = chagu.mask.mask_geometry_from_opts(
+        None, 1., maskDomain=maskDomain, maskResolution=[4, 3])
+    axisIndices = chagu.mask.stride_indices_in_domain(
+        axisCoordinates, domain + domain[0:3], resolution + [1])
+    slices = chagu.sources.grid_slices(gridSpec, maskDomain=maskDomain,
+                                       maskResolution=[4, 3])
+    for zI in xrange(3):
+        assert (np.arange(32)[slices[zI]] == axisIndices[zI]).all()
+
+    # Test 4: If the mask domain is not aligned with the axes, a ValueError is
+    # raised.
+    with pytest.raises(ValueError):
+        chagu.sources.grid_slices(gridSpec, maskDomain=[2., 3., 5.,
+                                                        12., 4., 5.,
+                                                        2., 8., 5.])
+
+
+def test_legacy_data_set_type():
+    """
+    Test chagu.sources.legacy_data_set_type. We test the following cases:
+
+    1. The type is found in a file with an empty title line.
+    2. The type is found in a binary file whose title mentions another data
+         set type, with the keyword in lower case.
+    3. If the header has no DATASET line, a ValueError is raised, even if one
+         appears later in the file.
+    """
+    testFile = "{}/test_legacy_data_set_type.vtk".format(pathToThisFile)
+
+    # Test 1: The type is found in a file with an empty title line.
+    assert chagu.sources.legacy_data_set_type(absFilePathDataAscii) ==\
+        "RECTILINEAR_GRID"
+
+    try:
+        # Test 2: The type is found in a binary file whose title mentions
+        # another data set type, with the keyword in lower case.
+        with open(testFile, "wb") as fl:
+            fl.write("# vtk DataFile Version 3.0\n"
+                     "DATASET RECTILINEAR_GRID\n"
+                     "BINARY\n\n"
+                     "dataset structured_grid\n" + "\x00\xff" * 1000)
+        assert chagu.sources.legacy_data_set_type(testFile) ==\
+            "STRUCTURED_GRID"
+
+        # Test 3: If the header has no DATASET line, a ValueError is raised,
+        # even if one appears later in the file.
+        with open(testFile, "wb") as fl:
+            fl.write("# vtk DataFile Version 3.0\ntitle\nASCII\n" +
+                     "\n".join(["0.0"] * 100) + "\nDATASET POLYDATA\n")
+        with pytest.raises(ValueError):
+            chagu.sources.legacy_data_set_type(testFile)
+
+    # Remove the test file as a cleanup activity.
+    finally:
+        if os.path.exists(testFile):
+            os.remove(testFile)
+
+
+def test_load_hdf5_vector_field():
+    """
+    Test chagu.sources.load_hdf5_vector_field. We test the following cases:
+
+    1. The grid of a dataset is described from its shape and attributes.
+    2. Reading with a stride produces every k-th point, on the right grid.
+    3. Reading with a plane mask produces a single layer of points, which are
+         those a stride mask would sample from the whole dataset.
+    4. A series of datasets creates a time series source.
+    5. The vectors read from the file are still produced by a source, and by
+         each step of a series, after they are garbage collected by Python.
+    """
+    h5py = pytest.importorskip("h5py")
+    testFile = "{}/test_load_hdf5_vector_field.h5".format(pathToThisFile)
+    vectors = np.random.rand(8, 16, 32, 3)
+
+    try:
+        with h5py.File(testFile, "w") as fl:
+            dataset = fl.create_dataset("step_0", data=vectors,
+                                        chunks=(4, 4, 4, 3))
+            dataset.attrs["origin"] = [1., 2., 3.]
+            dataset.attrs["spacing"] = [0.5, 0.5, 1.]
+            fl.create_dataset("step_1", data=vectors * 2,
+                              chunks=(4, 4, 4, 3))
+
+        # Test 1: The grid of a dataset is described from its shape and
+        # attributes.
+        gridSpec = chagu.sources.read_hdf5_grid_spec(testFile, "step_0")
+        assert gridSpec == {"dimensions": [32, 16, 8],
+                            "origin": [1., 2., 3.],
+                            "spacing": [0.5, 0.5, 1.]}
+
+        # Test 2: Reading with a stride produces every k-th point, on the
+        # right grid.
+        vis = chagu.Visualisation()
+        sourceName = vis.load_hdf5_vector_field(testFile, "step_0", stride=4)
+        assert vis.is_reader(sourceName) is True
+        dataSet = vis.get_vtk_object(sourceName).GetOutputDataObject(0)
+        assert dataSet.GetDimensions() == (8, 4, 2)
+        assert dataSet.GetSpacing() == (2., 2., 4.)
+        assert dataSet.GetPointData().GetVectors().GetTuple3(9) ==\
+            tuple(vectors[0, 4, 4])
+
+        # Test 3: Reading with a plane mask produces a single layer of points,
+        # which are those a stride mask would sample from the whole dataset.
+        vis = chagu.Visualisation()
+        sourceName = vis.load_hdf5_vector_field(testFile, "step_0",
+                                                maskType="plane",
+                                                glyphSize=2.)
+        dataSet = vis.get_vtk_object(sourceName).GetOutputDataObject(0)
+        fullDataSet = chagu.sources.numpy_vector_field_data_set(gridSpec,
+                                                                vectors)
+        maskType, domain, resolution = chagu.mask.mask_geometry_from_opts(
+            fullDataSet.GetBounds(), 2., maskType="plane")
+        sampled = chagu.mask.stride_sample(fullDataSet, domain + domain[0:3],
+                                           resolution + [1])
+        assert dataSet.GetDimensions()[2] == 1
+        assert dataSet.GetNumberOfPoints() == sampled.GetNumberOfPoints()
+        for zI in xrange(dataSet.GetNumberOfPoints()):
+            assert dataSet.GetPoint(zI) == sampled.GetPoint(zI)
+
+        # Test 4: A series of datasets creates a time series source.
+        vis = chagu.Visualisation()
+        vis.load_hdf5_vector_field(testFile, ["step_0", "step_1"], stride=2)
+        assert vis.advance_time_series() == "step_1"
+        assert vis.advance_time_series() is None
+
+        # Test 5: The vectors read from the file are still produced by a
+        # source, and by each step of a series, after they are garbage
+        # collected by Python.
+        vis = chagu.Visualisation()
+        sourceName = vis.load_hdf5_vector_field(testFile, "step_0", stride=2)
+        seriesName = vis.load_hdf5_vector_field(testFile,
+                                                ["step_0", "step_1"],
+                                                stride=2)
+        expectedVectors = vectors[::2, ::2, ::2].reshape(-1, 3)
+        for zI in xrange(2):
+            gc.collect()
+            overwriters = [np.full(expectedVectors.size, -1.)
+                           for zJ in xrange(16)]
+            for objectName, factor in [[sourceName, 1], [seriesName, zI + 1]]:
+                dataSet = vis.get_vtk_object(objectName)\
+                    .GetOutputDataObject(0)
+                assert (numpy_support.vtk_to_numpy(
+                    dataSet.GetPointData().GetVectors()) ==
+                    expectedVectors * factor).all()
+            vis.advance_time_series(seriesName)
+
+    # Remove the test file as a cleanup activity.
+    finally:
+        if os.path.exists(testFile):
+            os.remove(testFile)
+
+
+def test_load_numpy_vector_field():
+    """
+    Test chagu.sources.load_numpy_vector_field. We test the following cases:
+
+    1. The source is tracked as a reader, produces a data set wrapping the
+         arrays, and sets the _boundingBox value.
+    2. The pipeline can be built from the source with autopipe.
+    """
+    vis = chagu.Visualisation()
+    vectors = np.random.rand(4, 3, 2, 3)
+
+    # Test 1: The source is tracked as a reader, produces a data set wrapping
+    # the arrays, and sets the _boundingBox value.
+    sourceName = vis.load_numpy_vector_field(
+        {"dimensions": [2, 3, 4], "origin": [-1., -1., -1.]}, vectors)
+    assert vis.is_reader(sourceName) is True
+    dataSet = vis.get_vtk_object(sourceName).GetOutputDataObject(0)
+    assert dataSet.GetNumberOfPoints() == 24
+    assert vis._boundingBox == [-1, 0, -1, 1, -1, 2]
+
+    # Test 2: The pipeline can be built from the source with autopipe.
+    componentsName = vis.extract_vector_components(component=2)
+    vis.act_surface()
+    vis.autopipe()
+    assert [sourceName, componentsName] in vis._pipeline
+
+
+def test_load_oommf_file():
+    """
+    Test chagu.sources.load_oommf_file. We test the following cases:
+
+    1. Loading an OOMMF file with load_visualisation_toolkit_file creates a
+         source that is tracked as a reader, and sets the _boundingBox value.
+    2. The vectors read from the file, in each data format, are still passed
+         down the pipeline after they are garbage collected by Python, both
+         by the source and by read_visualisation_toolkit_file.
+    """
+    testFile = "{}/test_load_oommf_file.omf".format(pathToThisFile)
+    vectors = np.random.rand(2, 3, 4, 3)
+    write_oommf_file(testFile, vectors, 2, "Binary 4")
+
+    try:
+        # Test 1: Loading an OOMMF file with load_visualisation_toolkit_file
+        # creates a source that is tracked as a reader, and sets the
+        # _boundingBox value.
+        vis = chagu.Visualisation()
+        sourceName = vis.load_visualisation_toolkit_file(testFile,
+                                                         readerName="omf")
+        assert sourceName == "omf"
+        assert vis.is_reader(sourceName) is True
+        assert vis._boundingBox == [0, 3.5, 0, 3.5, 0, 3.5]
+
+        # Test 2: The vectors read from the file, in each data format, are
+        # still passed down the pipeline after they are garbage collected by
+        # Python, both by the source and by read_visualisation_toolkit_file.
+        expectedVectors = vectors.reshape(-1, 3)
+        for version, dataFormat in [[1, "Binary 8"], [2, "Binary 4"],
+                                    [2, "Text"]]:
+            write_oommf_file(testFile, vectors, version, dataFormat)
+            vis = chagu.Visualisation()
+            vis.load_visualisation_toolkit_file(testFile)
+            surfaceName = vis.act_surface()
+            vis.autopipe(update=False)
+            dataSet = chagu.sources.read_visualisation_toolkit_file(testFile)
+            gc.collect()
+            overwriters = [np.full(expectedVectors.size, -1.)
+                           for zI in xrange(16)]
+            mapper = vis.get_vtk_object(surfaceName).actor.GetMapper()
+            mapper.Update()
+            for vtkVectors in [mapper.GetInput().GetPointData().GetVectors(),
+                               dataSet.GetPointData().GetVectors()]:
+                assert np.allclose(numpy_support.vtk_to_numpy(vtkVectors),
+                                   expectedVectors, atol=1e-6)
+
+    # Remove the test file as a cleanup activity.
+    finally:
+        if os.path.exists(testFile):
+            os.remove(testFile)
+
+
+def test_load_partitioned_visualisation_toolkit_file():
+    """
+    Test chagu.sources.load_partitioned_visualisation_toolkit_file. We test
+    the following cases:
+
+    1. Loading a partitioned file with load_visualisation_toolkit_file creates
+         a source tracked as a reader, which produces every piece combined, and
+         the _boundingBox value contains every piece.
+    2. Image data pieces are combined into image data, and unstructured grid
+         pieces are combined into an unstructured grid.
+    3. If a mask domain is given, only the pieces that intersect it are
+         loaded, and image data pieces outside it are not read.
+    4. If no pieces intersect the mask domain, a ValueError is raised.
+    5. If streaming, a VTK reader for partitioned files is tracked without
+         reading any pieces, and the bounding box can be worked out a piece
+         at a time.
+    """
+    testDirectory = "{}/test_load_partitioned".format(pathToThisFile)
+    os.mkdir(testDirectory)
+
+    try:
+        # Write a field on an 8x8x8 grid as four pieces, split along y and z.
+        source = vtk.vtkRTAnalyticSource()
+        source.SetWholeExtent(0, 7, 0, 7, 0, 7)
+        triangulator = vtk.vtkDataSetTriangleFilter()
+        triangulator.SetInputConnection(source.GetOutputPort())
+        for writer, fileName, inputAlgorithm in \
+            [[vtk.vtkXMLPImageDataWriter(), "image.pvti", source],
+             [vtk.vtkXMLPUnstructuredGridWriter(), "grid.pvtu",
+              triangulator]]:
+            writer.SetInputConnection(inputAlgorithm.GetOutputPort())
+            writer.SetFileName("{}/{}".format(testDirectory, fileName))
+            writer.SetNumberOfPieces(4)
+            writer.SetStartPiece(0)
+            writer.SetEndPiece(3)
+            writer.Write()
+        imagePath = "{}/image.pvti".format(testDirectory)
+        gridPath = "{}/grid.pvtu".format(testDirectory)
+
+        # Test 1: Loading a partitioned file with
+        # load_visualisation_toolkit_file creates a source tracked as a
+        # reader, which produces every piece combined, and the _boundingBox
+        # value contains every piece.
+        vis = chagu.Visualisation()
+        imageName = vis.load_visualisation_toolkit_file(imagePath,
+                                                        readerName="image")
+        assert imageName == "image"
+        assert vis.is_reader(imageName) is True
+        image = vis.get_vtk_object(imageName).GetOutputDataObject(0)
+        assert image.GetNumberOfPoints() == 512
+        assert vis._boundingBox == [0, 7, 0, 7, 0, 7]
+
+        # Test 2: Image data pieces are combined into image data, and
+        # unstructured grid pieces are combined into an unstructured grid.
+        assert image.IsA("vtkImageData") == 1
+        gridName = vis.load_visualisation_toolkit_file(gridPath)
+        grid = vis.get_vtk_object(gridName).GetOutputDataObject(0)
+        assert grid.IsA("vtkUnstructuredGrid") == 1
+        assert grid.GetBounds() == (0, 7, 0, 7, 0, 7)
+
+        # Test 3: If a mask domain is given, only the pieces that intersect it
+        # are loaded, and image data pieces outside it are not read.
+        os.remove("{}/image_3.vti".format(testDirectory))
+        maskDomain = [0, 0, 0, 7, 0, 0, 0, 1, 0]
+        vis = chagu.Visualisation()
+        imageName = vis.load_visualisation_toolkit_file(
+            imagePath, maskDomain=maskDomain)
+        image = vis.get_vtk_object(imageName).GetOutputDataObject(0)
+        assert image.GetExtent() == (0, 7, 0, 3, 0, 3)
+        assert vis._boundingBox == [0, 7, 0, 3, 0, 3]
+        gridName = vis.load_partitioned_visualisation_toolkit_file(
+            gridPath, maskDomain=maskDomain)
+        grid = vis.get_vtk_object(gridName).GetOutputDataObject(0)
+        assert grid.GetBounds() == (0, 7, 0, 3, 0, 3)
+
+        # Test 4: If no pieces intersect the mask domain, a ValueError is
+        # raised.
+        with pytest.raises(ValueError):
+            vis.load_visualisation_toolkit_file(
+                gridPath, maskDomain=[10, 10, 10, 11, 10, 10, 10, 11, 10])
+
+        # Test 5: If streaming, a VTK reader for partitioned files is tracked
+        # without reading any pieces, and the bounding box can be worked out a
+        # piece at a time.
+        vis = chagu.Visualisation()
+        readerName = vis.load_partitioned_visualisation_toolkit_file(
+            gridPath, streaming=True)
+        reader = vis.get_vtk_object(readerName)
+        assert isinstance(reader, vtk.vtkXMLPUnstructuredGridReader)
+        assert reader.GetOutputDataObject(0).GetNumberOfPoints() == 0
+        boundingBox = chagu.sources.resolve_bounding_box(vis,
+                                                         numberOfPieces=4)
+        assert boundingBox == [0, 7, 0, 7, 0, 7]
+        assert reader.GetOutputDataObject(0).GetNumberOfPoints() < 512
+
+    # Remove the test files as a cleanup activity.
+    finally:
+        shutil.rmtree(testDirectory)
 
 
 def test_load_visualisation_toolkit_file():
@@ -95,5 +599,404 @@ def test_load_visualisation_toolkit_file():
     assert vis._boundingBox[5] == 50
 
 
+def test_load_visualisation_toolkit_time_series():
+    """
+    Test chagu.sources.load_visualisation_toolkit_time_series and
+    chagu.sources.advance_time_series. We test the following cases:
+
+    1. If no files are given, or a file does not exist, a ValueError is raised.
+    2. The source produces the first data set, and the _boundingBox value is
+         set appropriately.
+    3. Advancing the source produces the next data set, which is passed down
+         the pipeline, and expands the _boundingBox value.
+    4. Advancing the source past the end of the series returns None, and
+         leaves the source unchanged.
+    5. A glob pattern loads the matching files in sorted order.
+    6. Tracking another object under the name of a time series source stops
+         its series from loading.
+    7. Closing a visualisation, including by leaving a "with" block over it,
+         stops the series of its time series sources from loading.
+    """
+    vis = chagu.Visualisation()
+
+    # Test 1: If no files are given, or a file does not exist, a ValueError is
+    # raised.
+    with pytest.raises(ValueError):
+        vis.load_visualisation_toolkit_time_series([])
+    with pytest.raises(ValueError):
+        vis.load_visualisation_toolkit_time_series([absFilePathData,
+                                                    "not_a_file.vtu"])
+
+    # Test 2: The source produces the first data set, and the _boundingBox
+    # value is set appropriately.
+    sourceName = vis.load_visualisation_toolkit_time_series(
+        [absFilePathData, absFilePathData3], prefetchDepth=1)
+    source = vis.get_vtk_object(sourceName)
+    assert source.GetOutputDataObject(0).GetNumberOfPoints() == 7752
+    assert vis._boundingBox[:-2] == [-9.3, 9.3, -16.1, 16.1]
+
+    # Test 3: Advancing the source produces the next data set, which is passed
+    # down the pipeline, and expands the _boundingBox value.
+    surfaceName = vis.act_surface()
+    vis.autopipe()
+    mapper = vis.get_vtk_object(surfaceName).actor.GetMapper()
+    assert vis.advance_time_series() == absFilePathData3
+    mapper.Update()
+    assert mapper.GetInput().GetNumberOfPoints() == 17576
+    assert vis._boundingBox == [-25, 25, -25, 25, -25, 25]
+
+    # Test 4: Advancing the source past the end of the series returns None,
+    # and leaves the source unchanged.
+    assert vis.advance_time_series() is None
+    assert source.GetOutputDataObject(0).GetNumberOfPoints() == 17576
+
+    # Test 5: A glob pattern loads the matching files in sorted order.
+    vis = chagu.Visualisation()
+    pattern = "{}/../example/data/data[0-9]*.vtu".format(pathToThisFile)
+    sourceName = vis.load_visualisation_toolkit_time_series(pattern)
+    source = vis.get_vtk_object(sourceName)
+    assert source.time_series.keys[-1].endswith("data3.vtu")
+    assert len(source.time_series.keys) == 2
+
+    # Test 6: Tracking another object under the name of a time series source
+    # stops its series from loading. The series is longer than the prefetch
+    # depth, so that the thread is waiting to load the rest of it.
+    filePaths = [absFilePathData] * 4
+    sourceName = vis.load_visualisation_toolkit_time_series(filePaths,
+                                                            prefetchDepth=1)
+    prefetcher = vis.get_vtk_object(sourceName).time_series
+    assert prefetcher._thread.is_alive() is True
+    vis.track_object(vtk.vtkTrivialProducer(), sourceName)
+    assert prefetcher._thread.is_alive() is False
+
+    # Test 7: Closing a visualisation, including by leaving a "with" block
+    # over it, stops the series of its time series sources from loading.
+    sourceName = vis.load_visualisation_toolkit_time_series(filePaths,
+                                                            prefetchDepth=1)
+    prefetcher = vis.get_vtk_object(sourceName).time_series
+    assert prefetcher._thread.is_alive() is True
+    vis.close()
+    assert prefetcher._thread.is_alive() is False
+    assert vis.advance_time_series(sourceName) is None
+    with chagu.Visualisation() as vis:
+        sourceName = vis.load_visualisation_toolkit_time_series(
+            filePaths, prefetchDepth=1)
+        prefetcher = vis.get_vtk_object(sourceName).time_series
+    assert prefetcher._thread.is_alive() is False
+
+
+def test_numpy_to_vtk_array():
+    """
+    Test chagu.sources.numpy_to_vtk_array. We test the following cases:
+
+    1. An array of a type VTK supports is wrapped, not copied, and is kept
+         alive by the VTK array.
+    2. An array of another type is copied, and converted to a type VTK
+         supports.
+    """
+
+    # Test 1: An array of a type VTK supports is wrapped, not copied, and is
+    # kept alive by the VTK array.
+    vtkArray = chagu.sources.numpy_to_vtk_array(np.arange(6.), "values")
+    assert vtkArray.GetName() == "values"
+    assert vtkArray.GetDataType() == vtk.VTK_DOUBLE
+    wrappedArray = numpy_support.vtk_to_numpy(vtkArray)
+    wrappedArray[0] = 42.
+    assert vtkArray.GetTuple1(0) == 42.
+    del wrappedArray
+    gc.collect()
+    overwriters = [np.full(6, -1.) for zI in xrange(16)]
+    assert [vtkArray.GetTuple1(zI) for zI in xrange(1, 6)] == range(1, 6)
+
+    # Test 2: An array of another type is copied, and converted to a type VTK
+    # supports.
+    bigEndianArray = np.arange(6.).astype(">f8")
+    vtkArray = chagu.sources.numpy_to_vtk_array(bigEndianArray)
+    bigEndianArray[0] = 42.
+    assert vtkArray.GetTuple1(0) == 0.
+    assert [vtkArray.GetTuple1(zI) for zI in xrange(6)] == range(6)
+
+
+def test_numpy_vector_field_data_set():
+    """
+    Test chagu.sources.numpy_vector_field_data_set. We test the following
+    cases:
+
+    1. A grid specification creates image data with the vectors and scalars
+         attached to the points in order, x varying fastest.
+    2. The arrays are wrapped, not copied, and are kept alive by the data
+         set once the caller has dropped them.
+    3. Points create an unstructured grid with a vertex cell at each point.
+    4. If the number of points and vectors differ, a ValueError is raised.
+    """
+
+    # Test 1: A grid specification creates image data with the vectors and
+    # scalars attached to the points in order, x varying fastest.
+    vectors = np.random.rand(4, 3, 2, 3)
+    scalars = np.arange(24.)
+    dataSet = chagu.sources.numpy_vector_field_data_set(
+        {"dimensions": [2, 3, 4], "spacing": [1., 2., 3.]}, vectors, scalars)
+    assert dataSet.IsA("vtkImageData")
+    assert dataSet.GetBounds() == (0, 1, 0, 4, 0, 9)
+    assert dataSet.GetPoint(5) == (1, 4, 0)
+    assert dataSet.GetPointData().GetVectors().GetTuple3(5) ==\
+        tuple(vectors[0, 2, 1])
+    assert dataSet.GetPointData().GetScalars().GetTuple1(5) == 5
+
+    # Test 2: The arrays are wrapped, not copied, and are kept alive by the
+    # data set once the caller has dropped them.
+    vectors[0, 0, 0, 0] = 42.
+    assert dataSet.GetPointData().GetVectors().GetTuple3(0)[0] == 42.
+    expectedVectors = vectors.reshape(-1, 3).copy()
+    del vectors, scalars
+    gc.collect()
+    overwriters = [np.full(96, -1.) for zI in xrange(16)]
+    assert (numpy_support.vtk_to_numpy(dataSet.GetPointData().GetVectors()) ==
+            expectedVectors).all()
+    assert (numpy_support.vtk_to_numpy(dataSet.GetPointData().GetScalars()) ==
+            np.arange(24.)).all()
+
+    # Test 3: Points create an unstructured grid with a vertex cell at each
+    # point.
+    points = np.random.rand(10, 3)
+    dataSet = chagu.sources.numpy_vector_field_data_set(points,
+                                                        np.ones((10, 3)))
+    assert dataSet.IsA("vtkUnstructuredGrid")
+    assert dataSet.GetNumberOfCells() == 10
+    assert dataSet.GetCellType(3) == vtk.VTK_VERTEX
+    assert dataSet.GetCell(3).GetPointId(0) == 3
+    assert dataSet.GetPoint(3) == tuple(points[3])
+
+    # Test 4: If the number of points and vectors differ, a ValueError is
+    # raised.
+    with pytest.raises(ValueError):
+        chagu.sources.numpy_vector_field_data_set(points, np.ones((9, 3)))
+    with pytest.raises(ValueError):
+        chagu.sources.numpy_vector_field_data_set({"dimensions": [2, 2, 2]},
+                                                  np.ones((9, 3)))
+
+
+def test_read_oommf_file():
+    """
+    Test chagu.sources.read_oommf_file. We test the following cases:
+
+    1. OVF 1.0 and OVF 2.0 files with text, 4-byte binary and 8-byte binary
+         data are read with the right grid and vectors.
+    2. OVF 2.0 binary data are memory-mapped.
+    3. If the binary check value is wrong, a ValueError is raised.
+    4. If the file is not an OOMMF file, a ValueError is raised.
+    """
+    testFile = "{}/test_read_oommf_file.ovf".format(pathToThisFile)
+    vectors = np.random.rand(2, 3, 4, 3)
+
+    try:
+        # Test 1: OVF 1.0 and OVF 2.0 files with text, 4-byte binary and
+        # 8-byte binary data are read with the right grid and vectors.
+        for version in [1, 2]:
+            for dataFormat in ["Text", "Binary 4", "Binary 8"]:
+                write_oommf_file(testFile, vectors, version, dataFormat)
+                gridSpec, vectorsRead = chagu.sources.read_oommf_file(testFile)
+                assert gridSpec == {"dimensions": [4, 3, 2],
+                                    "origin": [0.5, 1.5, 2.5],
+                                    "spacing": [1., 1., 1.]}
+                tolerance = 1e-6 if dataFormat == "Binary 4" else 1e-12
+                assert np.allclose(vectorsRead, vectors.reshape(-1, 3),
+                                   atol=tolerance)
+
+                # Test 2: OVF 2.0 binary data are memory-mapped.
+                if version == 2 and dataFormat != "Text":
+                    assert isinstance(vectorsRead.base, np.memmap)
+                del vectorsRead
+
+        # Test 3: If the binary check value is wrong, a ValueError is raised.
+        write_oommf_file(testFile, vectors, 2, "Binary 4")
+        with open(testFile, "r+b") as fl:
+            contents = fl.read()
+            fl.seek(contents.index("Binary 4\n") + len("Binary 4\n"))
+            fl.write("\x00" * 4)
+        with pytest.raises(ValueError):
+            chagu.sources.read_oommf_file(testFile)
+
+        # Test 4: If the file is not an OOMMF file, a ValueError is raised.
+        with pytest.raises(ValueError):
+            chagu.sources.read_oommf_file(absFilePathDataAscii)
+
+    # Remove the test file as a cleanup activity.
+    finally:
+        if os.path.exists(testFile):
+            os.remove(testFile)
+
+
+def test_read_visualisation_toolkit_file():
+    """
+    Test chagu.sources.read_visualisation_toolkit_file. We test the following
+    cases:
+
+    1. XML and legacy files are read into data sets of the right type.
+    2. The data set read matches that read by a reader given the filename.
+    """
+
+    # Test 1: XML and legacy files are read into data sets of the right type.
+    dataSet = chagu.sources.read_visualisation_toolkit_file(absFilePathData)
+    assert dataSet.IsA("vtkUnstructuredGrid")
+    dataSetAscii = chagu.sources.read_visualisation_toolkit_file(
+        absFilePathDataAscii)
+    assert dataSetAscii.IsA("vtkRectilinearGrid")
+
+    # Test 2: The data set read matches that read by a reader given the
+    # filename.
+    reader = chagu.sources.reader_for_file(absFilePathData)
+    reader.SetFileName(absFilePathData)
+    reader.Update()
+    assert dataSet.GetNumberOfPoints() == \
+        reader.GetOutput().GetNumberOfPoints()
+    assert dataSet.GetNumberOfCells() == reader.GetOutput().GetNumberOfCells()
+    assert dataSet.GetBounds() == reader.GetOutput().GetBounds()
+
+
+def test_resolve_bounding_box():
+    """
+    Test chagu.sources.resolve_bounding_box. We test the following cases:
+
+    1. Loading a file does not read it.
+    2. The bounding box of image data is computed from the header of the file,
+         without reading it.
+    3. Other data sets are read when the bounding box is needed, and are not
+         read again by the pipeline.
+    """
+    testFile = "{}/test_resolve_bounding_box.vti".format(pathToThisFile)
+    source = vtk.vtkRTAnalyticSource()
+    source.SetWholeExtent(-3, 4, 0, 5, 1, 2)
+    source.Update()
+    image = vtk.vtkImageData()
+    image.DeepCopy(source.GetOutput())
+    image.SetOrigin(1., 2., 3.)
+    image.SetSpacing(0.5, 2., 3.)
+
+    try:
+        writer = vtk.vtkXMLImageDataWriter()
+        writer.SetInputData(image)
+        writer.SetFileName(testFile)
+        writer.Write()
+
+        # Test 1: Loading a file does not read it.
+        vis = chagu.Visualisation()
+        imageReader = vis.get_vtk_object(
+            vis.load_visualisation_toolkit_file(testFile))
+        gridReader = vis.get_vtk_object(
+            vis.load_visualisation_toolkit_file(absFilePathData))
+        for reader in [imageReader, gridReader]:
+            assert reader.GetOutputDataObject(0).GetNumberOfPoints() == 0
+
+        # Test 2: The bounding box of image data is computed from the header
+        # of the file, without reading it.
+        assert chagu.sources.information_bounds(imageReader) ==\
+            list(image.GetBounds())
+        assert chagu.sources.information_bounds(gridReader) is None
+        assert imageReader.GetOutputDataObject(0).GetNumberOfPoints() == 0
+
+        # Test 3: Other data sets are read when the bounding box is needed,
+        # and are not read again by the pipeline.
+        assert vis._boundingBox[:-2] == [-9.3, 9.3, -16.1, 16.1]
+        assert vis._boundingBox[5] == 9.
+        dataSet = gridReader.GetOutputDataObject(0)
+        assert dataSet.GetNumberOfPoints() == 7752
+        modifiedTime = dataSet.GetMTime()
+        surfaceName = vis.act_surface()
+        vis.build_pipeline_from_dict([[vis._order[1], surfaceName]])
+        assert gridReader.GetOutputDataObject(0).GetMTime() == modifiedTime
+
+    # Remove the test file as a cleanup activity.
+    finally:
+        if os.path.exists(testFile):
+            os.remove(testFile)
+
+
+def test_time_series_prefetcher():
+    """
+    Test chagu.sources.TimeSeriesPrefetcher. We test the following cases:
+
+    1. Items are yielded in order with their keys.
+    2. No more than prefetchDepth items are loaded ahead of the one last
+         taken.
+    3. An error raised while loading an item is raised when it is taken, with
+         the traceback of the load function, and later items are still
+         yielded.
+    4. If prefetchDepth is less than one, a ValueError is raised.
+    5. The thread stops once the last item is taken.
+    6. Closing the prefetcher stops the thread and its iteration, and closing
+         it again does nothing.
+    """
+
+    # The load function records the keys it has loaded, and fails for negative
+    # keys.
+    loadedKeys = []
+
+    def load(key):
+        loadedKeys.append(key)
+        if key < 0:
+            raise KeyError(key)
+        return key * 10
+
+    # Test 1: Items are yielded in order with their keys.
+    prefetcher = chagu.sources.TimeSeriesPrefetcher(range(5), load,
+                                                    prefetchDepth=2)
+    assert list(prefetcher) == [(zI, zI * 10) for zI in range(5)]
+    finishedPrefetcher = prefetcher
+
+    # Test 2: No more than prefetchDepth items are loaded ahead of the one
+    # last taken.
+    loadedKeys[:] = []
+    prefetcher = chagu.sources.TimeSeriesPrefetcher(range(10), load,
+                                                    prefetchDepth=3)
+    prefetcher.next()
+    prefetcher._thread.join(0.2)  # Give the thread time to load too many.
+    assert len(loadedKeys) <= 4
+    prefetcher.close()
+
+    # Test 3: An error raised while loading an item is raised when it is
+    # taken, with the traceback of the load function, and later items are
+    # still yielded.
+    prefetcher = chagu.sources.TimeSeriesPrefetcher([1, -1, 2], load)
+    assert prefetcher.next() == (1, 10)
+    with pytest.raises(KeyError) as testException:
+        prefetcher.next()
+    assert testException.traceback[-1].name == "load"
+    assert prefetcher.next() == (2, 20)
+
+    # Test 4: If prefetchDepth is less than one, a ValueError is raised.
+    with pytest.raises(ValueError):
+        chagu.sources.TimeSeriesPrefetcher([1], load, prefetchDepth=0)
+
+    # Test 5: The thread stops once the last item is taken.
+    assert finishedPrefetcher._thread.is_alive() is False
+    assert prefetcher._thread.is_alive() is False
+
+    # Test 6: Closing the prefetcher stops the thread and its iteration, and
+    # closing it again does nothing.
+    prefetcher = chagu.sources.TimeSeriesPrefetcher(range(10), load,
+                                                    prefetchDepth=1)
+    prefetcher.next()
+    prefetcher.close()
+    assert prefetcher._thread.is_alive() is False
+    assert list(prefetcher) == []
+    prefetcher.close()
+
+
 if __name__ == "__main__":
+    test_append_data_sets()
+    test_data_set_cache()
+    test_grid_slices()
+    test_legacy_data_set_type()
+    test_load_hdf5_vector_field()
+    test_load_numpy_vector_field()
+    test_load_oommf_file()
+    test_load_partitioned_visualisation_toolkit_file()
     test_load_visualisation_toolkit_file()
+    test_load_visualisation_toolkit_time_series()
+    test_numpy_to_vtk_array()
+    test_numpy_vector_field_data_set()
+    test_read_oommf_file()
+    test_read_visualisation_toolkit_file()
+    test_resolve_bounding_box()
+    test_time_series_prefetcher()
@@ -0,0 +1,233 @@
+"""
+This python file tests the functionality of functions defined in
+chagu/termini.py. Tests are detailed in the function documentation.
+"""
+
+import chagu
+import matplotlib.cm
+import numpy as np
+import os
+import pytest
+import vtk
+from vtk.util import numpy_support
+
+
+pathToThisFile = os.path.dirname(os.path.realpath(__file__))
+relativeVtuFilePath = "../example/data/data.vtu"
+absFilePath = "{}/{}".format(pathToThisFile, relativeVtuFilePath)
+
+
+def test_cone_source():
+    """
+    Test chagu.termini.cone_source. We test the following cases:
+
+    1. The cone has the requested geometry, and is centred at its base by
+         default.
+    2. Cones requested with the same parameters are the same object, and cones
+         requested with different parameters are not.
+    3. Cone vector fields with the same cone parameters share one source.
+    """
+
+    # Test 1: The cone has the requested geometry, and is centred at its base
+    # by default.
+    cones = chagu.termini.cone_source(3., 0.5, 6)
+    assert cones.GetHeight() == 3.
+    assert cones.GetRadius() == 0.5
+    assert cones.GetResolution() == 6
+    assert cones.GetCenter() == (1., 0., 0.)
+    assert chagu.termini.cone_source(3., 0.5, 6, [0., 1., 0.]).GetCenter() ==\
+        (0., 1., 0.)
+
+    # Test 2: Cones requested with the same parameters are the same object,
+    # and cones requested with different parameters are not.
+    assert cones is chagu.termini.cone_source(3., 0.5, 6, "base")
+    assert cones is not chagu.termini.cone_source(3., 0.5, 8)
+    assert cones is not chagu.termini.cone_source(3., 0.5, 6, [1., 0., 0.])
+
+    # Test 3: Cone vector fields with the same cone parameters share one
+    # source.
+    vis = chagu.Visualisation()
+    vis.load_visualisation_toolkit_file(absFilePath)
+    mappers = [vis.get_vtk_object(vis.act_cone_vector_field(3., 0.5, 6))
+               .actor.GetMapper() for zI in xrange(2)]
+    assert mappers[0].GetInputConnection(1, 0).GetProducer() is cones
+    assert mappers[1].GetInputConnection(1, 0).GetProducer() is cones
+
+
+def test_glyph_level_of_detail():
+    """
+    Test chagu.termini.GlyphLevelOfDetail, as created by
+    act_cone_vector_field and act_nasty_vector_field. We test the following
+    cases:
+
+    1. If levels of detail are requested without a mask, a ValueError is
+         raised.
+    2. A terminus with several levels of detail passes its input to a mask for
+         each level, and the mapper draws from the first mask.
+    3. The mask with the most points is chosen when the camera is close, and
+         coarser masks are chosen as the camera moves away or the renderer
+         shrinks.
+    4. The mapper is left alone if it is not drawing from one of the masks.
+    5. Building a renderer observes its "StartEvent" with the level of detail,
+         once however many times it is built.
+    """
+    vis = chagu.Visualisation()
+    vis.load_visualisation_toolkit_file(absFilePath)
+
+    # Test 1: If levels of detail are requested without a mask, a ValueError
+    # is raised.
+    with pytest.raises(ValueError):
+        vis.act_cone_vector_field(1., 0.2, 4, levelsOfDetail=3)
+    with pytest.raises(ValueError):
+        vis.act_nasty_vector_field(1., levelsOfDetail=3)
+
+    # Test 2: A terminus with several levels of detail passes its input to a
+    # mask for each level, and the mapper draws from the first mask.
+    maskDomain = [-8., -8., 0., 8., -8., 0., -8., 8., 0.]
+    conesName = vis.act_cone_vector_field(
+        0.5, 0.1, 4, levelsOfDetail=3, maskDomain=maskDomain,
+        maskResolution=[32, 32], minimumGlyphSpacing=4.)
+    vis.act_nasty_vector_field(0.5, levelsOfDetail=2, maskDomain=maskDomain)
+    vis.autopipe()
+    terminus = vis.get_vtk_object(conesName)
+    levelOfDetail = terminus.level_of_detail
+    mapper = terminus.actor.GetMapper()
+    assert len(levelOfDetail.maskFilters) == 3
+    assert np.allclose(levelOfDetail.spacings, [0.5, 1., 2.], rtol=1e-2)
+    assert mapper.GetInputAlgorithm() is levelOfDetail.maskFilters[0]
+    for maskFilter in levelOfDetail.maskFilters:
+        maskFilter.Update()
+        assert maskFilter.GetOutputDataObject(0).GetNumberOfPoints() > 0
+
+    # Test 3: The mask with the most points is chosen when the camera is
+    # close, and coarser masks are chosen as the camera moves away or the
+    # renderer shrinks. With a view angle of 90 degrees and a window 400
+    # pixels tall, the view is 2 * distance units tall, so cones 0.5 units
+    # apart are 100 / distance pixels apart.
+    renderer = vtk.vtkRenderer()
+    renderWindow = vtk.vtkRenderWindow()
+    renderWindow.AddRenderer(renderer)
+    renderWindow.SetSize(400, 400)
+    camera = renderer.GetActiveCamera()
+    camera.SetViewAngle(90.)
+    camera.SetPosition(0., 0., 20.)
+    assert levelOfDetail.select(renderer) == 0
+    camera.SetPosition(0., 0., 40.)
+    assert levelOfDetail.select(renderer) == 1
+    assert mapper.GetInputAlgorithm() is levelOfDetail.maskFilters[1]
+    renderWindow.SetSize(100, 100)
+    assert levelOfDetail.select(renderer) == 2
+    camera.SetPosition(0., 0., 1e6)
+    assert levelOfDetail.select(renderer) == 2
+
+    # Test 4: The mapper is left alone if it is not drawing from one of the
+    # masks.
+    pieceData = vtk.vtkPolyData()
+    mapper.SetInputData(pieceData)
+    camera.SetPosition(0., 0., 1.)
+    assert levelOfDetail.select(renderer) == 0
+    assert mapper.GetInput() is pieceData
+
+    # Test 5: Building a renderer observes its "StartEvent" with the level of
+    # detail, once however many times it is built.
+    vis.build_renderer_and_window()
+    renderer, renderWindow = vis.build_renderer_and_window()
+    assert len(vis._levelOfDetailObservers) == 2
+    for observerTag in vis._levelOfDetailObservers:
+        assert renderer.GetCommand(observerTag) is not None
+    assert renderer.HasObserver("StartEvent") == 1
+
+
+def test_lookup_table_from_RGB_colourmap():
+    """
+    Test chagu.termini.lookup_table_from_RGB_colourmap. We test the following
+    cases:
+
+    1. The table has the requested size and range, and its colours follow the
+         colourmap.
+    2. The colours of tables requested with a colourmap name are cached, and
+         the cached colours are only referenced by the cache.
+    3. Each table is a new object with its own colours, so modifying one
+         table, including the colourmap_lut of a visualisation, does not
+         modify any other.
+    4. Tables created from colourmap objects are not cached.
+    """
+
+    # Test 1: The table has the requested size and range, and its colours
+    # follow the colourmap.
+    lut = chagu.termini.lookup_table_from_RGB_colourmap("PuOr",
+                                                        scalarRange=[0., 2.],
+                                                        tableSize=256)
+    assert lut.GetNumberOfTableValues() == 256
+    assert lut.GetRange() == (0., 2.)
+    segments = matplotlib.cm.PuOr._segmentdata
+    for zI, colour in enumerate(["red", "green", "blue"]):
+        assert abs(lut.GetTableValue(0)[zI] - segments[colour][0][1]) < 1e-2
+    assert lut.GetTableValue(0)[3] == 1.
+
+    # Test 2: The colours of tables requested with a colourmap name are
+    # cached, and the cached colours are only referenced by the cache.
+    cache = chagu.termini.lookupTableColourCache
+    cachedColours = cache.get(("PuOr", 256))
+    assert cachedColours.GetNumberOfTuples() == 256
+    assert cachedColours.GetReferenceCount() == 1
+    del cachedColours
+
+    # Test 3: Each table is a new object with its own colours, so modifying
+    # one table, including the colourmap_lut of a visualisation, does not
+    # modify any other.
+    otherLut = chagu.termini.lookup_table_from_RGB_colourmap(
+        "PuOr", scalarRange=[0., 2.], tableSize=256)
+    assert otherLut is not lut
+    assert otherLut.GetTableValue(7) == lut.GetTableValue(7)
+    lut.SetTableValue(7, 0., 0., 0., 0.)
+    lut.SetRange(5., 6.)
+    assert otherLut.GetTableValue(7) != lut.GetTableValue(7)
+    assert otherLut.GetRange() == (0., 2.)
+    visA = chagu.Visualisation()
+    visB = chagu.Visualisation()
+    assert visA.colourmap_lut is not visB.colourmap_lut
+    visA.colourmap_lut.SetTableValue(0, 0., 0., 0., 0.)
+    assert visB.colourmap_lut.GetTableValue(0)[3] == 1.
+
+    # Test 4: Tables created from colourmap objects are not cached.
+    cache.clear()
+    chagu.termini.lookup_table_from_RGB_colourmap(matplotlib.cm.PuOr)
+    assert len(cache) == 0
+
+
+def test_nasty_arrow_polydata():
+    """
+    Test chagu.termini.nasty_arrow_polydata. We test the following cases:
+
+    1. The arrow has eighteen points, mirrored in the width and thickness
+         directions, and seventeen faces.
+    2. Arrows requested with the same parameters are the same object, and
+         arrows requested with different parameters are not.
+    """
+
+    # Test 1: The arrow has eighteen points, mirrored in the width and
+    # thickness directions, and seventeen faces.
+    arrow = chagu.termini.nasty_arrow_polydata(2., 1., 0.1)
+    points = numpy_support.vtk_to_numpy(arrow.GetPoints().GetData())
+    assert points.shape == (18, 3)
+    assert np.allclose(points[0], [-1., 0.05, 0.05])
+    assert np.allclose(points[4], [1., 0., 0.05])
+    assert np.allclose(points[5:9], points[3::-1] * [1., -1., 1.])
+    assert np.allclose(points[9:], points[:9] * [1., 1., -1.])
+    assert arrow.GetNumberOfCells() == 17
+    assert arrow.GetCell(3).GetPointIds().GetNumberOfIds() == 3
+    cellPoints = arrow.GetCell(16).GetPointIds()
+    assert [cellPoints.GetId(zI) for zI in xrange(4)] == [8, 0, 9, 17]
+
+    # Test 2: Arrows requested with the same parameters are the same object,
+    # and arrows requested with different parameters are not.
+    assert arrow is chagu.termini.nasty_arrow_polydata(2., 1., 0.1)
+    assert arrow is not chagu.termini.nasty_arrow_polydata(2., 1., 0.2)
+
+
+if __name__ == "__main__":
+    test_cone_source()
+    test_glyph_level_of_detail()
+    test_lookup_table_from_RGB_colourmap()
+    test_nasty_arrow_polydata()
@@ -86,6 +86,7 @@ def test_is_reader():
     2. If objectName is mapped to an object that is not a reader, False is
          returned.
     3. If objectName is mapped to a reader object, True is returned.
+    4. If objectName is mapped to a time series source, True is returned.
     """
 
     vis = chagu.Visualisation()
@@ -104,6 +105,11 @@ def test_is_reader():
     # Test 3: If objectName is mapped to a reader object, True is returned.
     assert vis.is_reader(readerName) is True
 
+    # Test 4: If objectName is mapped to a time series source, True is
+    # returned.
+    sourceName = vis.load_visualisation_toolkit_time_series([absFilePath])
+    assert vis.is_reader(sourceName) is True
+
 
 def test_is_tracked():
     """
@@ -77,6 +77,44 @@ def test_initialisation():
         assert False
 
 
+def test_close():
+    """
+    Test chagu.Visualisation.close. We test the following cases:
+
+    1. Closing a visualisation writes the images being saved asynchronously,
+         and stops the threads writing them.
+    2. Leaving a "with" block over a visualisation closes it.
+    """
+    pathToThisFile = os.path.dirname(os.path.realpath(__file__))
+    imageFilename = "{}/test_close.png".format(pathToThisFile)
+    image = numpy.zeros((16, 16, 3), dtype=numpy.uint8)
+
+    try:
+        # Test 1: Closing a visualisation writes the images being saved
+        # asynchronously, and stops the threads writing them.
+        vis = chagu.Visualisation()
+        vis._snapshotWriter = chagu.render.SnapshotWriter()
+        threads = list(vis._snapshotWriter._threads)
+        vis._snapshotWriter.submit(image, imageFilename)
+        vis.close()
+        assert os.path.isfile(imageFilename)
+        assert vis._snapshotWriter is None
+        assert any(thread.is_alive() for thread in threads) is False
+
+        # Test 2: Leaving a "with" block over a visualisation closes it.
+        os.remove(imageFilename)
+        with chagu.Visualisation() as vis:
+            vis._snapshotWriter = chagu.render.SnapshotWriter()
+            vis._snapshotWriter.submit(image, imageFilename)
+        assert os.path.isfile(imageFilename)
+        assert vis._snapshotWriter is None
+
+    # Remove the image as a cleanup activity.
+    finally:
+        if os.path.exists(imageFilename):
+            os.remove(imageFilename)
+
+
 def test_set_background():
     """
     Test chagu.Visualisation setter "background". We test the following cases:
@@ -410,6 +448,7 @@ def test_memory():
 
 if __name__ == "__main__":
     test_initialisation()
+    test_close()
     test_set_background()
     test_set_camera()
     test_set_colourmap_lut()